@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import base64
+from loguru import logger
+from openai import AzureOpenAI
+from timeit import default_timer as timer
+
+from enrichment.config.enrichment_config import enrichment_config
+from enrichment.mllm.azure_mllm_service import azure_mllm_service
+from enrichment.utils.files_util import get_image_format
+
+
+_BASELINE_MODE = "baseline"
+_POOLED_MODE = "pooled"
+_MODES = [_BASELINE_MODE, _POOLED_MODE]
+
+
+def _get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--image",
+        type=str,
+        required=True
+    )
+    parser.add_argument(
+        "--images",
+        type=int,
+        default=20
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        "--prompt",
+        type=str,
+        default="Describe the image in one sentence."
+    )
+    parser.add_argument(
+        "--detail-mode",
+        type=str,
+        default="low"
+    )
+    parser.add_argument(
+        "--mode",
+        type=str,
+        choices=_MODES,
+        nargs="+",
+        default=_MODES
+    )
+
+    return parser.parse_args()
+
+
+async def _baseline_chat(image: str, prompt: str, detail_mode: str):
+    # the previous implementation: a new synchronous client per image, blocking the event loop during the call
+    format = get_image_format(image).lower()
+    client = AzureOpenAI(
+        azure_endpoint=enrichment_config.mllm_endpoint,
+        azure_deployment=enrichment_config.mllm_model,
+        api_version=enrichment_config.mllm_api_version,
+        api_key=enrichment_config.mllm_key,
+    )
+    client.chat.completions.create(
+        model=enrichment_config.mllm_model,
+        messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": [{"type": "image_url", "image_url": {"url": f"data:image/{format};base64,{image}", "detail": detail_mode}}]}
+        ]
+    )
+
+
+async def _pooled_chat(image: str, prompt: str, detail_mode: str):
+    await azure_mllm_service.async_chat([image], prompt, {}, detail_mode, enrichment_config.mllm_model)
+
+
+async def _describe_images(mode: str, image: str, images: int, concurrency: int, prompt: str, detail_mode: str):
+    chat = _baseline_chat if mode == _BASELINE_MODE else _pooled_chat
+    # batches of concurrent calls, as the vision loaders describe the images of a document
+    for start in range(0, images, concurrency):
+        await asyncio.gather(*[chat(image, prompt, detail_mode) for _ in range(start, min(start + concurrency, images))])
+
+
+def main(image_path: str, images: int, concurrency: int, prompt: str, detail_mode: str, modes: list[str]):
+    """
+    Describes the same image many times with the MLLM service and reports the images described per second,
+    with the previous per-image synchronous client and with the pooled async client.
+    """
+    with open(image_path, "rb") as f:
+        image = base64.b64encode(f.read()).decode("utf-8")
+
+    for mode in modes:
+        logger.info(f"Describing {images} images with a concurrency of {concurrency} in {mode} mode...")
+        start_time = timer()
+        asyncio.run(_describe_images(mode, image, images, concurrency, prompt, detail_mode))
+        elapsed = timer() - start_time
+        logger.info(f"Described {images} images in {elapsed:.2f}s ({images / elapsed:.2f} images/s) in {mode} mode")
+
+
+if __name__ == "__main__":
+    args = _get_args()
+
+    main(
+        args.image,
+        args.images,
+        args.concurrency,
+        args.prompt,
+        args.detail_mode,
+        args.mode
+    )
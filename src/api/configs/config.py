@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from typing import Optional
 load_dotenv()
 
 
@@ -10,10 +11,73 @@ _AZURE_SEARCH_ENV_VARS = [
     _AZURE_SEARCH_API_KEY_ENV_VAR,
 ]
 
+_INGESTION_MAX_WORKERS_ENV_VAR = "INGESTION_MAX_WORKERS"
+_INGESTION_JOB_HISTORY_SIZE_ENV_VAR = "INGESTION_JOB_HISTORY_SIZE"
+_INGESTION_PROCESS_POOL_SIZE_ENV_VAR = "INGESTION_PROCESS_POOL_SIZE"
+_UPLOAD_MAX_FILE_SIZE_MB_ENV_VAR = "UPLOAD_MAX_FILE_SIZE_MB"
+_UPLOAD_MAX_REQUEST_SIZE_MB_ENV_VAR = "UPLOAD_MAX_REQUEST_SIZE_MB"
+_EMBEDDING_CACHE_ENABLED_ENV_VAR = "EMBEDDING_CACHE_ENABLED"
+_EMBEDDING_CACHE_PATH_ENV_VAR = "EMBEDDING_CACHE_PATH"
+_EMBEDDING_CACHE_MAX_SIZE_MB_ENV_VAR = "EMBEDDING_CACHE_MAX_SIZE_MB"
+_RAG_RESOURCE_POOL_MAX_SIZE_ENV_VAR = "RAG_RESOURCE_POOL_MAX_SIZE"
+_RAG_RESOURCE_POOL_IDLE_SECONDS_ENV_VAR = "RAG_RESOURCE_POOL_IDLE_SECONDS"
+_SEARCH_CACHE_ENABLED_ENV_VAR = "SEARCH_CACHE_ENABLED"
+_SEARCH_CACHE_TTL_SECONDS_ENV_VAR = "SEARCH_CACHE_TTL_SECONDS"
+_SEARCH_CACHE_MAX_SIZE_ENV_VAR = "SEARCH_CACHE_MAX_SIZE"
+_BATCH_MAX_QUERIES_ENV_VAR = "BATCH_MAX_QUERIES"
+_BATCH_CONCURRENCY_ENV_VAR = "BATCH_CONCURRENCY"
+_LOCAL_VECTOR_STORE_PATH_ENV_VAR = "LOCAL_VECTOR_STORE_PATH"
+_QUERY_EMBEDDING_CACHE_SIZE_ENV_VAR = "QUERY_EMBEDDING_CACHE_SIZE"
+_QUERY_EMBEDDING_BATCH_MAX_SIZE_ENV_VAR = "QUERY_EMBEDDING_BATCH_MAX_SIZE"
+_QUERY_EMBEDDING_BATCH_MAX_WAIT_MS_ENV_VAR = "QUERY_EMBEDDING_BATCH_MAX_WAIT_MS"
+_OPENAI_ENDPOINT_POOL_ENV_VAR = "AZURE_OPENAI_ENDPOINT_POOL"
+_OPENAI_ENDPOINT_COOLDOWN_SECONDS_ENV_VAR = "AZURE_OPENAI_ENDPOINT_COOLDOWN_SECONDS"
+_OPENAI_HEDGE_AFTER_MS_ENV_VAR = "AZURE_OPENAI_HEDGE_AFTER_MS"
+_DEFAULT_INGESTION_MAX_WORKERS = 2
+_DEFAULT_INGESTION_JOB_HISTORY_SIZE = 100
+_DEFAULT_UPLOAD_MAX_FILE_SIZE_MB = 512
+_DEFAULT_UPLOAD_MAX_REQUEST_SIZE_MB = 2048
+_DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "temp", "embedding_cache.sqlite")
+_DEFAULT_EMBEDDING_CACHE_MAX_SIZE_MB = 1024
+_DEFAULT_RAG_RESOURCE_POOL_MAX_SIZE = 16
+_DEFAULT_RAG_RESOURCE_POOL_IDLE_SECONDS = 1800
+_DEFAULT_SEARCH_CACHE_TTL_SECONDS = 300
+_DEFAULT_SEARCH_CACHE_MAX_SIZE = 1024
+_DEFAULT_BATCH_MAX_QUERIES = 1000
+_DEFAULT_BATCH_CONCURRENCY = 8
+_DEFAULT_LOCAL_VECTOR_STORE_PATH = os.path.join(os.path.dirname(__file__), "..", "temp", "vector_stores")
+_DEFAULT_QUERY_EMBEDDING_CACHE_SIZE = 4096
+_DEFAULT_QUERY_EMBEDDING_BATCH_MAX_SIZE = 16
+_DEFAULT_QUERY_EMBEDDING_BATCH_MAX_WAIT_MS = 5
+_DEFAULT_OPENAI_ENDPOINT_COOLDOWN_SECONDS = 10
+_DEFAULT_OPENAI_HEDGE_AFTER_MS = 0
+
 
 class Config(object):
     _azure_search_endpoint: str
     _azure_search_api_key: str
+    _ingestion_max_workers: int
+    _ingestion_job_history_size: int
+    _ingestion_process_pool_size: int
+    _upload_max_file_size_mb: int
+    _upload_max_request_size_mb: int
+    _embedding_cache_enabled: bool
+    _embedding_cache_path: str
+    _embedding_cache_max_size_mb: int
+    _rag_resource_pool_max_size: int
+    _rag_resource_pool_idle_seconds: int
+    _search_cache_enabled: bool
+    _search_cache_ttl_seconds: int
+    _search_cache_max_size: int
+    _batch_max_queries: int
+    _batch_concurrency: int
+    _local_vector_store_path: str
+    _query_embedding_cache_size: int
+    _query_embedding_batch_max_size: int
+    _query_embedding_batch_max_wait_ms: int
+    _openai_endpoint_pool: Optional[str]
+    _openai_endpoint_cooldown_seconds: float
+    _openai_hedge_after_ms: int
 
     def __init__(self):
         self._azure_search_endpoint = os.environ.get(_AZURE_SEARCH_ENDPOINT_ENV_VAR)
@@ -24,6 +88,29 @@ class Config(object):
 
         self._validate_openai_variables()
 
+        self._ingestion_max_workers = int(os.environ.get(_INGESTION_MAX_WORKERS_ENV_VAR, _DEFAULT_INGESTION_MAX_WORKERS))
+        self._ingestion_job_history_size = int(os.environ.get(_INGESTION_JOB_HISTORY_SIZE_ENV_VAR, _DEFAULT_INGESTION_JOB_HISTORY_SIZE))
+        self._ingestion_process_pool_size = int(os.environ.get(_INGESTION_PROCESS_POOL_SIZE_ENV_VAR, os.cpu_count() or 1))
+        self._upload_max_file_size_mb = int(os.environ.get(_UPLOAD_MAX_FILE_SIZE_MB_ENV_VAR, _DEFAULT_UPLOAD_MAX_FILE_SIZE_MB))
+        self._upload_max_request_size_mb = int(os.environ.get(_UPLOAD_MAX_REQUEST_SIZE_MB_ENV_VAR, _DEFAULT_UPLOAD_MAX_REQUEST_SIZE_MB))
+        self._embedding_cache_enabled = os.environ.get(_EMBEDDING_CACHE_ENABLED_ENV_VAR, "true").lower() == "true"
+        self._embedding_cache_path = os.environ.get(_EMBEDDING_CACHE_PATH_ENV_VAR, _DEFAULT_EMBEDDING_CACHE_PATH)
+        self._embedding_cache_max_size_mb = int(os.environ.get(_EMBEDDING_CACHE_MAX_SIZE_MB_ENV_VAR, _DEFAULT_EMBEDDING_CACHE_MAX_SIZE_MB))
+        self._rag_resource_pool_max_size = int(os.environ.get(_RAG_RESOURCE_POOL_MAX_SIZE_ENV_VAR, _DEFAULT_RAG_RESOURCE_POOL_MAX_SIZE))
+        self._rag_resource_pool_idle_seconds = int(os.environ.get(_RAG_RESOURCE_POOL_IDLE_SECONDS_ENV_VAR, _DEFAULT_RAG_RESOURCE_POOL_IDLE_SECONDS))
+        self._search_cache_enabled = os.environ.get(_SEARCH_CACHE_ENABLED_ENV_VAR, "true").lower() == "true"
+        self._search_cache_ttl_seconds = int(os.environ.get(_SEARCH_CACHE_TTL_SECONDS_ENV_VAR, _DEFAULT_SEARCH_CACHE_TTL_SECONDS))
+        self._search_cache_max_size = int(os.environ.get(_SEARCH_CACHE_MAX_SIZE_ENV_VAR, _DEFAULT_SEARCH_CACHE_MAX_SIZE))
+        self._batch_max_queries = int(os.environ.get(_BATCH_MAX_QUERIES_ENV_VAR, _DEFAULT_BATCH_MAX_QUERIES))
+        self._batch_concurrency = int(os.environ.get(_BATCH_CONCURRENCY_ENV_VAR, _DEFAULT_BATCH_CONCURRENCY))
+        self._local_vector_store_path = os.environ.get(_LOCAL_VECTOR_STORE_PATH_ENV_VAR, _DEFAULT_LOCAL_VECTOR_STORE_PATH)
+        self._query_embedding_cache_size = int(os.environ.get(_QUERY_EMBEDDING_CACHE_SIZE_ENV_VAR, _DEFAULT_QUERY_EMBEDDING_CACHE_SIZE))
+        self._query_embedding_batch_max_size = int(os.environ.get(_QUERY_EMBEDDING_BATCH_MAX_SIZE_ENV_VAR, _DEFAULT_QUERY_EMBEDDING_BATCH_MAX_SIZE))
+        self._query_embedding_batch_max_wait_ms = int(os.environ.get(_QUERY_EMBEDDING_BATCH_MAX_WAIT_MS_ENV_VAR, _DEFAULT_QUERY_EMBEDDING_BATCH_MAX_WAIT_MS))
+        self._openai_endpoint_pool = os.environ.get(_OPENAI_ENDPOINT_POOL_ENV_VAR)
+        self._openai_endpoint_cooldown_seconds = float(os.environ.get(_OPENAI_ENDPOINT_COOLDOWN_SECONDS_ENV_VAR, _DEFAULT_OPENAI_ENDPOINT_COOLDOWN_SECONDS))
+        self._openai_hedge_after_ms = int(os.environ.get(_OPENAI_HEDGE_AFTER_MS_ENV_VAR, _DEFAULT_OPENAI_HEDGE_AFTER_MS))
+
     def _validate_openai_variables(self):
         _OPENAI_VERSION_ENV_VAR = "AZURE_OPENAI_API_VERSION"
         _OPENAI_ENDPOINT_ENV_VAR = "AZURE_OPENAI_ENDPOINT"
@@ -45,5 +132,93 @@ class Config(object):
     def openai_version(self):
         return self._openai_version
 
+    @property
+    def ingestion_max_workers(self):
+        return self._ingestion_max_workers
+
+    @property
+    def ingestion_job_history_size(self):
+        return self._ingestion_job_history_size
+
+    @property
+    def ingestion_process_pool_size(self):
+        return self._ingestion_process_pool_size
+
+    @property
+    def upload_max_file_size_bytes(self):
+        return self._upload_max_file_size_mb * 1024 * 1024
+
+    @property
+    def upload_max_request_size_bytes(self):
+        return self._upload_max_request_size_mb * 1024 * 1024
+
+    @property
+    def embedding_cache_enabled(self):
+        return self._embedding_cache_enabled
+
+    @property
+    def embedding_cache_path(self):
+        return self._embedding_cache_path
+
+    @property
+    def embedding_cache_max_size_bytes(self):
+        return self._embedding_cache_max_size_mb * 1024 * 1024
+
+    @property
+    def rag_resource_pool_max_size(self):
+        return self._rag_resource_pool_max_size
+
+    @property
+    def rag_resource_pool_idle_seconds(self):
+        return self._rag_resource_pool_idle_seconds
+
+    @property
+    def search_cache_enabled(self):
+        return self._search_cache_enabled
+
+    @property
+    def search_cache_ttl_seconds(self):
+        return self._search_cache_ttl_seconds
+
+    @property
+    def search_cache_max_size(self):
+        return self._search_cache_max_size
+
+    @property
+    def batch_max_queries(self):
+        return self._batch_max_queries
+
+    @property
+    def batch_concurrency(self):
+        return self._batch_concurrency
+
+    @property
+    def local_vector_store_path(self):
+        return self._local_vector_store_path
+
+    @property
+    def query_embedding_cache_size(self):
+        return self._query_embedding_cache_size
+
+    @property
+    def query_embedding_batch_max_size(self):
+        return self._query_embedding_batch_max_size
+
+    @property
+    def query_embedding_batch_max_wait_seconds(self):
+        return self._query_embedding_batch_max_wait_ms / 1000
+
+    @property
+    def openai_endpoint_pool(self):
+        return self._openai_endpoint_pool
+
+    @property
+    def openai_endpoint_cooldown_seconds(self):
+        return self._openai_endpoint_cooldown_seconds
+
+    @property
+    def openai_hedge_after_seconds(self):
+        return self._openai_hedge_after_ms / 1000
+
 
 config = Config()
@@ -7,6 +7,12 @@ _AZURE_COSMOS_DB_URI_ENV_VAR = "AZURE_COSMOS_DB_URI"
 _AZURE_COSMOS_DB_KEY_ENV_VAR = "AZURE_COSMOS_DB_KEY"
 _AZURE_COSMOS_DB_DATABASE_ENV_VAR = "AZURE_COSMOS_DB_DATABASE"
 _AZURE_COSMOS_DB_CONTAINER_ENV_VAR = "AZURE_COSMOS_DB_CONTAINER"
+_AZURE_COSMOS_DB_MANIFEST_CONTAINER_ENV_VAR = "AZURE_COSMOS_DB_MANIFEST_CONTAINER"
+_DEFAULT_AZURE_COSMOS_DB_MANIFEST_CONTAINER = "ingestion-manifests"
+_CONFIG_CACHE_TTL_SECONDS_ENV_VAR = "CONFIG_CACHE_TTL_SECONDS"
+_CONFIG_CACHE_MAX_SIZE_ENV_VAR = "CONFIG_CACHE_MAX_SIZE"
+_DEFAULT_CONFIG_CACHE_TTL_SECONDS = 60
+_DEFAULT_CONFIG_CACHE_MAX_SIZE = 256
 
 _AZURE_COSMOS_DB_ENV_VARS = [
     _AZURE_COSMOS_DB_KEY_ENV_VAR,
@@ -20,12 +26,19 @@ class CosmosConfig(object):
     _azure_cosmos_db_key: str
     _azure_cosmos_db_database: str
     _azure_cosmos_db_container: str
+    _azure_cosmos_db_manifest_container: str
+    _config_cache_ttl_seconds: int
+    _config_cache_max_size: int
 
     def __init__(self):
         self._azure_cosmos_db_uri = os.environ.get(_AZURE_COSMOS_DB_URI_ENV_VAR)
         self._azure_cosmos_db_key = os.environ.get(_AZURE_COSMOS_DB_KEY_ENV_VAR)
         self._azure_cosmos_db_database = os.environ.get(_AZURE_COSMOS_DB_DATABASE_ENV_VAR)
         self._azure_cosmos_db_container = os.environ.get(_AZURE_COSMOS_DB_CONTAINER_ENV_VAR)
+        self._azure_cosmos_db_manifest_container = os.environ.get(
+            _AZURE_COSMOS_DB_MANIFEST_CONTAINER_ENV_VAR,
+            _DEFAULT_AZURE_COSMOS_DB_MANIFEST_CONTAINER
+        )
 
         if not (
             self._azure_cosmos_db_uri and
@@ -35,6 +48,9 @@ class CosmosConfig(object):
         ):
             raise Exception(f"The following environment variables are required for cosmos db: {', '.join(_AZURE_COSMOS_DB_ENV_VARS)}")
 
+        self._config_cache_ttl_seconds = int(os.environ.get(_CONFIG_CACHE_TTL_SECONDS_ENV_VAR, _DEFAULT_CONFIG_CACHE_TTL_SECONDS))
+        self._config_cache_max_size = int(os.environ.get(_CONFIG_CACHE_MAX_SIZE_ENV_VAR, _DEFAULT_CONFIG_CACHE_MAX_SIZE))
+
 
     @property
     def azure_cosmos_db_uri(self):
@@ -51,3 +67,15 @@ class CosmosConfig(object):
     @property
     def azure_cosmos_db_container(self):
         return self._azure_cosmos_db_container
+
+    @property
+    def azure_cosmos_db_manifest_container(self):
+        return self._azure_cosmos_db_manifest_container
+
+    @property
+    def config_cache_ttl_seconds(self):
+        return self._config_cache_ttl_seconds
+
+    @property
+    def config_cache_max_size(self):
+        return self._config_cache_max_size
@@ -7,3 +7,25 @@ class RagConstants(object):
     DEFAULT_AZURE_DEPLOYMENT = "gpt-4o"
     DEFAULT_SEARCH_TYPE = "hybrid"
     DEFAULT_SEARCH_K = 10
+    AZURE_SEARCH_BACKEND = "azure_search"
+    LOCAL_SEARCH_BACKEND = "local"
+    DEFAULT_SEARCH_BACKEND = "azure_search"
+    DEFAULT_LOCAL_INDEX_TYPE = "flat"
+    IVF_LOCAL_INDEX_TYPE = "ivf"
+    DEFAULT_IVF_NLIST = 256
+    DEFAULT_IVF_NPROBE = 16
+    DEFAULT_RERANK_LEXICAL_WEIGHT = 0.3
+    DEFAULT_INGESTION_MODE = "sequential"
+    PROCESS_POOL_INGESTION_MODE = "process_pool"
+    PIPELINE_INGESTION_MODE = "pipeline"
+    DEFAULT_PIPELINE_CPU_STAGE_CONCURRENCY = 1
+    DEFAULT_PIPELINE_IO_STAGE_CONCURRENCY = 4
+    DEFAULT_PIPELINE_QUEUE_SIZE = 8
+    DEFAULT_PIPELINE_BATCH_SIZE = 64
+    DEFAULT_EMBEDDING_BATCH_SIZE = 16
+    DEFAULT_EMBEDDING_BATCH_MAX_TOKENS = 32000
+    DEFAULT_EMBEDDING_CONCURRENCY = 4
+    DEFAULT_EMBEDDING_MAX_RETRIES = 3
+    DEFAULT_SEMANTIC_CACHE_SIMILARITY_THRESHOLD = 0.95
+    DEFAULT_SEMANTIC_CACHE_MAX_ENTRIES = 1000
+    DEFAULT_CONTEXT_SHINGLE_SIZE = 5
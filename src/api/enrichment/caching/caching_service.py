@@ -31,9 +31,10 @@ class CachingService:
         """
         formatted_string = req.features.cache.key_format
 
+        # the packing of the images does not change their descriptions, so packed and single image requests share their keys
         hashing_object = {
             "image": req.images,
-            "features": req.features
+            "features": jsonable_encoder(req.features, exclude={"mllm": {"images_per_request"}})
         }
 
         key = formatted_string.format(
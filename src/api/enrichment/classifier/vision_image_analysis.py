@@ -1,40 +1,56 @@
-import base64
-from io import BytesIO
+import aiohttp
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from azure.ai.vision.imageanalysis import ImageAnalysisClient
+import base64
+from typing import Optional, Union
+from azure.ai.vision.imageanalysis.aio import ImageAnalysisClient
 from azure.ai.vision.imageanalysis.models import VisualFeatures
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
 from enrichment.config.enrichment_config import EnrichmentConfig
+from enrichment.utils.client_loop import run_on_client_loop
 
 class AzureAIVisionModel:
-    _model: ImageAnalysisClient
+    '''
+    Analyzes images with a single long-lived async Image Analysis client, on the client loop of the enrichment,
+    running at most `VISION_MAX_CONCURRENCY` analyses at the same time over the pooled connections of its transport.
+    '''
+    _model: Optional[ImageAnalysisClient]
+    _semaphore: Optional[asyncio.Semaphore]
 
     def __init__(self):
-        self._executor = ThreadPoolExecutor()
-        self._model = self.load_computer_vision_model()
-
-    def generate_image_bytes(self, image_base64: str):
-        decoded_img = base64.b64decode(image_base64)
-        image_bytes = BytesIO(decoded_img)
-        return image_bytes
+        self._enrichment_config = EnrichmentConfig()
+        self._model = None
+        self._semaphore = None
 
-    async def async_visual_features(self, image_base64: str, visual_features: list[VisualFeatures]) -> list[str]:
-        image_bytes = self.generate_image_bytes(image_base64)
+    def decode_image(self, image_base64: str) -> bytes:
+        return base64.b64decode(image_base64)
 
-        # make async call, since there is no SDK provided async method
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(self._executor, self._model.analyze, image_bytes, visual_features)
+    async def async_visual_features(self, image: Union[str, bytes], visual_features: list[VisualFeatures]) -> dict:
+        '''
+        Accepts the base64 encoded image, or the image bytes when the caller already decoded them.
+        '''
+        image_data = image if isinstance(image, bytes) else self.decode_image(image)
+        response = await run_on_client_loop(self._analyze(image_data, visual_features))
 
         return response.__dict__
 
-    def load_computer_vision_model(self):
-        enrichment_config = EnrichmentConfig()
+    async def _analyze(self, image_data: bytes, visual_features: list[VisualFeatures]):
+        # only called on the client loop, so the client and the semaphore are created once without a lock
+        if not self._model:
+            self._semaphore = asyncio.Semaphore(self._enrichment_config.vision_max_concurrency)
+            self._model = self.load_computer_vision_model()
+
+        async with self._semaphore:
+            return await self._model.analyze(image_data, visual_features)
+
+    def load_computer_vision_model(self) -> ImageAnalysisClient:
+        connector = aiohttp.TCPConnector(limit=self._enrichment_config.vision_max_concurrency)
         model = ImageAnalysisClient(
-            endpoint=enrichment_config.vision_endpoint,
-            credential=AzureKeyCredential(key=enrichment_config.vision_key)
+            endpoint=self._enrichment_config.vision_endpoint,
+            credential=AzureKeyCredential(key=self._enrichment_config.vision_key),
+            transport=AioHttpTransport(session=aiohttp.ClientSession(connector=connector), session_owner=True)
         )
 
         return model
 
-azure_vision_service = AzureAIVisionModel()
\ No newline at end of file
+azure_vision_service = AzureAIVisionModel()
@@ -3,15 +3,21 @@ import os
 from enrichment.utils.files_util import json_file_load
 
 DEFAULT_TTL_FOR_CACHING = 30 * 24 * 60 * 60
+DEFAULT_MLLM_MAX_CONNECTIONS = 100
+DEFAULT_MLLM_KEEPALIVE_EXPIRY_IN_SEC = 60
+DEFAULT_VISION_MAX_CONCURRENCY = 16
 
 class EnrichmentConfig(object):
     _azure_mllm_api_version: str
     _azure_mllm_api_key: str
     _azure_mllm_api_endpoint: str
     _azure_mllm_model: str
+    _mllm_max_connections: int
+    _mllm_keepalive_expiry_in_sec: float
 
     _azure_computer_vision_endpoint: str
     _azure_computer_vision_key: str
+    _vision_max_concurrency: int
     _classifier_config_data: json
 
     _col_enrichment_cache: str
@@ -24,9 +30,12 @@ class EnrichmentConfig(object):
         self._azure_mllm_api_key = os.environ.get("AZURE_OPENAI_API_KEY")
         self._azure_mllm_api_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
         self._azure_mllm_model = os.environ.get("AZURE_MLLM_DEPLOYMENT_MODEL")
+        self._mllm_max_connections = None
+        self._mllm_keepalive_expiry_in_sec = None
 
         self._azure_computer_vision_endpoint = os.environ.get("AZURE_COMPUTER_VISION_ENDPOINT")
         self._azure_computer_vision_key = os.environ.get("AZURE_COMPUTER_VISION_KEY")
+        self._vision_max_concurrency = None
         self._classifier_config_data = ''
 
         self._enrichment_cache_max_expiry_in_sec = None
@@ -76,6 +85,29 @@ class EnrichmentConfig(object):
         
         return self._azure_mllm_model
 
+    @property
+    def mllm_max_connections(self) -> int:
+        if not self._mllm_max_connections:
+            try:
+                self._mllm_max_connections = int(os.environ.get("MLLM_MAX_CONNECTIONS", DEFAULT_MLLM_MAX_CONNECTIONS))
+            except:
+                raise ValueError("MLLM_MAX_CONNECTIONS is Invalid.")
+
+            if self._mllm_max_connections < 1:
+                raise ValueError("MLLM_MAX_CONNECTIONS is Invalid. MLLM_MAX_CONNECTIONS must be a positive number")
+
+        return self._mllm_max_connections
+
+    @property
+    def mllm_keepalive_expiry_in_sec(self) -> float:
+        if self._mllm_keepalive_expiry_in_sec is None:
+            try:
+                self._mllm_keepalive_expiry_in_sec = float(os.environ.get("MLLM_KEEPALIVE_EXPIRY_IN_SEC", DEFAULT_MLLM_KEEPALIVE_EXPIRY_IN_SEC))
+            except:
+                raise ValueError("MLLM_KEEPALIVE_EXPIRY_IN_SEC is Invalid.")
+
+        return self._mllm_keepalive_expiry_in_sec
+
     @property
     def vision_endpoint(self) -> str:
         if not self._azure_computer_vision_endpoint:
@@ -96,6 +128,19 @@ class EnrichmentConfig(object):
         
         return self._azure_computer_vision_key
     
+    @property
+    def vision_max_concurrency(self) -> int:
+        if not self._vision_max_concurrency:
+            try:
+                self._vision_max_concurrency = int(os.environ.get("VISION_MAX_CONCURRENCY", DEFAULT_VISION_MAX_CONCURRENCY))
+            except:
+                raise ValueError("VISION_MAX_CONCURRENCY is Invalid.")
+
+            if self._vision_max_concurrency < 1:
+                raise ValueError("VISION_MAX_CONCURRENCY is Invalid. VISION_MAX_CONCURRENCY must be a positive number")
+
+        return self._vision_max_concurrency
+
     @property
     def col_enrichment_cache(self) -> str:
         if not self._col_enrichment_cache:
@@ -1,20 +1,27 @@
 import asyncio
+import base64
 import binascii
 
+from http.client import BAD_REQUEST, INTERNAL_SERVER_ERROR, TOO_MANY_REQUESTS
 from loguru import logger as log
-from openai import OpenAIError
+from openai import APIStatusError
 from enrichment.caching.caching_service import CachingService
 from enrichment.classifier.classify_image import categorize_image
 from enrichment.classifier.vision_image_analysis import azure_vision_service
-from enrichment.models.endpoint import MediaEnrichmentRequest, MediaEnrichmentResponse
+from enrichment.models.endpoint import GeneratedResponse, MediaEnrichmentRequest, MediaEnrichmentResponse
 from azure.ai.vision.imageanalysis.models import VisualFeatures
 from enrichment.mllm.azure_mllm_service import azure_mllm_service
+from enrichment.mllm.packed_descriptions import get_packed_image_labels, get_packed_prompt, parse_packed_descriptions
 import nest_asyncio
 from enrichment.utils.custom_exceptions import CustomServiceException, BadRequestError
 from azure.core.exceptions import HttpResponseError
 
 from enrichment.utils.messages import Enrichment_Messages
 from enrichment.utils.files_util import get_image_format
+from utils.metrics import (
+    CACHE_GET_ENRICHMENT_STAGE, CACHE_HIT_OUTCOME, CACHE_MISS_OUTCOME, CACHE_SET_ENRICHMENT_STAGE, CLASSIFIER_ENRICHMENT_STAGE,
+    ENRICHMENT_STAGE_SECONDS, ERROR_OUTCOME, FALLBACK_OUTCOME, MLLM_ENRICHMENT_STAGE, PACKED_MLLM_ENRICHMENT_STAGE, observe_duration
+)
 
 nest_asyncio.apply()
 
@@ -22,37 +29,47 @@ from enrichment.utils.enums import Category
 
 class EnrichmentService:
 
-    async def _async_get_generated_answer(self, req: MediaEnrichmentRequest):
+    async def _async_get_generated_answer(self, req: MediaEnrichmentRequest, packed: bool = False):
         try:
-            genai_response = await azure_mllm_service.async_chat(
-                req.images,
-                req.features.mllm.prompt,
-                req.features.mllm.llm_kwargs,
-                req.features.mllm.detail_mode,
-                req.features.mllm.model
-            )
-            return genai_response
-        except OpenAIError as e:
-            error = None
-            if e.json_body["error"] and e.json_body["error"]["message"]:
-                error = e.json_body["error"]["message"]
+            if packed:
+                prompt = get_packed_prompt(req.features.mllm.prompt, len(req.images))
+                labels = get_packed_image_labels(len(req.images))
+                # JSON mode makes the MLLM answer with a JSON object, which the packed prompt describes
+                llm_kwargs = {**(req.features.mllm.llm_kwargs or {}), "response_format": {"type": "json_object"}}
             else:
-                error = e.user_message
+                prompt = req.features.mllm.prompt
+                labels = None
+                llm_kwargs = req.features.mllm.llm_kwargs
+
+            with observe_duration(ENRICHMENT_STAGE_SECONDS, MLLM_ENRICHMENT_STAGE):
+                genai_response = await azure_mllm_service.async_chat(
+                    req.images,
+                    prompt,
+                    llm_kwargs,
+                    req.features.mllm.detail_mode,
+                    req.features.mllm.model,
+                    labels
+                )
+            return genai_response
+        except APIStatusError as e:
+            # the body of an OpenAI status error is the `error` object of the response
+            error = e.body.get("message") if isinstance(e.body, dict) else None
             log.error(f"Exception occurred in MLLM module, exception details - {e}")
-            raise CustomServiceException(error, "MLLM module", e.http_status)
+            raise CustomServiceException(error or e.message, "MLLM module", e.status_code)
         except Exception as e:
             log.error(f"Generic Exception occurred in MLLM module, exception details - {e}")
             raise
 
-    async def _async_get_classifier_result(self, req: MediaEnrichmentRequest):
+    async def _async_get_classifier_result(self, req: MediaEnrichmentRequest, image_data: bytes):
         try:
 
             '''
             NOTE: Classifier will be used only for ingestion and it will be 1 image request per call for now.
             Code can be extended later for multiple images if there is a need for it in the future.
-            Code currently just takes the first image to process further.
+            Code currently just takes the first image to process further, already decoded by the request validation.
             '''
-            tags_response = await azure_vision_service.async_visual_features(req.images[0], [VisualFeatures.tags])
+            with observe_duration(ENRICHMENT_STAGE_SECONDS, CLASSIFIER_ENRICHMENT_STAGE):
+                tags_response = await azure_vision_service.async_visual_features(image_data, [VisualFeatures.tags])
             category = categorize_image(tags_response["_data"]["tagsResult"]["values"], req.features.classifier.threshold)
             return category
         except HttpResponseError as e:
@@ -68,18 +85,24 @@ class EnrichmentService:
 
 
     def _get_result_from_cache(self, req: MediaEnrichmentRequest):
-        try:
-            return CachingService.get(req)
-        except Exception as ex:
-            log.error(f"Generic Exception occurred in enrichment service to fetch result from cache, exception details - {ex}") 
-            return None
+        with observe_duration(ENRICHMENT_STAGE_SECONDS, CACHE_GET_ENRICHMENT_STAGE) as observation:
+            try:
+                result = CachingService.get(req)
+                observation.outcome = CACHE_HIT_OUTCOME if result != None else CACHE_MISS_OUTCOME
+                return result
+            except Exception as ex:
+                log.error(f"Generic Exception occurred in enrichment service to fetch result from cache, exception details - {ex}") 
+                observation.outcome = ERROR_OUTCOME
+                return None
 
 
     def _set_result_to_cache(self, req: MediaEnrichmentRequest, response):
-        try:
-            return CachingService.set(req, response)
-        except Exception as ex:
-            log.error(f"Generic Exception occurred in enrichment service to store the response into the cache, exception details - {ex}") 
+        with observe_duration(ENRICHMENT_STAGE_SECONDS, CACHE_SET_ENRICHMENT_STAGE) as observation:
+            try:
+                return CachingService.set(req, response)
+            except Exception as ex:
+                log.error(f"Generic Exception occurred in enrichment service to store the response into the cache, exception details - {ex}") 
+                observation.outcome = ERROR_OUTCOME
 
     def _is_cache_enabled(self, req: MediaEnrichmentRequest):
         return req.features and req.features.cache and req.features.cache.enabled
@@ -92,7 +115,7 @@ class EnrichmentService:
 
     async def async_get_media_enrichment_result(self, req: MediaEnrichmentRequest):
         try:
-            self._validate_media_enrichment_request(req)
+            images_data = self._validate_media_enrichment_request(req)
 
             result = None
             generated_response = None
@@ -105,7 +128,7 @@ class EnrichmentService:
                     return MediaEnrichmentResponse(**result)
 
             if self._is_classifier_enabled(req):
-                classifier_result = await self._async_get_classifier_result(req)
+                classifier_result = await self._async_get_classifier_result(req, images_data[0])
                 classifier_result_name = classifier_result.name
                 if classifier_result == Category.GPT_VISION:
                     generated_response = await self._async_get_generated_answer(req)
@@ -125,18 +148,98 @@ class EnrichmentService:
             log.error(f"Enrichment service exception caught, exception - {e}")
             raise
 
+    async def async_get_media_enrichment_results(self, req: MediaEnrichmentRequest) -> list[MediaEnrichmentResponse]:
+        '''
+        Enriches each image of the request as a separate single image request, with its own cache entry and classifier result,
+        but describes the images which need it with up to `images_per_request` of them packed into a single MLLM request.
+        '''
+        try:
+            images_data = self._validate_media_enrichment_request(req)
+            image_reqs = [req.model_copy(update={"images": [image]}) for image in req.images]
+
+            results: list[MediaEnrichmentResponse] = [None] * len(image_reqs)
+            pending = []
+            for index, image_req in enumerate(image_reqs):
+                result = self._get_result_from_cache(image_req) if self._is_cache_enabled(req) else None
+                if result != None:
+                    results[index] = MediaEnrichmentResponse(**result)
+                else:
+                    pending.append(index)
+
+            classifier_result_names = {}
+            to_describe = pending
+            if self._is_classifier_enabled(req):
+                classifier_results = await asyncio.gather(*[self._async_get_classifier_result(image_reqs[index], images_data[index]) for index in pending])
+                classifier_result_names = {index: classifier_result.name for index, classifier_result in zip(pending, classifier_results)}
+                to_describe = [index for index, classifier_result in zip(pending, classifier_results) if classifier_result == Category.GPT_VISION]
+
+            images_per_request = req.features.mllm.images_per_request or 1
+            packs = [to_describe[start:start + images_per_request] for start in range(0, len(to_describe), images_per_request)]
+            packed_responses = await asyncio.gather(*[self._async_get_packed_generated_answers([image_reqs[index] for index in pack]) for pack in packs])
+            generated_responses = {index: response for pack, responses in zip(packs, packed_responses) for index, response in zip(pack, responses)}
+
+            for index in pending:
+                results[index] = MediaEnrichmentResponse(
+                    generated_response=generated_responses.get(index),
+                    classifier_result=classifier_result_names.get(index)
+                )
+
+                if self._is_cache_enabled(req):
+                    self._set_result_to_cache(image_reqs[index], results[index])
+
+            return results
+        except Exception as e:
+            log.error(f"Enrichment service exception caught, exception - {e}")
+            raise
+
+    async def _async_get_packed_generated_answers(self, image_reqs: list[MediaEnrichmentRequest]) -> list[GeneratedResponse]:
+        if len(image_reqs) == 1:
+            return [await self._async_get_generated_answer(image_reqs[0])]
+
+        packed_req = image_reqs[0].model_copy(update={"images": [image_req.images[0] for image_req in image_reqs]})
+        with observe_duration(ENRICHMENT_STAGE_SECONDS, PACKED_MLLM_ENRICHMENT_STAGE) as observation:
+            try:
+                genai_response = await self._async_get_generated_answer(packed_req, packed=True)
+                descriptions = parse_packed_descriptions(genai_response.content, len(image_reqs))
+                return [GeneratedResponse(content=description) for description in descriptions]
+            except Exception as e:
+                # rate limiting, system failures and timeouts are raised, as more requests would only add to the load
+                if not _is_packed_request_error(e):
+                    raise
+
+                log.warning(f"Falling back to single image MLLM requests, as the packed request was rejected or its response could not be parsed, exception details - {e}")
+                observation.outcome = FALLBACK_OUTCOME
+
+        return await asyncio.gather(*[self._async_get_generated_answer(image_req) for image_req in image_reqs])
+
     def get_media_enrichment_result(self, req: MediaEnrichmentRequest):
         loop = asyncio.get_event_loop()
         return loop.run_until_complete(self.async_get_media_enrichment_result(req))
 
-    def _validate_media_enrichment_request(self, req: MediaEnrichmentRequest):
-        # making sure its a valid bas64 encoded image str
+    def _validate_media_enrichment_request(self, req: MediaEnrichmentRequest) -> list[bytes]:
+        # making sure its a valid bas64 encoded image str, and returning the decoded images so they are decoded only once
         supported_formats = ["png", "jpeg", "jpg"]
+        images_data = []
         try:
             for img in req.images:
-                if not get_image_format(img).lower() in supported_formats:
+                image_data = base64.b64decode(img)
+                if not get_image_format(image_data).lower() in supported_formats:
                     raise BadRequestError(Enrichment_Messages.IMAGE_INVALID_FORMAT_EXCEPTION_MESSAGE)
+                images_data.append(image_data)
+            return images_data
         except binascii.Error:
            raise BadRequestError(Enrichment_Messages.IMAGE_INVALID_BASE64_EXCEPTION_MESSAGE)
         except Exception as e:
            raise BadRequestError(Enrichment_Messages.IMAGE_INVALID_EXCEPTION_MESSAGE)
+
+
+def _is_packed_request_error(e: Exception) -> bool:
+    """
+    Checks whether a packed MLLM request failed because of the pack itself, either a response which is not the expected JSON,
+    or a client error such as a content filter rejection caused by one of its images, so its images can be described one by one.
+    """
+    if isinstance(e, ValueError):
+        return True
+
+    status_code = getattr(e, "status_code", None)
+    return isinstance(status_code, int) and BAD_REQUEST <= status_code < INTERNAL_SERVER_ERROR and status_code != TOO_MANY_REQUESTS
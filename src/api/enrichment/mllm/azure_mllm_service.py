@@ -1,42 +1,78 @@
-import openai
-import os
-from openai import AzureOpenAI
+import httpx
+from openai import AsyncAzureOpenAI
+from openai.types.chat import ChatCompletion
+from typing import Optional
 from enrichment.models.endpoint import GeneratedResponse
 from enrichment.config.enrichment_config import enrichment_config
+from enrichment.utils.client_loop import run_on_client_loop, run_on_client_loop_sync
 from enrichment.utils.files_util import get_image_format
-import asyncio
+from utils.metrics import MLLM_COMPLETION_TOKENS, MLLM_PROMPT_TOKENS, observe_tokens
+from utils.openai_endpoint_pool import get_openai_endpoint_pool
 
 class AzureMllmService:
+    '''
+    Calls the MLLM with a single long-lived async client, so the images of a batch are described concurrently
+    over pooled keep-alive connections instead of one at a time with a new TLS handshake each.
+    The client runs on the client loop of the enrichment, which outlives the event loops of the loaders.
+    '''
 
-    async def async_chat(self, images: list[str], prompt: str, kwargs: dict, detail_mode: str, model: str) -> GeneratedResponse:
+    def __init__(self):
+        self._client: Optional[AsyncAzureOpenAI] = None
+
+    async def async_chat(self, images: list[str], prompt: str, kwargs: dict, detail_mode: str, model: str, labels: Optional[list[str]] = None) -> GeneratedResponse:
+        completion = await run_on_client_loop(self._chat(images, prompt, kwargs, detail_mode, labels))
+        return self._to_response(completion)
+
+    def sync_chat(self, images: list[str], prompt: str, kwargs: dict, detail_mode: str) -> GeneratedResponse:
+        return self._to_response(run_on_client_loop_sync(self._chat(images, prompt, kwargs, detail_mode)))
+
+    async def _chat(self, images: list[str], prompt: str, kwargs: dict, detail_mode: str, labels: Optional[list[str]] = None) -> ChatCompletion:
         messages = []
         messages.append({ "role": "system", "content": prompt })
 
         content = []
-        for image in images:
+        for index, image in enumerate(images):
+            # the labels let the MLLM refer to each image of a packed request
+            if labels:
+                content.append({ "type": "text", "text": labels[index] })
             format = get_image_format(image).lower()
             content.append({ "type": "image_url", "image_url": { "url": f"data:image/{format};base64,{image}", "detail": detail_mode } })
 
         messages.append({ "role": "user", "content": content })
 
-        client = AzureOpenAI(
-            azure_endpoint = enrichment_config.mllm_endpoint,
-            azure_deployment = enrichment_config.mllm_model,
-            api_version = enrichment_config.mllm_api_version,
-            api_key = enrichment_config.mllm_key,
-        )
-
-        completion = client.chat.completions.create(
+        return await self._get_client().chat.completions.create(
             model = enrichment_config.mllm_model,
             messages = messages,
             **kwargs
         )
 
+    def _to_response(self, completion: ChatCompletion) -> GeneratedResponse:
+        # observed by the caller, in the context of its RAG config
+        if completion.usage:
+            observe_tokens(MLLM_PROMPT_TOKENS, completion.usage.prompt_tokens)
+            observe_tokens(MLLM_COMPLETION_TOKENS, completion.usage.completion_tokens)
+
         return GeneratedResponse(content=completion.choices[0].message.content.strip())
 
+    def _get_client(self) -> AsyncAzureOpenAI:
+        # only called on the loop of the client, so it is created once without a lock
+        if not self._client:
+            limits = httpx.Limits(
+                max_connections = enrichment_config.mllm_max_connections,
+                max_keepalive_connections = enrichment_config.mllm_max_connections,
+                keepalive_expiry = enrichment_config.mllm_keepalive_expiry_in_sec
+            )
+            endpoint_pool = get_openai_endpoint_pool()
+            transport = endpoint_pool.create_async_transport(limits) if endpoint_pool else httpx.AsyncHTTPTransport(limits=limits)
+
+            self._client = AsyncAzureOpenAI(
+                azure_endpoint = enrichment_config.mllm_endpoint,
+                azure_deployment = enrichment_config.mllm_model,
+                api_version = enrichment_config.mllm_api_version,
+                api_key = enrichment_config.mllm_key,
+                http_client = httpx.AsyncClient(transport=transport, follow_redirects=True),
+            )
 
-    def sync_chat(self, images: list[str], prompt: str, kwargs: dict, detail_mode: str) -> GeneratedResponse: 
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self.async_chat(images,prompt,kwargs,detail_mode))
+        return self._client
 
 azure_mllm_service = AzureMllmService()
@@ -0,0 +1,32 @@
+import json
+import re
+
+PACKED_DESCRIPTIONS_PROMPT = '''
+You are given {count} images, each preceded by its label, from "Image 1" to "Image {count}".
+Describe each image separately, following the instructions above, and answer only with a JSON object of the form
+{{"descriptions": ["<description of Image 1>", "<description of Image 2>", ...]}}
+with exactly {count} descriptions, in the order of the images.
+'''
+
+_CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+def get_packed_prompt(prompt: str, count: int) -> str:
+    return prompt + "\n" + PACKED_DESCRIPTIONS_PROMPT.format(count=count)
+
+def get_packed_image_labels(count: int) -> list[str]:
+    return [f"Image {index + 1}" for index in range(count)]
+
+def parse_packed_descriptions(content: str, count: int) -> list[str]:
+    '''
+    Parses the descriptions of a packed MLLM request, in the order of its images.
+
+    Raises:
+        ValueError: If the content is not a JSON object with a description for each image.
+    '''
+    packed_response = json.loads(_CODE_FENCE_PATTERN.sub('', content.strip()))
+    descriptions = packed_response.get("descriptions") if isinstance(packed_response, dict) else None
+
+    if not isinstance(descriptions, list) or len(descriptions) != count or not all(isinstance(d, str) for d in descriptions):
+        raise ValueError(f"The packed MLLM response does not have a description for each of the {count} images.")
+
+    return [description.strip() for description in descriptions]
@@ -1,5 +1,5 @@
 from typing import Optional, Literal
-from pydantic import BaseModel, conlist, constr
+from pydantic import BaseModel, conint, conlist, constr
 
 class Cache(BaseModel):
     enabled: bool
@@ -16,6 +16,7 @@ class Mllm(BaseModel):
     llm_kwargs: Optional[dict] = {}
     model: str
     detail_mode: Optional[Literal['low', 'high', 'auto']] = 'auto'
+    images_per_request: Optional[conint(ge=1, le=10)] = 1 # Images packed into a single MLLM request by the vision loaders
 
 class Features(BaseModel):
     cache: Cache
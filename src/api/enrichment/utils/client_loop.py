@@ -0,0 +1,34 @@
+import asyncio
+import threading
+from typing import Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+# the long-lived async clients of the enrichment run on an event loop of their own:
+# the loaders enrich each document on a new event loop, which would close the connections of a client created on it
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_loop_lock = threading.Lock()
+
+
+def get_client_loop() -> asyncio.AbstractEventLoop:
+    global _client_loop
+
+    if _client_loop:
+        return _client_loop
+
+    with _client_loop_lock:
+        if not _client_loop:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="enrichment-clients", daemon=True).start()
+            _client_loop = loop
+
+    return _client_loop
+
+
+async def run_on_client_loop(coroutine: Coroutine[None, None, T]) -> T:
+    # cancelling the caller also cancels the coroutine on the client loop
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, get_client_loop()))
+
+
+def run_on_client_loop_sync(coroutine: Coroutine[None, None, T]) -> T:
+    return asyncio.run_coroutine_threadsafe(coroutine, get_client_loop()).result()
@@ -3,14 +3,16 @@ import json
 import base64
 from io import BytesIO
 from PIL import Image
+from typing import Union
 
 def json_file_load(file_path):
     with open(file_path, 'r') as file:
         data = json.load(file)
         return data
 
-def get_image_format(base64_source: str):
-    image_stream = BytesIO(base64.b64decode(base64_source))
+def get_image_format(source: Union[str, bytes]):
+    # the base64 encoded image, or its already decoded bytes
+    image_stream = BytesIO(source if isinstance(source, bytes) else base64.b64decode(source))
     image = Image.open(image_stream)
     image_format = image.format
     return image_format
\ No newline at end of file
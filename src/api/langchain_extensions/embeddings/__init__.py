@@ -0,0 +1,3 @@
+from .batched_embeddings import BatchedEmbeddings
+from .cached_embeddings import CachedEmbeddings
+from .query_embeddings import QueryEmbeddings
@@ -0,0 +1,143 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from loguru import logger as log
+from openai import APITimeoutError
+from openai._resource import SyncAPIResource
+from typing import List, Optional
+
+from utils.token_counter import DEFAULT_ENCODING_NAME, count_tokens
+
+_RETRY_INITIAL_DELAY_SECONDS = 1.0
+_RETRY_MAX_DELAY_SECONDS = 60.0
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model to embed documents in batches packed by token count,
+    running up to `concurrency` batches at the same time and retrying each batch failing with a transient error on its own,
+    so a rate limit error on one batch does not lose the embeddings of the whole document.
+    The batches are embedded without the retries of the OpenAI client, so both retries do not multiply.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int,
+        batch_max_tokens: int,
+        concurrency: int,
+        max_retries: int,
+        encoding_name: str = DEFAULT_ENCODING_NAME,
+    ) -> None:
+        """
+        Creates a new BatchedEmbeddings.
+
+        Args:
+            embeddings (Embeddings): The wrapped embeddings model.
+            batch_size (int): The maximum number of texts per batch.
+            batch_max_tokens (int): The maximum number of tokens per batch, a longer text gets a batch of its own.
+            concurrency (int): The maximum number of batches embedded at the same time.
+            max_retries (int): The number of times a batch failing with a throttling, server or timeout error is retried,
+                after the `retry-after` delay of the response or with exponential backoff.
+            encoding_name (str): The tiktoken encoding used to count the tokens of the texts.
+        """
+        self.embeddings = embeddings
+        self.batch_embeddings = _without_client_retries(embeddings)
+        self.batch_size = max(batch_size, 1)
+        self.batch_max_tokens = batch_max_tokens
+        self.concurrency = max(concurrency, 1)
+        self.max_retries = max(max_retries, 0)
+        self.encoding_name = encoding_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = self._pack_batches(texts)
+        if len(batches) <= 1 or self.concurrency == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+
+        return [embedding for result in results for embedding in result]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+    def _pack_batches(self, texts: List[str]) -> List[List[str]]:
+        """
+        Packs consecutive texts into batches, keeping their order,
+        until a batch reaches either `batch_size` texts or `batch_max_tokens` tokens.
+        """
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        batch_tokens = 0
+
+        for text, text_tokens in zip(texts, count_tokens(texts, self.encoding_name)):
+            if batch and (len(batch) >= self.batch_size or batch_tokens + text_tokens > self.batch_max_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+
+            batch.append(text)
+            batch_tokens += text_tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        delay = _RETRY_INITIAL_DELAY_SECONDS
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.batch_embeddings.embed_documents(batch)
+            except Exception as e:
+                retry_delay = _get_retry_delay(e, delay)
+                if retry_delay is None or attempt == self.max_retries:
+                    raise
+
+                log.warning(f'Embedding batch of {len(batch)} texts failed, retrying in {retry_delay:.1f}s - {e}')
+                time.sleep(retry_delay)
+                delay *= 2
+
+
+def _without_client_retries(embeddings: Embeddings) -> Embeddings:
+    """
+    Returns a copy of an OpenAI embeddings model whose client does not retry failed requests,
+    or the embeddings model itself if it has no OpenAI client.
+    """
+    client = getattr(embeddings, "client", None)
+    if not isinstance(client, SyncAPIResource) or not hasattr(embeddings, "copy"):
+        return embeddings
+
+    embeddings = embeddings.copy()
+    embeddings.client = type(client)(client._client.with_options(max_retries=0))
+    return embeddings
+
+
+def _get_retry_delay(error: Exception, delay: float) -> Optional[float]:
+    """
+    Returns the delay before retrying a batch that failed with the given error, None if the error is not transient.
+    Only timeouts, `429 Too Many Requests` and server errors are retried, after the `retry-after` delay of the response if any.
+    """
+    if isinstance(error, (APITimeoutError, TimeoutError)):
+        return delay
+
+    status_code = getattr(error, "status_code", None)
+    if not isinstance(status_code, int) or (status_code != 429 and status_code < 500):
+        return None
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            retry_after = float(headers.get(header)) * scale
+        except (TypeError, ValueError):
+            continue
+
+        if 0 <= retry_after <= _RETRY_MAX_DELAY_SECONDS:
+            return retry_after
+
+    return delay
@@ -0,0 +1,67 @@
+import hashlib
+import unicodedata
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Protocol
+
+
+class EmbeddingStore(Protocol):
+    def get_many(self, namespace: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+        ...
+
+    def set_many(self, namespace: str, vectors: Dict[str, List[float]]):
+        ...
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes the unicode form and whitespace of a text.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def hash_text(text: str) -> str:
+    """
+    Hashes a text after normalizing its unicode form and whitespace,
+    so texts which only differ in formatting share the same cached vector.
+    """
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model to look up the vectors of documents in a store before embedding them,
+    so recurring chunks such as headers, footers or image descriptions are only embedded once per model.
+    Queries are passed through to the wrapped model.
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore, namespace: str) -> None:
+        """
+        Creates a new CachedEmbeddings.
+
+        Args:
+            embeddings (Embeddings): The wrapped embeddings model.
+            store (EmbeddingStore): The store of the cached vectors.
+            namespace (str): Identifies the embedding model and its settings in the store.
+        """
+        self.embeddings = embeddings
+        self.store = store
+        self.namespace = namespace
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        text_hashes = [hash_text(text) for text in texts]
+        vectors = self.store.get_many(self.namespace, text_hashes)
+
+        # embeds each missing text once, even if it is repeated
+        missing = {text_hash: text for text_hash, text in zip(text_hashes, texts) if text_hash not in vectors}
+        if missing:
+            embedded = dict(zip(missing.keys(), self.embeddings.embed_documents(list(missing.values()))))
+            self.store.set_many(self.namespace, embedded)
+            vectors.update(embedded)
+
+        return [vectors[text_hash] for text_hash in text_hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
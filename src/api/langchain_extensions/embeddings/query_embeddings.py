@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Optional, Set, Tuple
+
+from .cached_embeddings import normalize_text
+
+
+class QueryEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model to keep the vectors of the most recently embedded queries in memory,
+    and to merge the async query embeddings requested within `max_wait_seconds` of each other into one batched call,
+    so concurrent requests share an embedding call instead of each making their own.
+    Documents are passed through to the wrapped model, and queries are embedded with the query model,
+    so they are not stored in the cache of the documents.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache_size: int,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        query_embeddings: Optional[Embeddings] = None
+    ) -> None:
+        """
+        Creates a new QueryEmbeddings.
+
+        Args:
+            embeddings (Embeddings): The wrapped embeddings model.
+            cache_size (int): The number of query vectors kept in memory, 0 to disable the cache.
+            max_batch_size (int): The maximum number of queries embedded in one call, a full batch is embedded without waiting.
+            max_wait_seconds (float): How long the first query of a batch waits for other queries to join it.
+            query_embeddings (Optional[Embeddings]): The model of the queries, such as the model under a document cache, defaults to `embeddings`.
+        """
+        self.embeddings = embeddings
+        self.query_embeddings = query_embeddings or embeddings
+        self.cache_size = max(cache_size, 0)
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait_seconds = max(max_wait_seconds, 0)
+
+        self._vectors: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        # the queries waiting for the next batch, and the queries being embedded, by key, each with its text and the future of its vector
+        self._pending: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        # the running batches, referenced until they complete so they are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_text(text)
+        vector = self._get_cached(key)
+        if vector is None:
+            vector = self.query_embeddings.embed_query(text)
+            self._set_cached(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds many queries in one batched call, serving the recently embedded queries from memory.
+        """
+        keys = [normalize_text(text) for text in texts]
+        vectors = {key: self._get_cached(key) for key in keys}
+
+        # embeds each missing query once, even if it is repeated
+        missing = {key: text for key, text in zip(keys, texts) if vectors[key] is None}
+        if missing:
+            for key, vector in zip(missing.keys(), self.query_embeddings.embed_documents(list(missing.values()))):
+                self._set_cached(key, vector)
+                vectors[key] = vector
+
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_text(text)
+        vector = self._get_cached(key)
+        if vector is not None:
+            return vector
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # futures belong to a single event loop
+            self._loop = loop
+            self._pending = {}
+            self._in_flight = {}
+            self._tasks = set()
+            self._flush_handle = None
+
+        # identical queries waiting or being embedded share the same vector
+        _, future = self._pending.get(key) or self._in_flight.get(key) or (None, None)
+        if future is None:
+            future = loop.create_future()
+            self._pending[key] = (text, future)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.max_wait_seconds, self._flush)
+
+        # shielded, so a cancelled request does not fail the other requests of its batch
+        return list(await asyncio.shield(future))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, {}
+        if batch:
+            self._in_flight.update(batch)
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: Dict[str, Tuple[str, asyncio.Future]]):
+        try:
+            texts = [text for text, _ in batch.values()]
+            if len(texts) == 1:
+                vectors = [await self.query_embeddings.aembed_query(texts[0])]
+            else:
+                # a batch of queries is embedded as documents, which share the query embeddings of the Azure OpenAI models
+                vectors = await self.query_embeddings.aembed_documents(texts)
+            for (key, (_, future)), vector in zip(batch.items(), vectors):
+                self._set_cached(key, vector)
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key in batch:
+                self._in_flight.pop(key, None)
+
+    def _get_cached(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+            return vector
+
+    def _set_cached(self, key: str, vector: List[float]):
+        if not self.cache_size:
+            return
+
+        with self._lock:
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.cache_size:
+                self._vectors.popitem(last=False)
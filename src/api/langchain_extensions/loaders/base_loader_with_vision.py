@@ -97,100 +97,105 @@ class BaseVisionLoader(BaseLoader):
             Else nothing will be done and the langchain documents will be returned as is
         """
         try:
-                docs = self.load_file()
-
-                # If media enrichment is enabled then image annotations will be prcessed 
-                # else nothing will be done and the documents will be returned as is
-                total_start_time = timer()
-
-                documents = []
-                images_count = 0
-                for doc in docs:
-                    metadata = doc.metadata
-                    content = doc.page_content
-
-                    # If the document has images in it, it will have image_collection present in its metadata
-                    if "image_collection" in metadata:
-                        if self.vision_workflow:
-                            image_collection, content = self.remove_invalid_images(metadata["image_collection"], content)  
-                        else:
-                            image_collection = metadata["image_collection"]
-
-                        images_count = len(image_collection)
-                        metadata.pop("image_collection")
-
-                        image_collection_new = {}
-                        image_annotation_list = []
-
-                        # image_map contains all the images and their descirption if image is processed by MLLM
-                        start_time = timer()
-                        batch_size = self.determine_batch_size(len(image_collection))
-
-                        nest_asyncio.apply()
-                        image_map = asyncio.run(self.async_get_image_description_map(image_collection, self.media_enrichment, batch_size, content))
-
-                        end_time = timer()
-                        elapsed_time = end_time - start_time
-
-                        if image_map:
-                            log.debug(f"Image description generation took {elapsed_time:.4f} seconds for {len(image_map)} images.")
-
-                            for url in image_collection:
-                                image_marker = f"![{url}]"
-                                image_path = self.save_image(url, image_collection[url])
-                                image_annotation = f"({url})"
-                                desc = image_map[url]
-
-                                # only generate image docs if there is a description associated with image and the flag is enabled                           
-                                if self.separate_docs_for_images and desc:
-                                    img_doc_str = f"![{desc}]({url})"
-                                    doc_exists = any(existing_doc.page_content == img_doc_str for existing_doc in documents)
-                                    # check if image doc was already added before
-                                    if not doc_exists:
-                                        img_doc_metadata = metadata.copy()
-                                        img_doc_collection = {
-                                            url: {
-                                                "description": desc,
-                                                "image_path": image_path,
-                                                "positions": [{"start": 0, "end": len(img_doc_str) - 1}]
-                                            }
-                                        }
-                                        img_doc_metadata["image_collection"] = img_doc_collection
-                                        img_doc_metadata["content_document"] = False
-                                        documents.append(Document(page_content=img_doc_str, metadata=img_doc_metadata))
-                                # add description to content doc only if separate image docs are not created
-                                elif not self.separate_docs_for_images:
-                                    image_annotation = f'![{desc}]' + image_annotation
-
-                                # Replace all image markers with the full image annotation for each instance of the image in the doc
-                                # Initialize the new image collection dictionary with an entry for each image_url, but no positions info yet
-                                # Save image annotation to list
-                                content = content.replace(image_marker, image_annotation) # Replaces all instances of image_marker with image_annotation
-                                image_collection_new[url] = {"description": desc, 'positions': [], 'image_path': image_path}
-                                image_annotation_list.append((url, image_annotation))
-
-                            # Tterate over all image annotations now that content is finalized and calculate positions
-                            if content:
-                                for (img_url, annotation) in image_annotation_list:
-                                    content, image_collection_new = self.update_metadata_with_image_annotation_positions(content, annotation, image_collection_new, img_url)
-
-                            metadata["image_collection"] = image_collection_new
-                            metadata["content_document"] = True
-
-                        if content:
-                            documents.append(Document(page_content=content, metadata=metadata))
-
-                    # If no images in the document, just append the document as-is
-                    else:
-                        documents.append(doc)
-
-                    total_end_time = timer()
-                    elapsed_time = total_end_time - total_start_time
-                    log.debug(f"MHTML Vision load took {elapsed_time:.4f} seconds for {images_count} images.")
-                return documents
+            return self.enrich_documents(self.load_file())
         except Exception as e:
             log.error(f"MHTMLLoader exception occurred, exception details - {e}", exc_info=True)
 
+    def enrich_documents(self, docs: list[Document]) -> list[Document]:
+        """
+            Processes the image annotations of the documents returned by `load_file` using the enrichment service.
+            Kept separate from `load` so the ingestion flow can track loading and enrichment as individual stages.
+        """
+        # If media enrichment is enabled then image annotations will be prcessed 
+        # else nothing will be done and the documents will be returned as is
+        total_start_time = timer()
+
+        documents = []
+        images_count = 0
+        for doc in docs:
+            metadata = doc.metadata
+            content = doc.page_content
+
+            # If the document has images in it, it will have image_collection present in its metadata
+            if "image_collection" in metadata:
+                if self.vision_workflow:
+                    image_collection, content = self.remove_invalid_images(metadata["image_collection"], content)  
+                else:
+                    image_collection = metadata["image_collection"]
+
+                images_count = len(image_collection)
+                metadata.pop("image_collection")
+
+                image_collection_new = {}
+                image_annotation_list = []
+
+                # image_map contains all the images and their descirption if image is processed by MLLM
+                start_time = timer()
+                batch_size = self.determine_batch_size(len(image_collection))
+
+                nest_asyncio.apply()
+                image_map = asyncio.run(self.async_get_image_description_map(image_collection, self.media_enrichment, batch_size, content))
+
+                end_time = timer()
+                elapsed_time = end_time - start_time
+
+                if image_map:
+                    log.debug(f"Image description generation took {elapsed_time:.4f} seconds for {len(image_map)} images.")
+
+                    for url in image_collection:
+                        image_marker = f"![{url}]"
+                        image_path = self.save_image(url, image_collection[url])
+                        image_annotation = f"({url})"
+                        desc = image_map[url]
+
+                        # only generate image docs if there is a description associated with image and the flag is enabled                           
+                        if self.separate_docs_for_images and desc:
+                            img_doc_str = f"![{desc}]({url})"
+                            doc_exists = any(existing_doc.page_content == img_doc_str for existing_doc in documents)
+                            # check if image doc was already added before
+                            if not doc_exists:
+                                img_doc_metadata = metadata.copy()
+                                img_doc_collection = {
+                                    url: {
+                                        "description": desc,
+                                        "image_path": image_path,
+                                        "positions": [{"start": 0, "end": len(img_doc_str) - 1}]
+                                    }
+                                }
+                                img_doc_metadata["image_collection"] = img_doc_collection
+                                img_doc_metadata["content_document"] = False
+                                documents.append(Document(page_content=img_doc_str, metadata=img_doc_metadata))
+                        # add description to content doc only if separate image docs are not created
+                        elif not self.separate_docs_for_images:
+                            image_annotation = f'![{desc}]' + image_annotation
+
+                        # Replace all image markers with the full image annotation for each instance of the image in the doc
+                        # Initialize the new image collection dictionary with an entry for each image_url, but no positions info yet
+                        # Save image annotation to list
+                        content = content.replace(image_marker, image_annotation) # Replaces all instances of image_marker with image_annotation
+                        image_collection_new[url] = {"description": desc, 'positions': [], 'image_path': image_path}
+                        image_annotation_list.append((url, image_annotation))
+
+                    # Tterate over all image annotations now that content is finalized and calculate positions
+                    if content:
+                        for (img_url, annotation) in image_annotation_list:
+                            content, image_collection_new = self.update_metadata_with_image_annotation_positions(content, annotation, image_collection_new, img_url)
+
+                    metadata["image_collection"] = image_collection_new
+                    metadata["content_document"] = True
+
+                if content:
+                    documents.append(Document(page_content=content, metadata=metadata))
+
+            # If no images in the document, just append the document as-is
+            else:
+                documents.append(doc)
+
+            total_end_time = timer()
+            elapsed_time = total_end_time - total_start_time
+            log.debug(f"MHTML Vision load took {elapsed_time:.4f} seconds for {images_count} images.")
+        return documents
+
     def get_surrounding_text(self, keyword, text):
         # Find all occurrences of the keyword in the text
         image_pattern = r'!\[[^\]]*\]'
@@ -278,25 +283,34 @@ class BaseVisionLoader(BaseLoader):
         if __debug__:
             batch_loop_count = 0
 
+        # when packing is enabled, each task describes a pack of images in a single MLLM request
+        images_per_request = self.get_images_per_request(media_enrichment)
+        urls = list(image_collection)
+        url_packs = [urls[start:start + images_per_request] for start in range(0, len(urls), images_per_request)]
+
         try:
-            for url in image_collection:
-                img_b64 = image_collection[url]
+            for url_pack in url_packs:
                 # this is needed for concurrent calls
                 media_enrichment_copy =  copy.deepcopy(media_enrichment)
-                surrounding_text = ''
-                if self.surrounding_text_start and self.surrounding_text_end:
-                    surrounding_text = self.get_surrounding_text(url, content)
-                # Store URL along with its corresponding task
-                tasks.append((url, self.async_get_image_description(img_b64, media_enrichment_copy, surrounding_text)))
+                if images_per_request > 1:
+                    task = self.async_get_packed_image_descriptions([image_collection[url] for url in url_pack], media_enrichment_copy)
+                else:
+                    url = url_pack[0]
+                    surrounding_text = ''
+                    if self.surrounding_text_start and self.surrounding_text_end:
+                        surrounding_text = self.get_surrounding_text(url, content)
+                    task = self.async_get_image_descriptions(image_collection[url], media_enrichment_copy, surrounding_text)
+                # Store URLs along with their corresponding task
+                tasks.append((url_pack, task))
                 
                 if len(tasks) >= batch_size: # Limit to batch_size concurrent tasks
                     responses = await asyncio.gather(*[task for _, task in tasks])
                     
-                    for url, response in zip([url for url, _ in tasks], responses):
-                        results[url] = response
+                    for url_pack, response in zip([url_pack for url_pack, _ in tasks], responses):
+                        results.update(zip(url_pack, response))
 
                     if __debug__:
-                        total_count = len(image_collection)
+                        total_count = len(url_packs)
                         batch_loop_count = batch_loop_count + 1
                         log.debug(f"Finished executing concurrent task {batch_loop_count} of {round(total_count/batch_size)}")
                     tasks.clear()
@@ -304,11 +318,11 @@ class BaseVisionLoader(BaseLoader):
             # Gather any remaining tasks
             if tasks:
                 responses = await asyncio.gather(*[task for _, task in tasks])
-                for url, response in zip([url for url, _ in tasks], responses):
-                    results[url] = response
+                for url_pack, response in zip([url_pack for url_pack, _ in tasks], responses):
+                    results.update(zip(url_pack, response))
 
                 if __debug__:
-                    total_count = len(image_collection)
+                    total_count = len(url_packs)
                     batch_loop_count = batch_loop_count + 1
                     log.debug(f"Finished executing concurrent task {batch_loop_count} calls of {round(total_count/batch_size)}")
 
@@ -351,6 +365,40 @@ class BaseVisionLoader(BaseLoader):
                 raise e # Re-raise the exception after logging     
 
 
+    async def async_get_image_descriptions(self, img_b64, media_enrichment, surrounding_text):
+        return [await self.async_get_image_description(img_b64, media_enrichment, surrounding_text)]
+
+    async def async_get_packed_image_descriptions(self, imgs_b64, media_enrichment):
+        """
+        Get the descriptions of the given images using media enrichment, packing them into a single MLLM request.
+        The enrichment service falls back to single image requests if the packed response cannot be parsed.
+
+        Args:
+            imgs_b64 (list[str]): The base 64 encode image strings.
+            media_enrichment (MediaEnrichmentRequest): The media enrichment configuration.
+
+        Returns:
+            list[str]: The descriptions generated for the images, in the same order.
+        """
+        try:
+            media_enrichment.images = imgs_b64
+            resps = await self.enrichment_service.async_get_media_enrichment_results(media_enrichment)
+            return [resp.generated_response.content if resp.generated_response else "" for resp in resps]
+        except asyncio.CancelledError:
+            log.error(f"MHTMLLoader exception occurred as one of the other request is cancelled")
+        except Exception as e:
+            log.error(f"MHTMLLoader exception occurred when calling enrichment services, exception details - {e}", exc_info=True)
+            # system failures and rate limiting exceptions will cancel out the other requests
+            if hasattr(e, 'status_code') and (e.status_code >= INTERNAL_SERVER_ERROR or e.status_code == TOO_MANY_REQUESTS) :
+                raise e # Re-raise the exception after logging
+        return [None] * len(imgs_b64)
+
+    def get_images_per_request(self, media_enrichment):
+        if not media_enrichment or not media_enrichment.features.mllm.enabled:
+            return 1
+
+        return media_enrichment.features.mllm.images_per_request or 1
+
     def save_image(self, url: str, image_base64: str) -> str:
         os.makedirs(self.destination_image_folder, exist_ok=True)
         
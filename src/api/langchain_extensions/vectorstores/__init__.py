@@ -0,0 +1 @@
+from .local_vector_store import LocalVectorStore
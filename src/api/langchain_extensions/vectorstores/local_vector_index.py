@@ -0,0 +1,457 @@
+import json
+import numpy as np
+import os
+import sqlite3
+import threading
+from langchain_core.documents import Document
+from loguru import logger
+from typing import Optional
+
+
+_VECTORS_FILE_NAME = "vectors.f32"
+_METADATA_FILE_NAME = "metadata.sqlite"
+_CENTROIDS_FILE_NAME = "ivf_centroids.npy"
+_MIN_CAPACITY = 1024
+# the clusters are only trained once the index holds enough vectors per cluster, smaller indexes are searched exhaustively
+_IVF_MIN_VECTORS_PER_LIST = 8
+_IVF_TRAINING_SAMPLE_PER_LIST = 256
+_IVF_TRAINING_ITERATIONS = 10
+# the clusters are retrained once the index has doubled since they were trained
+_IVF_RETRAIN_GROWTH_FACTOR = 2
+_ASSIGNMENT_CHUNK_SIZE = 65536
+# the background assignment of the clusters is repeated if writes rewrote rows meanwhile, then run under the lock
+_IVF_ASSIGNMENT_ATTEMPTS = 3
+_SQLITE_MAX_VARIABLES = 500
+
+
+class _IndexSnapshot(object):
+    """
+    The state of the index searched without its lock: its first `count` vectors, and their clusters if trained.
+    Appending rows never changes the rows of a snapshot, but deleting or replacing rows does, which increments `rewrites`.
+    """
+    count: int
+    vectors: Optional[np.memmap]
+    centroids: Optional[np.ndarray]
+    assignments: Optional[np.ndarray]
+    rewrites: int
+
+    def __init__(
+        self,
+        count: int,
+        vectors: Optional[np.memmap],
+        centroids: Optional[np.ndarray],
+        assignments: Optional[np.ndarray],
+        rewrites: int
+    ):
+        self.count = count
+        self.vectors = vectors
+        self.centroids = centroids
+        self.assignments = assignments
+        self.rewrites = rewrites
+
+
+class LocalVectorIndex(object):
+    """
+    An on-disk vector index for single node deployments.
+    Vectors are normalized and stored as the rows of a memory-mapped float32 matrix, so the cosine similarity is a dot product,
+    and the key, content and metadata of each row are stored in a SQLite sidecar.
+    Deleted rows are filled with the last row, so the first `count` rows of the matrix are always the indexed vectors.
+    Searches either compare the query with every vector, or with the vectors of the closest clusters (IVF).
+    Searches do not take the lock of the writes: they read the snapshot published by the last write,
+    and are only repeated under the lock if a write rewrote the rows of their snapshot in the meantime.
+    The clusters are trained in a background thread, and searched exhaustively until then.
+    """
+    _path: str
+    _lock: threading.Lock
+    _connection: sqlite3.Connection
+    _read_connections: threading.local
+    _dimensions: Optional[int]
+    _vectors: Optional[np.memmap]
+    _keys: list[str]
+    _rows: dict[str, int]
+    _centroids: Optional[np.ndarray]
+    _assignments: Optional[np.ndarray]
+    _trained_count: int
+    _rewrites: int
+    _snapshot: _IndexSnapshot
+    _ivf_nlist: Optional[int]
+    _training_lock: threading.Lock
+    _training: Optional[threading.Thread]
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(os.path.join(path, _METADATA_FILE_NAME), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "row INTEGER PRIMARY KEY, "
+            "key TEXT NOT NULL UNIQUE, "
+            "content TEXT NOT NULL, "
+            "metadata TEXT NOT NULL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._connection.commit()
+        # the searches read the committed documents with a connection of their own thread
+        self._read_connections = threading.local()
+
+        self._keys = [key for key, in self._connection.execute("SELECT key FROM documents ORDER BY row")]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+
+        dimensions = self._connection.execute("SELECT value FROM settings WHERE name = 'dimensions'").fetchone()
+        self._dimensions = int(dimensions[0]) if dimensions else None
+        self._vectors = None
+        if self._dimensions:
+            vectors_path = os.path.join(path, _VECTORS_FILE_NAME)
+            capacity = os.path.getsize(vectors_path) // (self._dimensions * np.dtype(np.float32).itemsize)
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dimensions))
+
+        centroids_path = os.path.join(path, _CENTROIDS_FILE_NAME)
+        self._centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        self._assignments = None
+        self._trained_count = len(self._keys)
+        self._rewrites = 0
+        self._ivf_nlist = None
+        self._training_lock = threading.Lock()
+        self._training = None
+        self._publish()
+
+        logger.debug(f"Loaded local vector index {path} with {len(self._keys)} vectors")
+
+    @property
+    def count(self) -> int:
+        return self._snapshot.count
+
+    def upsert(self, keys: list[str], documents: list[Document], vectors: list[list[float]]):
+        """
+        Adds or replaces documents and their vectors, and persists them.
+
+        Args:
+            keys (list[str]): The key of each document.
+            documents (list[Document]): The documents.
+            vectors (list[list[float]]): The embedding of each document.
+        """
+        if not keys:
+            return
+
+        normalized_vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            dimensions = self._dimensions or normalized_vectors.shape[1]
+            if normalized_vectors.shape[1] != dimensions:
+                raise ValueError(f"Expected vectors of {dimensions} dimensions, got {normalized_vectors.shape[1]}")
+
+            # the rows of the new keys are only reserved until the documents are written
+            reserved_rows: dict[str, int] = {}
+            rows: list[int] = []
+            for key in keys:
+                row = self._rows.get(key, reserved_rows.get(key))
+                if row is None:
+                    row = len(self._keys) + len(reserved_rows)
+                    reserved_rows[key] = row
+                rows.append(row)
+
+            try:
+                if self._dimensions is None:
+                    self._connection.execute("INSERT INTO settings VALUES ('dimensions', ?)", [str(dimensions)])
+                self._ensure_capacity(len(self._keys) + len(reserved_rows), dimensions)
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                    [
+                        (row, key, doc.page_content, json.dumps(doc.metadata))
+                        for row, key, doc in zip(rows, keys, documents)
+                    ]
+                )
+            except BaseException:
+                self._connection.rollback()
+                raise
+
+            self._dimensions = dimensions
+            if any(key in self._rows for key in keys):
+                # the replaced rows are rewritten in place, so the searches of the current snapshot are repeated
+                self._rewrites += 1
+            self._vectors[rows] = normalized_vectors
+            for key, row in sorted(reserved_rows.items(), key=lambda item: item[1]):
+                self._keys.append(key)
+                self._rows[key] = row
+
+            if self._assignments is not None:
+                # a new array, so the assignments of the current snapshot do not change
+                self._assignments = np.resize(self._assignments, len(self._keys))
+                self._assignments[rows] = np.argmax(normalized_vectors @ self._centroids.T, axis=1)
+
+            self._persist()
+
+        if self._ivf_nlist:
+            self._schedule_ivf_training(self._ivf_nlist)
+
+    def delete(self, keys: list[str]):
+        """
+        Deletes documents and their vectors, and persists the index.
+
+        Args:
+            keys (list[str]): The keys of the documents to delete, unknown keys are ignored.
+        """
+        with self._lock:
+            if not any(key in self._rows for key in keys):
+                return
+
+            # the rows are moved in place, so the searches of the current snapshot are repeated
+            self._rewrites += 1
+            if self._assignments is not None:
+                # a new array, as searching assignments which change meanwhile can fail and not only return stale rows
+                self._assignments = self._assignments.copy()
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is None:
+                    continue
+
+                self._connection.execute("DELETE FROM documents WHERE row = ?", [row])
+                last_row = len(self._keys) - 1
+                last_key = self._keys.pop()
+                if row != last_row:
+                    # moves the last row into the deleted row, keeping the matrix dense
+                    self._vectors[row] = self._vectors[last_row]
+                    self._keys[row] = last_key
+                    self._rows[last_key] = row
+                    self._connection.execute("UPDATE documents SET row = ? WHERE row = ?", [row, last_row])
+                    if self._assignments is not None:
+                        self._assignments[row] = self._assignments[last_row]
+
+            if self._assignments is not None:
+                self._assignments = self._assignments[:len(self._keys)]
+
+            self._persist()
+
+    def search(
+        self,
+        vector: list[float],
+        k: int,
+        ivf_nlist: Optional[int] = None,
+        ivf_nprobe: int = 1
+    ) -> list[tuple[Document, float]]:
+        """
+        Returns the documents with the highest cosine similarity to a vector.
+
+        Args:
+            vector (list[float]): The query vector.
+            k (int): The number of documents to return.
+            ivf_nlist (Optional[int]): The number of clusters of an IVF search, None for an exhaustive search.
+            ivf_nprobe (int): The number of closest clusters whose vectors are compared with the query in an IVF search.
+
+        Returns:
+            list[tuple[Document, float]]: The documents and their similarity, from the most similar.
+        """
+        rows, similarities, documents, _ = self._search(vector, k, ivf_nlist, ivf_nprobe, False)
+        return [(documents[row], similarity) for row, similarity in zip(rows, similarities)]
+
+    def search_with_vectors(
+        self,
+        vector: list[float],
+        k: int,
+        ivf_nlist: Optional[int] = None,
+        ivf_nprobe: int = 1
+    ) -> list[tuple[Document, list[float]]]:
+        """
+        Returns the documents with the highest cosine similarity to a vector, with their normalized vectors.
+        The arguments are the same as `search`.
+        """
+        rows, _, documents, vectors = self._search(vector, k, ivf_nlist, ivf_nprobe, True)
+        return [(documents[row], row_vector) for row, row_vector in zip(rows, vectors)]
+
+    def _search(
+        self,
+        vector: list[float],
+        k: int,
+        ivf_nlist: Optional[int],
+        ivf_nprobe: int,
+        with_vectors: bool
+    ) -> tuple[list[int], list[float], dict[int, Document], list[list[float]]]:
+        if ivf_nlist:
+            self._schedule_ivf_training(ivf_nlist)
+
+        snapshot = self._snapshot
+        result = self._search_snapshot(snapshot, vector, k, ivf_nlist, ivf_nprobe, with_vectors)
+        if snapshot.rewrites == self._rewrites:
+            return result
+
+        # a write moved or replaced rows of the snapshot during the search
+        with self._lock:
+            return self._search_snapshot(self._snapshot, vector, k, ivf_nlist, ivf_nprobe, with_vectors)
+
+    def _search_snapshot(
+        self,
+        snapshot: _IndexSnapshot,
+        vector: list[float],
+        k: int,
+        ivf_nlist: Optional[int],
+        ivf_nprobe: int,
+        with_vectors: bool
+    ) -> tuple[list[int], list[float], dict[int, Document], list[list[float]]]:
+        query = _normalize(np.asarray(vector, dtype=np.float32)[None, :])[0]
+        count = snapshot.count
+        if not count:
+            return [], [], {}, []
+
+        candidates = None
+        if (
+            ivf_nlist and
+            snapshot.assignments is not None and
+            len(snapshot.centroids) == ivf_nlist and
+            count >= ivf_nlist * _IVF_MIN_VECTORS_PER_LIST
+        ):
+            probed_lists = np.argsort(snapshot.centroids @ query)[-ivf_nprobe:]
+            candidates = np.flatnonzero(np.isin(snapshot.assignments[:count], probed_lists))
+
+        if candidates is None:
+            similarities = snapshot.vectors[:count] @ query
+        else:
+            similarities = snapshot.vectors[candidates] @ query
+
+        top = min(k, len(similarities))
+        if not top:
+            return [], [], {}, []
+        best = np.argpartition(-similarities, top - 1)[:top]
+        best = best[np.argsort(-similarities[best])]
+        rows = [int(candidates[i]) if candidates is not None else int(i) for i in best]
+        vectors = snapshot.vectors[rows].tolist() if with_vectors else []
+        return rows, [float(similarities[i]) for i in best], self._read_documents(rows), vectors
+
+    def _read_documents(self, rows: list[int]) -> dict[int, Document]:
+        connection = getattr(self._read_connections, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self._path, _METADATA_FILE_NAME))
+            self._read_connections.connection = connection
+
+        documents: dict[int, Document] = {}
+        for i in range(0, len(rows), _SQLITE_MAX_VARIABLES):
+            batch = rows[i:i + _SQLITE_MAX_VARIABLES]
+            for row, content, metadata in connection.execute(
+                f"SELECT row, content, metadata FROM documents WHERE row IN ({','.join('?' * len(batch))})",
+                batch
+            ):
+                documents[row] = Document(page_content=content, metadata=json.loads(metadata))
+        return documents
+
+    def _ensure_capacity(self, count: int, dimensions: int):
+        capacity = self._vectors.shape[0] if self._vectors is not None else 0
+        if capacity >= count:
+            return
+
+        new_capacity = max(count, capacity * 2, _MIN_CAPACITY)
+        vectors_path = os.path.join(self._path, _VECTORS_FILE_NAME)
+        if self._vectors is not None:
+            # the searches of the current snapshot keep reading the previous mapping of the file
+            self._vectors.flush()
+            self._vectors = None
+
+        with open(vectors_path, "ab") as f:
+            f.truncate(new_capacity * dimensions * np.dtype(np.float32).itemsize)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, dimensions))
+
+    def _schedule_ivf_training(self, nlist: int):
+        """
+        Trains or assigns the clusters in a background thread if they are missing, of another size, or stale.
+        """
+        self._ivf_nlist = nlist
+        snapshot = self._snapshot
+        if snapshot.count < nlist * _IVF_MIN_VECTORS_PER_LIST:
+            return
+        if (
+            snapshot.assignments is not None and
+            len(snapshot.centroids) == nlist and
+            snapshot.count <= self._trained_count * _IVF_RETRAIN_GROWTH_FACTOR
+        ):
+            return
+
+        with self._training_lock:
+            if self._training and self._training.is_alive():
+                return
+            self._training = threading.Thread(target=self._train_ivf, args=(nlist,), name="local-vector-index-ivf", daemon=True)
+            self._training.start()
+
+    def _train_ivf(self, nlist: int):
+        try:
+            snapshot = self._snapshot
+            centroids = snapshot.centroids
+            trained = centroids is None or len(centroids) != nlist or snapshot.count > self._trained_count * _IVF_RETRAIN_GROWTH_FACTOR
+            if trained:
+                centroids = _train_centroids(snapshot.vectors, snapshot.count, nlist)
+                logger.info(f"Trained {nlist} clusters on {snapshot.count} vectors of the local vector index {self._path}")
+
+            for _ in range(_IVF_ASSIGNMENT_ATTEMPTS):
+                snapshot = self._snapshot
+                assignments = _assign(snapshot.vectors, 0, snapshot.count, centroids)
+                with self._lock:
+                    if self._rewrites == snapshot.rewrites:
+                        # only the rows appended since the snapshot are left to assign
+                        count = len(self._keys)
+                        self._swap_ivf(centroids, np.concatenate([assignments, _assign(self._vectors, snapshot.count, count, centroids)]), trained, snapshot.count)
+                        return
+
+            with self._lock:
+                self._swap_ivf(centroids, _assign(self._vectors, 0, len(self._keys), centroids), trained, len(self._keys))
+        except Exception as e:
+            logger.error(f"Failed to train the clusters of the local vector index {self._path}, exception details - {e}")
+
+    def _swap_ivf(self, centroids: np.ndarray, assignments: np.ndarray, trained: bool, trained_count: int):
+        self._centroids = centroids
+        self._assignments = assignments
+        if trained:
+            self._trained_count = trained_count
+            np.save(os.path.join(self._path, _CENTROIDS_FILE_NAME), centroids)
+        self._publish()
+
+    def _persist(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._connection.commit()
+        self._publish()
+
+    def _publish(self):
+        self._snapshot = _IndexSnapshot(len(self._keys), self._vectors, self._centroids, self._assignments, self._rewrites)
+
+
+def _train_centroids(vectors: np.memmap, count: int, nlist: int) -> np.ndarray:
+    # spherical k-means on a sample of the vectors
+    rng = np.random.default_rng(0)
+    sample = np.asarray(vectors[np.sort(rng.choice(count, min(count, nlist * _IVF_TRAINING_SAMPLE_PER_LIST), replace=False))])
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(_IVF_TRAINING_ITERATIONS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        for i in range(nlist):
+            members = sample[labels == i]
+            if len(members):
+                centroids[i] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def _assign(vectors: Optional[np.memmap], start: int, end: int, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(end - start, dtype=np.int32)
+    for i in range(start, end, _ASSIGNMENT_CHUNK_SIZE):
+        assignments[i - start:min(i + _ASSIGNMENT_CHUNK_SIZE, end) - start] = np.argmax(vectors[i:min(i + _ASSIGNMENT_CHUNK_SIZE, end)] @ centroids.T, axis=1)
+    return assignments
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+_local_vector_indexes: dict[str, LocalVectorIndex] = {}
+_local_vector_indexes_lock = threading.Lock()
+
+
+def get_local_vector_index(path: str) -> LocalVectorIndex:
+    """
+    Returns the index stored at a path, loading it on first use.
+    The index of a path is shared by all the vector stores of the process, so concurrent writers never diverge.
+    """
+    path = os.path.abspath(path)
+    with _local_vector_indexes_lock:
+        if path not in _local_vector_indexes:
+            _local_vector_indexes[path] = LocalVectorIndex(path)
+        return _local_vector_indexes[path]
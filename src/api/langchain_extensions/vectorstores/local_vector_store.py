@@ -0,0 +1,95 @@
+import uuid
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .local_vector_index import LocalVectorIndex
+
+
+class LocalVectorStore(VectorStore):
+    """
+    A LangChain vector store over a `LocalVectorIndex`, searched in-process without any network call besides the query embedding.
+    Every search type runs a vector similarity search.
+    """
+
+    def __init__(
+        self,
+        index: LocalVectorIndex,
+        embedding_function: Embeddings,
+        ivf_nlist: Optional[int] = None,
+        ivf_nprobe: int = 1
+    ) -> None:
+        """
+        Creates a new LocalVectorStore.
+
+        Args:
+            index (LocalVectorIndex): The index storing the vectors and documents.
+            embedding_function (Embeddings): Embeds the queries and added texts.
+            ivf_nlist (Optional[int]): The number of clusters of IVF searches, None for exhaustive searches.
+            ivf_nprobe (int): The number of closest clusters searched by IVF searches.
+        """
+        self.index = index
+        self.embedding_function = embedding_function
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding_function
+
+    def add_embeddings(
+        self,
+        documents: List[Document],
+        embeddings: List[List[float]],
+        keys: Optional[List[str]] = None
+    ) -> List[str]:
+        keys = keys or [str(uuid.uuid4()) for _ in documents]
+        self.index.upsert(keys, documents, embeddings)
+        return keys
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        documents = [
+            Document(page_content=text, metadata=metadatas[i] if metadatas else {})
+            for i, text in enumerate(texts)
+        ]
+        return self.add_embeddings(documents, self.embedding_function.embed_documents(texts), kwargs.get("keys"))
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        self.index.delete(ids or [])
+        return True
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.index.search(self.embedding_function.embed_query(query), k, self.ivf_nlist, self.ivf_nprobe)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.index.search(embedding, k, self.ivf_nlist, self.ivf_nprobe)]
+
+    def similarity_search_with_vectors_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, List[float]]]:
+        return self.index.search_with_vectors(embedding, k, self.ivf_nlist, self.ivf_nprobe)
+
+    def _select_relevance_score_fn(self):
+        # the scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1) / 2
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any
+    ) -> "LocalVectorStore":
+        index: LocalVectorIndex = kwargs.pop("index")
+        vector_store = cls(index, embedding, **kwargs)
+        vector_store.add_texts(texts, metadatas)
+        return vector_store
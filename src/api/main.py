@@ -1,13 +1,25 @@
-from configs.config import config
+from configs.config import config as app_config
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
+from middlewares.request_size_limit import RequestSizeLimitMiddleware
 from routers import rag
 from routers import config
+from routers import metrics
+from services.cosmos_config_manager import aclose_cosmos_config_manager
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await aclose_cosmos_config_manager()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestSizeLimitMiddleware, paths=["/rag/upload"], max_size_bytes=app_config.upload_max_request_size_bytes)
 app.include_router(rag.router)
 app.include_router(config.router)
+app.include_router(metrics.router)
 
 
 if __name__ == "__main__":
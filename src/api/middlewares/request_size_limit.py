@@ -0,0 +1,65 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Limits the size of the request bodies sent to the given paths while they are received,
+    before FastAPI parses them, so an oversized multipart upload is rejected without being spooled to disk first.
+    """
+
+    def __init__(self, app: ASGIApp, paths: list[str], max_size_bytes: int) -> None:
+        """
+        Creates a new RequestSizeLimitMiddleware.
+
+        Args:
+            app (ASGIApp): The wrapped application.
+            paths (list[str]): The paths of the requests whose body is limited.
+            max_size_bytes (int): The maximum number of bytes of a request body.
+        """
+        self.app = app
+        self.paths = set(paths)
+        self.max_size_bytes = max_size_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            content_length = self._get_content_length(scope)
+            if content_length is not None and content_length > self.max_size_bytes:
+                raise self._too_large_error()
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code)(scope, receive, send)
+            return
+
+        received_bytes = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                # a client may send more than its Content-Length, or no Content-Length at all
+                if received_bytes > self.max_size_bytes:
+                    # FastAPI raises an HTTPException raised while reading the body again instead of turning it into a 400
+                    raise self._too_large_error()
+
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _get_content_length(self, scope: Scope) -> int | None:
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if not value.isdigit():
+                    raise HTTPException(status_code=400, detail="The Content-Length header must be a non-negative integer")
+
+                return int(value)
+
+        return None
+
+    def _too_large_error(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"The upload exceeds the request limit of {self.max_size_bytes} bytes")
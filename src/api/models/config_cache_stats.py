@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class ConfigCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    point_reads: int = 0
+    queries: int = 0
+    entries: int = 0
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class EmbeddingCacheStats(BaseModel):
+    enabled: bool
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+    max_size_bytes: int = 0
@@ -0,0 +1,60 @@
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class IngestionJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class FileIngestionStatus(str, Enum):
+    PENDING = "pending"
+    LOADED = "loaded"
+    ENRICHED = "enriched"
+    SPLIT = "split"
+    INDEXED = "indexed"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class FileIngestionProgress(BaseModel):
+    file_name: str
+    status: FileIngestionStatus = FileIngestionStatus.PENDING
+    chunk_count: Optional[int] = None
+    timings: Dict[str, float] = {}
+    error: Optional[str] = None
+
+
+class IngestionStageMetrics(BaseModel):
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    throughput_per_second: float = 0.0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+
+
+class IngestionJob(BaseModel):
+    id: str
+    rag_config: str
+    status: IngestionJobStatus = IngestionJobStatus.QUEUED
+    files: List[FileIngestionProgress]
+    stage_metrics: Dict[str, IngestionStageMetrics] = {}
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (
+            IngestionJobStatus.SUCCEEDED,
+            IngestionJobStatus.FAILED,
+            IngestionJobStatus.CANCELLED
+        )
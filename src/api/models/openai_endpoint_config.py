@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class OpenAIEndpointConfig(BaseModel):
+    endpoint: str
+    # defaults to the key of the request, i.e. `AZURE_OPENAI_API_KEY` or the key of the RAG config
+    api_key: Optional[str] = None
+    weight: float = 1.0
+    # maps the deployments served by the endpoint to their name on it, all deployments are served under their own name if not set
+    deployments: Optional[Dict[str, str]] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Any, Dict, Optional
+from pydantic import BaseModel, confloat
+from typing import Any, Dict, Literal, Optional
 
 from constants import RagConstants
 from enrichment.models.endpoint import MediaEnrichmentRequest
@@ -14,6 +14,13 @@ class EmbeddingConfig(BaseModel):
     embedding_model_name: str
     embedding_model_kwargs: Dict[str, Any] = {}
 
+    # documents are embedded in batches of at most `batch_size` chunks and `batch_max_tokens` tokens,
+    # running up to `concurrency` batches at the same time and retrying each failed batch up to `max_retries` times
+    batch_size: int = RagConstants.DEFAULT_EMBEDDING_BATCH_SIZE
+    batch_max_tokens: int = RagConstants.DEFAULT_EMBEDDING_BATCH_MAX_TOKENS
+    concurrency: int = RagConstants.DEFAULT_EMBEDDING_CONCURRENCY
+    max_retries: int = RagConstants.DEFAULT_EMBEDDING_MAX_RETRIES
+
 
 class SplitterConfig(BaseModel):
     splitter_name: str
@@ -24,19 +31,67 @@ class SearchConfig(BaseModel):
     search_type: str = RagConstants.DEFAULT_SEARCH_TYPE
     search_k: int = RagConstants.DEFAULT_SEARCH_K
 
+    # `azure_search` searches an Azure AI Search index, `local` searches an in-process index stored under `LOCAL_VECTOR_STORE_PATH`
+    backend: Literal["azure_search", "local"] = RagConstants.DEFAULT_SEARCH_BACKEND
+
+    # the settings below only apply to the `local` backend, which always runs a vector similarity search:
+    # `flat` compares the query with every vector, `ivf` only with the vectors of the `ivf_nprobe` closest of `ivf_nlist` clusters
+    local_index_type: Literal["flat", "ivf"] = RagConstants.DEFAULT_LOCAL_INDEX_TYPE
+    ivf_nlist: int = RagConstants.DEFAULT_IVF_NLIST
+    ivf_nprobe: int = RagConstants.DEFAULT_IVF_NPROBE
+
+    # with `rerank_candidates` set, that many candidates are fetched with their stored vectors and reranked locally
+    # by their cosine similarity with the query blended with their BM25 score by `rerank_lexical_weight`, keeping the best `search_k`
+    rerank_candidates: Optional[int] = None
+    rerank_lexical_weight: float = RagConstants.DEFAULT_RERANK_LEXICAL_WEIGHT
+
+
+class IngestionConfig(BaseModel):
+    # `process_pool` loads, enriches and splits files in parallel worker processes,
+    # `pipeline` streams files through concurrent stages joined by bounded queues
+    mode: Literal["sequential", "process_pool", "pipeline"] = RagConstants.DEFAULT_INGESTION_MODE
+
+    # the settings below only apply to the `pipeline` mode
+    load_concurrency: int = RagConstants.DEFAULT_PIPELINE_CPU_STAGE_CONCURRENCY
+    enrich_concurrency: int = RagConstants.DEFAULT_PIPELINE_IO_STAGE_CONCURRENCY
+    split_concurrency: int = RagConstants.DEFAULT_PIPELINE_CPU_STAGE_CONCURRENCY
+    embed_concurrency: int = RagConstants.DEFAULT_PIPELINE_IO_STAGE_CONCURRENCY
+    upsert_concurrency: int = RagConstants.DEFAULT_PIPELINE_IO_STAGE_CONCURRENCY
+    queue_size: int = RagConstants.DEFAULT_PIPELINE_QUEUE_SIZE
+    batch_size: int = RagConstants.DEFAULT_PIPELINE_BATCH_SIZE
+
 
 class ChatConfig(BaseModel):
     prompt_template: str = RagConstants.DEFAULT_PROMPT_TEMPLATE
     azure_deployment: str = RagConstants.DEFAULT_AZURE_DEPLOYMENT
     llm_kwargs: Dict[str, Any] = {}
 
+    # the retrieved chunks are packed into the prompt context in rank order: a chunk is dropped if at least `context_dedup_threshold`
+    # of its word shingles appear in a higher ranked chunk, or if it does not fit in the remaining `context_max_tokens`
+    context_dedup_threshold: Optional[float] = None
+    context_shingle_size: int = RagConstants.DEFAULT_CONTEXT_SHINGLE_SIZE
+    context_max_tokens: Optional[int] = None
+
+
+class SemanticCacheConfig(BaseModel):
+    # answers of queries whose embedding has a cosine similarity of at least `similarity_threshold`
+    # with a previously answered query are served from the cache, which keeps up to `max_entries` answers
+    enabled: bool = False
+    similarity_threshold: float = RagConstants.DEFAULT_SEMANTIC_CACHE_SIMILARITY_THRESHOLD
+    max_entries: int = RagConstants.DEFAULT_SEMANTIC_CACHE_MAX_ENTRIES
+
 
 class RagConfig(BaseModel):
     id: str
     name: str
     chat_config: ChatConfig = ChatConfig()
     embedding_config: EmbeddingConfig
+    ingestion_config: IngestionConfig = IngestionConfig()
     loader_config: LoaderConfig
     search_config: SearchConfig = SearchConfig()
+    semantic_cache_config: SemanticCacheConfig = SemanticCacheConfig()
     splitter_config: SplitterConfig
     media_enrichment: Optional[MediaEnrichmentRequest] = None
+
+    # the deadline of the search and chat requests, split across their stages, unless the request sets its own
+    request_timeout_seconds: Optional[confloat(gt=0, allow_inf_nan=False)] = None
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class BatchRequest(BaseModel):
+    rag_config: str
+    queries: list[str]
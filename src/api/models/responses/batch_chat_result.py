@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from models.responses.context_packing_stats import ContextPackingStats
+
+
+class BatchChatResult(BaseModel):
+    index: int
+    query: str
+    answer: Optional[str] = None
+    sources: Optional[List[dict]] = None
+    context: Optional[ContextPackingStats] = None
+    error: Optional[str] = None
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class BatchSearchResult(BaseModel):
+    index: int
+    query: str
+    documents: Optional[List[dict]] = None
+    error: Optional[str] = None
@@ -1,7 +1,10 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+
+from models.responses.context_packing_stats import ContextPackingStats
 
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[dict]
+    context: Optional[ContextPackingStats] = None
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from typing import Literal
+
+
+class ChatStreamEvent(BaseModel):
+    event: Literal["sources", "token", "done", "error"]
+    data: dict
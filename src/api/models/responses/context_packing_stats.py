@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Literal
+
+
+class DroppedChunk(BaseModel):
+    # the rank of the chunk in the retrieved chunks
+    rank: int
+    # `duplicate` chunks are near-duplicates of a higher ranked chunk, `budget` chunks did not fit in the token budget
+    reason: Literal["duplicate", "budget"]
+    tokens: int
+    metadata: dict = {}
+
+
+class ContextPackingStats(BaseModel):
+    retrieved_chunks: int = 0
+    packed_chunks: int = 0
+    context_tokens: int = 0
+    tokens_saved: int = 0
+    dropped_chunks: List[DroppedChunk] = []
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class SearchCacheStats(BaseModel):
+    enabled: bool
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    entries: int = 0
+    latency_saved_seconds: float = 0.0
+    generations: dict[str, int] = {}
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class SemanticCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    invalidations: int = 0
+    configs: int = 0
+    entries: int = 0
@@ -1,6 +1,11 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class TempFileReference(BaseModel):
     file_name: str
+    # identifies the file across uploads as the source of its chunks, defaults to its file name
+    source: Optional[str] = None
     temp_file_path: str
+    size_bytes: Optional[int] = None
+    content_hash: Optional[str] = None
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, Response
 from typing import Annotated
 
+from models.config_cache_stats import ConfigCacheStats
 from models.rag_config import RagConfig
-from services.cosmos_config_manager import CosmosConfigManager
+from services.cosmos_config_manager import CosmosConfigManager, get_cosmos_config_manager
+from services.rag_resource_pool import rag_resource_pool
 
 
 router = APIRouter(prefix="/config")
@@ -11,19 +13,27 @@ router = APIRouter(prefix="/config")
 @router.post("/")
 def upload_config(
     body: RagConfig,
-    cosmos_config_manager: Annotated[CosmosConfigManager, Depends(CosmosConfigManager)]
+    cosmos_config_manager: Annotated[CosmosConfigManager, Depends(get_cosmos_config_manager)]
 ):
     cosmos_config_manager.upsert(body)
+    rag_resource_pool.invalidate(body.id)
     return Response(status_code=204)
 
 
 @router.get("/", response_model=RagConfig)
 def get_config(
     id: str,
-    cosmos_config_manager: Annotated[CosmosConfigManager, Depends(CosmosConfigManager)]
+    cosmos_config_manager: Annotated[CosmosConfigManager, Depends(get_cosmos_config_manager)]
 ):
     rag_config = cosmos_config_manager.get(id)
     if not rag_config:
         return Response(status_code=404)
 
     return rag_config
+
+
+@router.get("/cache", response_model=ConfigCacheStats)
+def get_config_cache_stats(
+    cosmos_config_manager: Annotated[CosmosConfigManager, Depends(get_cosmos_config_manager)]
+):
+    return cosmos_config_manager.stats()
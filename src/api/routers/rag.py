@@ -1,13 +1,41 @@
+import asyncio
+import json
 import os
+import shutil
 import tempfile
-from fastapi import APIRouter, Depends, UploadFile, Response
-from typing import Annotated
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Request, UploadFile, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Annotated, AsyncIterator, Awaitable, Optional, TypeVar, Union
 
+from configs.config import Config
+from models.embedding_cache_stats import EmbeddingCacheStats
+from models.ingestion_job import IngestionJob
+from models.requests.batch_request import BatchRequest
 from models.requests.chat_request import ChatRequest
+from models.responses.batch_chat_result import BatchChatResult
+from models.responses.batch_search_result import BatchSearchResult
+from models.responses.chat_stream_event import ChatStreamEvent
+from models.search_cache_stats import SearchCacheStats
+from models.semantic_cache_stats import SemanticCacheStats
 from models.temp_file_reference import TempFileReference
+from services.embedding_cache import get_embedding_cache
+from services.ingestion_job_manager import ingestion_job_manager
 from services.rag_orchestrator import RagOrchestrator
+from services.request_deadline import DeadlineExceededError
+from services.search_result_cache import get_search_result_cache
+from services.semantic_answer_cache import semantic_answer_cache
+from services.upload_storage import UploadTooLargeError, save_upload
 
 
+T = TypeVar("T")
+
+# the status code nginx logs for the requests whose client closed the connection before the response
+_CLIENT_CLOSED_REQUEST_STATUS_CODE = 499
+# the `X-Request-Timeout` header must be a positive number of seconds, up to a day, which also rejects NaN and infinity
+_MAX_REQUEST_TIMEOUT_SECONDS = 86400
+
 _TEMP_FILE_PATH = os.path.join(
     os.path.dirname(__file__),
     "..",
@@ -18,49 +46,253 @@ _TEMP_FILE_PATH = os.path.join(
 router = APIRouter(prefix="/rag")
 
 
-@router.post("/upload")
+@router.post("/upload", status_code=202, response_model=IngestionJob)
 async def upload_documents(
     files: list[UploadFile],
     rag_config: str,
-    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)]
+    config: Annotated[Config, Depends(Config)],
+    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)],
+    sources: Annotated[list[str], Form()] = [],
+    force: bool = False
 ):
+    # the size of the whole request is limited while it is received, by the RequestSizeLimitMiddleware
+    # fail fast on unknown configs instead of in the background job
+    await rag_orchestrator.aget_config(rag_config)
+
+    file_sources = _get_file_sources(files, sources)
+
     temp_file_references: list[TempFileReference] = []
 
     rag_config_temp_file_location = os.path.join(_TEMP_FILE_PATH, rag_config)
     os.makedirs(rag_config_temp_file_location, exist_ok=True)
     temp_folder_location = tempfile.mkdtemp(dir=rag_config_temp_file_location)
 
-    for file in files:
-        temp = tempfile.NamedTemporaryFile(
-            dir=temp_folder_location,
-            delete=False
-        )
-        with open(temp.name, 'wb') as f:
-            file_content = await file.read()
-            f.write(file_content)
-
-        temp_file_references.append(
-            TempFileReference(
-                file_name=file.filename,
-                temp_file_path=temp.name
+    remaining_request_bytes = config.upload_max_request_size_bytes
+    try:
+        for file in files:
+            temp = tempfile.NamedTemporaryFile(
+                dir=temp_folder_location,
+                delete=False
+            )
+            temp.close()
+
+            # the copy runs off the event loop and never holds more than one chunk of the file in memory
+            max_size_bytes = min(config.upload_max_file_size_bytes, remaining_request_bytes)
+            size_bytes, content_hash = await run_in_threadpool(save_upload, file.file, temp.name, max_size_bytes)
+            remaining_request_bytes -= size_bytes
+
+            temp_file_references.append(
+                TempFileReference(
+                    file_name=file.filename,
+                    source=file_sources[len(temp_file_references)],
+                    temp_file_path=temp.name,
+                    size_bytes=size_bytes,
+                    content_hash=content_hash
+                )
             )
+    except UploadTooLargeError:
+        shutil.rmtree(temp_folder_location, ignore_errors=True)
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"The upload exceeds the limit of {config.upload_max_file_size_bytes} bytes per file "
+                f"or {config.upload_max_request_size_bytes} bytes per request"
+            )
+        )
+    except BaseException:
+        # a client disconnect, a cancellation or an I/O error while copying must not leave the files on disk either
+        shutil.rmtree(temp_folder_location, ignore_errors=True)
+        raise
+
+    skipped_files: list[TempFileReference] = []
+    if not force:
+        temp_file_references, skipped_files = await run_in_threadpool(
+            rag_orchestrator.partition_ingested_files,
+            rag_config,
+            temp_file_references
         )
+        for file in skipped_files:
+            os.remove(file.temp_file_path)
+
+    return ingestion_job_manager.submit(rag_orchestrator, rag_config, temp_file_references, skipped_files)
+
+
+@router.get("/upload/{job_id}", response_model=IngestionJob)
+def get_upload_job(job_id: str):
+    job = ingestion_job_manager.get(job_id)
+    if not job:
+        return Response(status_code=404)
+
+    return job
 
-    rag_orchestrator.upload_documents(rag_config, temp_file_references)
-    return Response(status_code=204)
+
+@router.delete("/upload/{job_id}", response_model=IngestionJob)
+def cancel_upload_job(job_id: str):
+    job = ingestion_job_manager.cancel(job_id)
+    if not job:
+        return Response(status_code=404)
+
+    return job
+
+
+@router.get("/embedding-cache", response_model=EmbeddingCacheStats)
+def get_embedding_cache_stats(config: Annotated[Config, Depends(Config)]):
+    embedding_cache = get_embedding_cache(config)
+    if not embedding_cache:
+        return EmbeddingCacheStats(enabled=False)
+
+    return embedding_cache.stats()
+
+
+@router.get("/search-cache", response_model=SearchCacheStats)
+def get_search_cache_stats(config: Annotated[Config, Depends(Config)]):
+    search_cache = get_search_result_cache(config)
+    if not search_cache:
+        return SearchCacheStats(enabled=False)
+
+    return search_cache.stats()
+
+
+@router.get("/semantic-cache", response_model=SemanticCacheStats)
+def get_semantic_cache_stats():
+    return semantic_answer_cache.stats()
 
 
 @router.post("/chat")
 async def chat(
+    request: Request,
+    body: ChatRequest,
+    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)],
+    x_request_timeout: Annotated[Optional[float], Header(gt=0, le=_MAX_REQUEST_TIMEOUT_SECONDS)] = None
+):
+    return await _cancel_on_disconnect(request, rag_orchestrator.achat(body.rag_config, body.query, x_request_timeout))
+
+
+@router.post("/chat/stream")
+async def chat_stream(
     body: ChatRequest,
-    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)]
+    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)],
+    x_request_timeout: Annotated[Optional[float], Header(gt=0, le=_MAX_REQUEST_TIMEOUT_SECONDS)] = None
 ):
-    return rag_orchestrator.chat(body.rag_config, body.query)
+    # fail with a 404 status before the stream starts on unknown configs
+    await rag_orchestrator.aget_config(body.rag_config)
+
+    # the streaming response already cancels the stream when the client disconnects
+    return StreamingResponse(
+        _format_server_sent_events(rag_orchestrator.chat_stream(body.rag_config, body.query, x_request_timeout)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("/search")
 async def search(
+    request: Request,
     body: ChatRequest,
-    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)]
+    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)],
+    x_request_timeout: Annotated[Optional[float], Header(gt=0, le=_MAX_REQUEST_TIMEOUT_SECONDS)] = None
+):
+    return await _cancel_on_disconnect(request, rag_orchestrator.asearch(body.rag_config, body.query, x_request_timeout))
+
+
+@router.post("/search/batch", response_model=list[BatchSearchResult])
+async def search_batch(
+    body: BatchRequest,
+    config: Annotated[Config, Depends(Config)],
+    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)],
+    stream: bool = False
+):
+    await _validate_batch(body, config, rag_orchestrator)
+    results = rag_orchestrator.abatch_search(body.rag_config, body.queries)
+    if stream:
+        return StreamingResponse(_format_ndjson(results), media_type="application/x-ndjson")
+
+    return [result async for result in results]
+
+
+@router.post("/chat/batch", response_model=list[BatchChatResult])
+async def chat_batch(
+    body: BatchRequest,
+    config: Annotated[Config, Depends(Config)],
+    rag_orchestrator: Annotated[RagOrchestrator, Depends(RagOrchestrator)],
+    stream: bool = False
 ):
-    return rag_orchestrator.search(body.rag_config, body.query)
\ No newline at end of file
+    await _validate_batch(body, config, rag_orchestrator)
+    results = rag_orchestrator.abatch_chat(body.rag_config, body.queries)
+    if stream:
+        return StreamingResponse(_format_ndjson(results), media_type="application/x-ndjson")
+
+    return [result async for result in results]
+
+
+def _get_file_sources(files: list[UploadFile], sources: list[str]) -> list[str]:
+    """
+    Returns the source of each uploaded file, which keys its chunks across uploads: the given source, or else its file name.
+
+    Raises:
+        HTTPException: With a 400 status code if the sources do not match the files, or two files have the same source.
+    """
+    if sources and len(sources) != len(files):
+        raise HTTPException(status_code=400, detail=f"Expected a source for each of the {len(files)} files, got {len(sources)}")
+
+    file_sources = sources or [file.filename for file in files]
+    duplicates = sorted({source for source in file_sources if file_sources.count(source) > 1})
+    if duplicates:
+        # they would overwrite each other's chunks
+        raise HTTPException(
+            status_code=400,
+            detail=f"Several files of the upload have the same source: {', '.join(duplicates)}. Set distinct sources or file names."
+        )
+
+    return file_sources
+
+
+async def _validate_batch(body: BatchRequest, config: Config, rag_orchestrator: RagOrchestrator):
+    if len(body.queries) > config.batch_max_queries:
+        raise HTTPException(status_code=413, detail=f"The batch exceeds the limit of {config.batch_max_queries} queries")
+
+    # fail with a 404 status before the stream starts on unknown configs
+    await rag_orchestrator.aget_config(body.rag_config)
+
+
+async def _cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> Union[T, Response]:
+    """
+    Awaits the response of a request, cancelling it if the client disconnects first,
+    so its search and LLM calls do not keep running for nobody.
+
+    Raises:
+        HTTPException: With a 504 status code if the request deadline was exceeded.
+    """
+    task = asyncio.ensure_future(awaitable)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait((task, disconnect), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.wait((task,))
+
+    if task.cancelled():
+        return Response(status_code=_CLIENT_CLOSED_REQUEST_STATUS_CODE)
+
+    try:
+        return task.result()
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+async def _wait_for_disconnect(request: Request):
+    # the body is already read, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _format_ndjson(results: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    async for result in results:
+        yield result.model_dump_json() + "\n"
+
+
+async def _format_server_sent_events(events: AsyncIterator[ChatStreamEvent]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event.event}\ndata: {json.dumps(event.data, default=str)}\n\n"
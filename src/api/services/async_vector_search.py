@@ -0,0 +1,173 @@
+import asyncio
+import json
+import numpy as np
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.aio import SearchClient
+from azure.search.documents.models import VectorizedQuery
+from fastapi.concurrency import run_in_threadpool
+from langchain_community.vectorstores.azuresearch import (
+    AzureSearch,
+    FIELDS_CONTENT,
+    FIELDS_CONTENT_VECTOR,
+    FIELDS_METADATA
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from typing import Optional
+
+
+_SIMILARITY_SEARCH_TYPE = "similarity"
+_HYBRID_SEARCH_TYPE = "hybrid"
+
+
+class AsyncVectorSearch(object):
+    """
+    Runs the similarity and hybrid searches of `AzureSearch` with the async Azure AI Search client,
+    so searches do not block the event loop. The LangChain `AzureSearch` vector store only implements them synchronously.
+    Other search types fall back to the synchronous vector store on the thread pool.
+    """
+    _client: SearchClient
+    # the event loop the connections of the async client are bound to, once it has searched
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _embedding_function: Embeddings
+    _vector_store: AzureSearch
+
+    def __init__(
+        self,
+        azure_search_endpoint: str,
+        azure_search_key: str,
+        index_name: str,
+        embedding_function: Embeddings,
+        vector_store: AzureSearch
+    ):
+        self._client = SearchClient(azure_search_endpoint, index_name, AzureKeyCredential(azure_search_key))
+        self._loop = None
+        self._embedding_function = embedding_function
+        self._vector_store = vector_store
+
+    async def asimilarity_search(self, query: str, k: int, search_type: str) -> list[Document]:
+        """
+        Returns the documents most similar to the query.
+
+        Args:
+            query (str): The query text.
+            k (int): The number of documents to return.
+            search_type (str): `similarity` for a vector search, `hybrid` for a text and vector search.
+
+        Returns:
+            list[Document]: The most similar documents.
+        """
+        if search_type not in (_SIMILARITY_SEARCH_TYPE, _HYBRID_SEARCH_TYPE):
+            return await run_in_threadpool(self._vector_store.similarity_search, query, k=k, search_type=search_type)
+
+        vector = await self._embedding_function.aembed_query(query)
+        return await self.asimilarity_search_by_vector(query, vector, k, search_type)
+
+    async def asimilarity_search_by_vector(
+        self,
+        query: str,
+        vector: list[float],
+        k: int,
+        search_type: str
+    ) -> list[Document]:
+        """
+        Returns the documents most similar to an already embedded query.
+
+        Args:
+            query (str): The query text, used by hybrid searches.
+            vector (list[float]): The embedding of the query.
+            k (int): The number of documents to return.
+            search_type (str): `similarity` for a vector search, `hybrid` for a text and vector search.
+
+        Returns:
+            list[Document]: The most similar documents.
+        """
+        if search_type not in (_SIMILARITY_SEARCH_TYPE, _HYBRID_SEARCH_TYPE):
+            return await run_in_threadpool(self._vector_store.similarity_search, query, k=k, search_type=search_type)
+
+        results = await self._search(query, vector, k, search_type)
+        return [_to_document(result) async for result in results]
+
+    async def asimilarity_search_with_vectors(
+        self,
+        query: str,
+        vector: list[float],
+        k: int,
+        search_type: str
+    ) -> list[tuple[Document, list[float]]]:
+        """
+        Returns the documents most similar to an already embedded query, with their stored vectors.
+
+        Args:
+            query (str): The query text, used by hybrid searches.
+            vector (list[float]): The embedding of the query.
+            k (int): The number of documents to return.
+            search_type (str): `similarity` for a vector search, `hybrid` for a text and vector search.
+
+        Returns:
+            list[tuple[Document, list[float]]]: The most similar documents and their vectors.
+        """
+        if search_type not in (_SIMILARITY_SEARCH_TYPE, _HYBRID_SEARCH_TYPE):
+            return await run_in_threadpool(self.similarity_search_with_vectors, query, vector, k, search_type)
+
+        results = await self._search(query, vector, k, search_type)
+        return [(_to_document(result), result[FIELDS_CONTENT_VECTOR]) async for result in results]
+
+    def close(self):
+        """
+        Closes the async client on the event loop its connections are bound to, without waiting for it,
+        so it can be called from synchronous code on any thread. A client which never searched has no connections to close.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(self._client.close(), loop)
+
+    async def _search(self, query: str, vector: list[float], k: int, search_type: str):
+        self._loop = asyncio.get_running_loop()
+        return await self._client.search(**_build_search_kwargs(query, vector, k, search_type))
+
+    def similarity_search_with_vectors(
+        self,
+        query: str,
+        vector: list[float],
+        k: int,
+        search_type: str
+    ) -> list[tuple[Document, list[float]]]:
+        """
+        Synchronous `asimilarity_search_with_vectors`, with the client of the synchronous vector store.
+        Other search types do not return the stored vectors, so their documents are embedded again,
+        which the embedding cache serves without calling the model for documents it embedded at ingestion.
+        """
+        if search_type not in (_SIMILARITY_SEARCH_TYPE, _HYBRID_SEARCH_TYPE):
+            documents = self._vector_store.similarity_search(query, k=k, search_type=search_type)
+            vectors = self._embedding_function.embed_documents([doc.page_content for doc in documents])
+            return list(zip(documents, vectors))
+
+        results = self._vector_store.client.search(**_build_search_kwargs(query, vector, k, search_type))
+        return [(_to_document(result), result[FIELDS_CONTENT_VECTOR]) for result in results]
+
+
+def _build_search_kwargs(query: str, vector: list[float], k: int, search_type: str) -> dict:
+    return {
+        "search_text": query if search_type == _HYBRID_SEARCH_TYPE else "",
+        "vector_queries": [
+            VectorizedQuery(
+                vector=np.array(vector, dtype=np.float32).tolist(),
+                k_nearest_neighbors=k,
+                fields=FIELDS_CONTENT_VECTOR
+            )
+        ],
+        "top": k
+    }
+
+
+def _to_document(result: dict) -> Document:
+    # mirrors the conversion of the search results to documents in `AzureSearch`
+    return Document(
+        page_content=result.pop(FIELDS_CONTENT),
+        metadata=json.loads(result[FIELDS_METADATA])
+        if FIELDS_METADATA in result
+        else {k: v for k, v in result.items() if k != FIELDS_CONTENT_VECTOR}
+    )
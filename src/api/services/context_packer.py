@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from langchain_core.documents import Document
+
+from langchain_extensions.embeddings.cached_embeddings import normalize_text
+from models.rag_config import ChatConfig
+from models.responses.context_packing_stats import ContextPackingStats, DroppedChunk
+from utils.token_counter import count_tokens
+
+
+@dataclass
+class PackedContext:
+    documents: list[Document]
+    stats: ContextPackingStats
+
+
+def build_shingles(text: str, size: int) -> set[str]:
+    """
+    Splits a text into its overlapping sequences of `size` words, after normalizing its case and whitespace.
+
+    Args:
+        text (str): The text.
+        size (int): The number of words of a shingle.
+
+    Returns:
+        set[str]: The shingles of the text, or the whole text if it is shorter than a shingle.
+    """
+    words = normalize_text(text).casefold().split(" ")
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def pack_context(chat_config: ChatConfig, documents: list[Document]) -> PackedContext:
+    """
+    Packs the retrieved chunks into the prompt context in rank order, dropping the near-duplicates of higher ranked chunks,
+    such as overlapping chunks or repeated image descriptions, and the chunks which do not fit in the token budget.
+    A chunk is a near-duplicate if at least `context_dedup_threshold` of its shingles appear in one higher ranked chunk,
+    so a chunk contained in a longer chunk is dropped as well as an identical chunk.
+
+    Args:
+        chat_config (ChatConfig): The chat configuration with the packing settings.
+        documents (list[Document]): The retrieved chunks, from the most relevant.
+
+    Returns:
+        PackedContext: The packed chunks, and the dropped chunks with the tokens they would have used.
+    """
+    tokens = count_tokens([doc.page_content for doc in documents])
+    dedup_threshold = chat_config.context_dedup_threshold
+    max_tokens = chat_config.context_max_tokens
+
+    packed_documents: list[Document] = []
+    packed_shingles: list[set[str]] = []
+    dropped_chunks: list[DroppedChunk] = []
+    context_tokens = 0
+    for rank, (doc, doc_tokens) in enumerate(zip(documents, tokens)):
+        shingles = build_shingles(doc.page_content, chat_config.context_shingle_size) if dedup_threshold is not None else set()
+        if dedup_threshold is not None and any(
+            len(shingles & other) / len(shingles) >= dedup_threshold for other in packed_shingles
+        ):
+            dropped_chunks.append(DroppedChunk(rank=rank, reason="duplicate", tokens=doc_tokens, metadata=doc.metadata))
+            continue
+
+        # chunks which do not fit are skipped, so smaller lower ranked chunks can still fill the budget
+        if max_tokens is not None and context_tokens + doc_tokens > max_tokens:
+            dropped_chunks.append(DroppedChunk(rank=rank, reason="budget", tokens=doc_tokens, metadata=doc.metadata))
+            continue
+
+        packed_documents.append(doc)
+        packed_shingles.append(shingles)
+        context_tokens += doc_tokens
+
+    return PackedContext(
+        documents=packed_documents,
+        stats=ContextPackingStats(
+            retrieved_chunks=len(documents),
+            packed_chunks=len(packed_documents),
+            context_tokens=context_tokens,
+            tokens_saved=sum(chunk.tokens for chunk in dropped_chunks),
+            dropped_chunks=dropped_chunks
+        )
+    )
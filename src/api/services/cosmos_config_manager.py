@@ -1,8 +1,12 @@
-from azure.cosmos import ContainerProxy, CosmosClient, PartitionKey
-from fastapi import Depends
-from typing import Annotated
+import threading
+import time
+from azure.cosmos import ContainerProxy, CosmosClient, PartitionKey, exceptions
+from azure.cosmos.aio import ContainerProxy as AsyncContainerProxy, CosmosClient as AsyncCosmosClient
+from collections import OrderedDict
+from typing import Optional
 
 from configs.cosmos_config import CosmosConfig
+from models.config_cache_stats import ConfigCacheStats
 from models.rag_config import RagConfig
 
 
@@ -10,22 +14,122 @@ _CONTAINER_PARTITION_KEY = "/name"
 
 
 class CosmosConfigManager(object):
+    """
+    Reads and writes RAG configs in Cosmos DB, keeping the most recently used configs in an in-process cache.
+    Cached configs are refreshed after `config_cache_ttl_seconds`, so upserts made through other API instances are picked up.
+    Cache misses of `aget` are read with the async Cosmos DB client, so they do not block the event loop.
+    """
+    _cosmos_config: CosmosConfig
     _container: ContainerProxy
+    _async_client: Optional[AsyncCosmosClient]
+    _async_container: Optional[AsyncContainerProxy]
+    _async_client_lock: threading.Lock
+    _ttl_seconds: float
+    _max_size: int
+    _cache: OrderedDict[str, tuple[RagConfig, float]]
+    _lock: threading.Lock
+    _hits: int
+    _misses: int
+    _point_reads: int
+    _queries: int
 
-    def __init__(self, cosmos_config: Annotated[CosmosConfig, Depends(CosmosConfig)]):
+    def __init__(self, cosmos_config: CosmosConfig):
+        self._cosmos_config = cosmos_config
         cosmos_client = CosmosClient(
             url=cosmos_config.azure_cosmos_db_uri,
             credential=cosmos_config.azure_cosmos_db_key
         )
         database = cosmos_client.create_database_if_not_exists(cosmos_config.azure_cosmos_db_database)
         self._container = database.create_container_if_not_exists(cosmos_config.azure_cosmos_db_container, partition_key=PartitionKey(_CONTAINER_PARTITION_KEY))
+        # created on first use, as the async client binds its connections to the running event loop
+        self._async_client = None
+        self._async_container = None
+        self._async_client_lock = threading.Lock()
+
+        self._ttl_seconds = cosmos_config.config_cache_ttl_seconds
+        self._max_size = cosmos_config.config_cache_max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._point_reads = 0
+        self._queries = 0
 
 
     def upsert(self, config: RagConfig):
         self._container.upsert_item(config.model_dump())
 
+        # write-through, so this instance serves the new config right away
+        with self._lock:
+            self._put(config.model_copy(deep=True))
+
 
     def get(self, config_id: str) -> RagConfig | None:
+        hit, entry = self._get_cached(config_id)
+        if hit:
+            return entry[0].model_copy(deep=True)
+
+        # the container is partitioned by name, so a point read is only possible once the name of the config is known
+        config = self._read(config_id, entry[0].name) if entry else None
+        if not config:
+            config = self._query(config_id)
+
+        return self._store(config_id, config)
+
+
+    async def aget(self, config_id: str) -> RagConfig | None:
+        hit, entry = self._get_cached(config_id)
+        if hit:
+            return entry[0].model_copy(deep=True)
+
+        config = await self._aread(config_id, entry[0].name) if entry else None
+        if not config:
+            config = await self._aquery(config_id)
+
+        return self._store(config_id, config)
+
+
+    async def aclose(self):
+        """
+        Closes the async Cosmos DB client, if it was created, so its connections are not leaked on shutdown.
+        """
+        with self._async_client_lock:
+            async_client = self._async_client
+            self._async_client = None
+            self._async_container = None
+
+        if async_client:
+            await async_client.close()
+
+
+    def stats(self) -> ConfigCacheStats:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return ConfigCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                hit_rate=self._hits / lookups if lookups else 0.0,
+                point_reads=self._point_reads,
+                queries=self._queries,
+                entries=len(self._cache)
+            )
+
+
+    def _read(self, config_id: str, name: str) -> Optional[RagConfig]:
+        with self._lock:
+            self._point_reads += 1
+
+        try:
+            return RagConfig(**self._container.read_item(item=config_id, partition_key=name))
+        except exceptions.CosmosResourceNotFoundError:
+            # the config was renamed or deleted
+            return None
+
+
+    def _query(self, config_id: str) -> Optional[RagConfig]:
+        with self._lock:
+            self._queries += 1
+
         result = self._container.query_items(
             query=f"SELECT * FROM c WHERE c.id=@id",
             parameters=[
@@ -38,4 +142,103 @@ class CosmosConfigManager(object):
         if not items:
             return None
 
-        return RagConfig(**items[0])
\ No newline at end of file
+        return RagConfig(**items[0])
+
+
+    def _put(self, config: RagConfig):
+        self._cache[config.id] = (config, time.monotonic())
+        self._cache.move_to_end(config.id)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+
+    def _get_cached(self, config_id: str) -> tuple[bool, Optional[tuple[RagConfig, float]]]:
+        with self._lock:
+            entry = self._cache.get(config_id)
+            if entry and time.monotonic() - entry[1] <= self._ttl_seconds:
+                self._hits += 1
+                self._cache.move_to_end(config_id)
+                return True, entry
+            self._misses += 1
+            return False, entry
+
+
+    def _store(self, config_id: str, config: Optional[RagConfig]) -> RagConfig | None:
+        with self._lock:
+            if config:
+                self._put(config)
+            else:
+                self._cache.pop(config_id, None)
+
+        return config.model_copy(deep=True) if config else None
+
+
+    def _get_async_container(self) -> AsyncContainerProxy:
+        # the lock makes sure concurrent first lookups create a single client, which `aclose` can then close
+        with self._async_client_lock:
+            if not self._async_container:
+                self._async_client = AsyncCosmosClient(
+                    url=self._cosmos_config.azure_cosmos_db_uri,
+                    credential=self._cosmos_config.azure_cosmos_db_key
+                )
+                self._async_container = (
+                    self._async_client
+                    .get_database_client(self._cosmos_config.azure_cosmos_db_database)
+                    .get_container_client(self._cosmos_config.azure_cosmos_db_container)
+                )
+            return self._async_container
+
+
+    async def _aread(self, config_id: str, name: str) -> Optional[RagConfig]:
+        with self._lock:
+            self._point_reads += 1
+
+        try:
+            return RagConfig(**await self._get_async_container().read_item(item=config_id, partition_key=name))
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+
+
+    async def _aquery(self, config_id: str) -> Optional[RagConfig]:
+        with self._lock:
+            self._queries += 1
+
+        # the async client queries across partitions when no partition key is given
+        result = self._get_async_container().query_items(
+            query=f"SELECT * FROM c WHERE c.id=@id",
+            parameters=[
+                { "name": "@id", "value": config_id }
+            ]
+        )
+
+        async for item in result:
+            return RagConfig(**item)
+        return None
+
+
+_cosmos_config_manager: Optional[CosmosConfigManager] = None
+_cosmos_config_manager_lock = threading.Lock()
+
+
+def get_cosmos_config_manager() -> CosmosConfigManager:
+    global _cosmos_config_manager
+
+    if _cosmos_config_manager:
+        return _cosmos_config_manager
+
+    with _cosmos_config_manager_lock:
+        if not _cosmos_config_manager:
+            _cosmos_config_manager = CosmosConfigManager(CosmosConfig())
+
+    return _cosmos_config_manager
+
+
+async def aclose_cosmos_config_manager():
+    """
+    Closes the async client of the Cosmos config manager, if the manager was created.
+    """
+    with _cosmos_config_manager_lock:
+        cosmos_config_manager = _cosmos_config_manager
+
+    if cosmos_config_manager:
+        await cosmos_config_manager.aclose()
@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+from importlib import import_module
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+from timeit import default_timer as timer
+from typing import Optional
+
+from enrichment.models.endpoint import MediaEnrichmentRequest
+from langchain_extensions.loaders.base_loader_with_vision import BaseVisionLoader
+from models.rag_config import LoaderConfig, SplitterConfig
+from .vision_ingest_class_manager import vision_ingest_class_manager
+
+
+'''
+NOTE: The functions in this module are kept at module level and only take picklable arguments
+so they can be sent to the worker processes of the process pool ingestion mode.
+'''
+
+
+LOAD_STAGE = "load"
+ENRICH_STAGE = "enrich"
+SPLIT_STAGE = "split"
+INDEX_STAGE = "index"
+EMBED_STAGE = "embed"
+UPSERT_STAGE = "upsert"
+
+
+@dataclass
+class ProcessedFile:
+    documents: list[Document]
+    is_vision_loader: bool
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def init_loader(
+    file_path: str,
+    loader_config: LoaderConfig,
+    media_enrichment: Optional[MediaEnrichmentRequest] = None
+) -> BaseLoader:
+
+    if (vision_ingest_class_manager.is_vision_loader(loader_config.loader_name)):
+        if not media_enrichment:
+            raise Exception("A vision loader must set a media_enrichment request.")
+
+        return vision_ingest_class_manager.initialize_vision_loader(loader_config, file_path, media_enrichment)
+    else:
+        loader: BaseLoader = getattr(
+            import_module("langchain_community.document_loaders"),
+            loader_config.loader_name
+        )
+        return loader(file_path=file_path, **loader_config.loader_kwargs)
+
+
+def is_vision_loader(loader: BaseLoader) -> bool:
+    return isinstance(loader, BaseVisionLoader)
+
+
+def load_documents(loader: BaseLoader) -> list[Document]:
+    # vision loaders are enriched in a separate step, see `enrich_documents`
+    if is_vision_loader(loader):
+        return loader.load_file()
+    return loader.load()
+
+
+def enrich_documents(loader: BaseLoader, documents: list[Document]) -> list[Document]:
+    if is_vision_loader(loader):
+        return loader.enrich_documents(documents)
+    return documents
+
+
+def init_splitter(splitter_config: SplitterConfig) -> TextSplitter:
+    if (vision_ingest_class_manager.is_vision_splitter(splitter_config.splitter_name)):
+        return vision_ingest_class_manager.initialize_vision_splitter(splitter_config)
+
+    splitter = getattr(
+        import_module("langchain_text_splitters"),
+        splitter_config.splitter_name
+    )
+    return splitter(**splitter_config.splitter_kwargs)
+
+
+def split_documents(
+    splitter_config: SplitterConfig,
+    documents: list[Document]
+) -> list[Document]:
+    return init_splitter(splitter_config).split_documents(documents)
+
+
+def process_file(
+    file_path: str,
+    loader_config: LoaderConfig,
+    splitter_config: SplitterConfig,
+    media_enrichment: Optional[MediaEnrichmentRequest] = None
+) -> ProcessedFile:
+    """
+    Loads, enriches and splits a single file, timing each stage.
+
+    Args:
+        file_path (str): The path of the file to process.
+        loader_config (LoaderConfig): The loader configuration.
+        splitter_config (SplitterConfig): The splitter configuration.
+        media_enrichment (MediaEnrichmentRequest): The media enrichment request used by vision loaders.
+
+    Returns:
+        ProcessedFile: The split documents and the elapsed seconds per stage.
+    """
+    timings: dict[str, float] = {}
+
+    start_time = timer()
+    loader = init_loader(file_path, loader_config, media_enrichment)
+    documents = load_documents(loader)
+    timings[LOAD_STAGE] = timer() - start_time
+
+    if is_vision_loader(loader):
+        start_time = timer()
+        documents = enrich_documents(loader, documents)
+        timings[ENRICH_STAGE] = timer() - start_time
+
+    start_time = timer()
+    documents = split_documents(splitter_config, documents)
+    timings[SPLIT_STAGE] = timer() - start_time
+
+    return ProcessedFile(
+        documents=documents,
+        is_vision_loader=is_vision_loader(loader),
+        timings=timings
+    )
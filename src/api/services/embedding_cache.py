@@ -0,0 +1,199 @@
+import hashlib
+import json
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+from typing import Optional
+
+from configs.config import Config, config
+from models.embedding_cache_stats import EmbeddingCacheStats
+from models.rag_config import EmbeddingConfig
+
+
+# evicts down to this fraction of the maximum size, so the eviction does not run again on the next write
+_EVICTION_TARGET_RATIO = 0.9
+_SQLITE_MAX_VARIABLES = 500
+
+
+def build_embedding_namespace(embedding_config: EmbeddingConfig) -> str:
+    """
+    Identifies an embedding model and its settings, so configs using the same model share their cached vectors.
+
+    Args:
+        embedding_config (EmbeddingConfig): The embedding configuration.
+
+    Returns:
+        str: The SHA256 hex digest of the model name and kwargs.
+    """
+    obj_str = json.dumps({
+        "embedding_model_name": embedding_config.embedding_model_name,
+        "embedding_model_kwargs": embedding_config.embedding_model_kwargs
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(obj_str.encode()).hexdigest()
+
+
+class EmbeddingCache(object):
+    """
+    A local on-disk cache of embeddings stored as float32 blobs in SQLite.
+    Vectors are keyed by a namespace identifying the embedding model and its settings, and by the hash of the embedded text.
+    The least recently used vectors are evicted once the stored vectors exceed the maximum size.
+    """
+    _connection: sqlite3.Connection
+    _lock: threading.Lock
+    _max_size_bytes: int
+    _size_bytes: int
+    _entries: int
+    _hits: int
+    _misses: int
+    _evictions: int
+
+    def __init__(self, path: str, max_size_bytes: int):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # a single connection shared by the ingestion and request threads, serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "namespace TEXT NOT NULL, "
+            "text_hash TEXT NOT NULL, "
+            "vector BLOB NOT NULL, "
+            "accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, text_hash))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+        self._connection.commit()
+
+        self._lock = threading.Lock()
+        self._max_size_bytes = max_size_bytes
+        self._size_bytes, self._entries = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings"
+        ).fetchone()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_many(self, namespace: str, text_hashes: list[str]) -> dict[str, list[float]]:
+        """
+        Looks up the vectors of the given text hashes.
+
+        Args:
+            namespace (str): The namespace of the embedding model.
+            text_hashes (list[str]): The hashes of the texts.
+
+        Returns:
+            dict[str, list[float]]: The cached vectors by text hash, missing hashes are left out.
+        """
+        unique_hashes = list(dict.fromkeys(text_hashes))
+        vectors: dict[str, list[float]] = {}
+
+        with self._lock:
+            for i in range(0, len(unique_hashes), _SQLITE_MAX_VARIABLES):
+                batch = unique_hashes[i:i + _SQLITE_MAX_VARIABLES]
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE namespace = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [namespace, *batch]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    vectors[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+
+            if vectors:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET accessed_at = ? WHERE namespace = ? AND text_hash = ?",
+                    [(now, namespace, text_hash) for text_hash in vectors]
+                )
+                self._connection.commit()
+
+            hits = sum(1 for text_hash in text_hashes if text_hash in vectors)
+            self._hits += hits
+            self._misses += len(text_hashes) - hits
+
+        return vectors
+
+    def set_many(self, namespace: str, vectors: dict[str, list[float]]):
+        """
+        Stores vectors, evicting the least recently used vectors if the cache grows over its maximum size.
+
+        Args:
+            namespace (str): The namespace of the embedding model.
+            vectors (dict[str, list[float]]): The vectors by text hash.
+        """
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = [
+            (namespace, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text_hash, vector in vectors.items()
+        ]
+
+        with self._lock:
+            for i in range(0, len(rows), _SQLITE_MAX_VARIABLES):
+                batch = rows[i:i + _SQLITE_MAX_VARIABLES]
+                existing = self._connection.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings WHERE namespace = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [namespace, *[row[1] for row in batch]]
+                ).fetchone()
+                self._connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", batch)
+                self._size_bytes += sum(len(row[2]) for row in batch) - existing[0]
+                self._entries += len(batch) - existing[1]
+
+            if self._size_bytes > self._max_size_bytes:
+                self._evict()
+            self._connection.commit()
+
+    def stats(self) -> EmbeddingCacheStats:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return EmbeddingCacheStats(
+                enabled=True,
+                hits=self._hits,
+                misses=self._misses,
+                hit_rate=self._hits / lookups if lookups else 0.0,
+                evictions=self._evictions,
+                entries=self._entries,
+                size_bytes=self._size_bytes,
+                max_size_bytes=self._max_size_bytes
+            )
+
+    def _evict(self):
+        target_size_bytes = int(self._max_size_bytes * _EVICTION_TARGET_RATIO)
+        rows = self._connection.execute(
+            "SELECT namespace, text_hash, LENGTH(vector) FROM embeddings ORDER BY accessed_at"
+        )
+
+        evicted: list[tuple[str, str]] = []
+        for namespace, text_hash, size_bytes in rows:
+            if self._size_bytes <= target_size_bytes:
+                break
+            evicted.append((namespace, text_hash))
+            self._size_bytes -= size_bytes
+
+        self._connection.executemany("DELETE FROM embeddings WHERE namespace = ? AND text_hash = ?", evicted)
+        self._entries -= len(evicted)
+        self._evictions += len(evicted)
+        logger.info(f"Evicted {len(evicted)} vectors from the embedding cache, {self._size_bytes} bytes left")
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(config: Config = config) -> Optional[EmbeddingCache]:
+    global _embedding_cache
+
+    if not config.embedding_cache_enabled:
+        return None
+
+    if _embedding_cache:
+        return _embedding_cache
+
+    with _embedding_cache_lock:
+        if not _embedding_cache:
+            _embedding_cache = EmbeddingCache(config.embedding_cache_path, config.embedding_cache_max_size_bytes)
+
+    return _embedding_cache
@@ -0,0 +1,133 @@
+import hashlib
+from dataclasses import dataclass, field
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from loguru import logger
+
+from models.temp_file_reference import TempFileReference
+from .ingestion_manifest_manager import IngestionManifestManager
+from .search_index_writer import delete_documents, embed_documents, upload_documents
+
+
+def build_chunk_keys(source: str, documents: list[Document]) -> list[str]:
+    """
+    Derives deterministic keys for the chunks of a source from the source name and the hash of each chunk content,
+    so a re-ingested chunk which did not change gets the same key.
+    Repeated chunks within the same source are told apart by their occurrence number.
+
+    Args:
+        source (str): The source of the file, its file name unless the upload set another one.
+        documents (list[Document]): The chunks of the source.
+
+    Returns:
+        list[str]: The key of each chunk.
+    """
+    source_hash = hashlib.sha256(source.encode()).hexdigest()
+    occurrences: dict[str, int] = {}
+
+    keys: list[str] = []
+    for doc in documents:
+        content_hash = hashlib.sha256(doc.page_content.encode()).hexdigest()
+        occurrence = occurrences.get(content_hash, 0)
+        occurrences[content_hash] = occurrence + 1
+        keys.append(hashlib.sha256(f"{source_hash}:{content_hash}:{occurrence}".encode()).hexdigest())
+
+    return keys
+
+
+@dataclass
+class ChunkPlan:
+    source: str
+    chunk_keys: list[str]
+    documents: list[Document] = field(default_factory=list)
+    keys: list[str] = field(default_factory=list)
+    stale_keys: list[str] = field(default_factory=list)
+
+
+class IncrementalIndexer(object):
+    """
+    Indexes the chunks of a file as a diff against the chunks previously indexed for the same source:
+    only new or changed chunks are embedded and upserted, and the chunks which are no longer present are deleted.
+    The chunk keys of each source are kept in the ingestion manifest.
+    """
+    _config_id: str
+    _config_hash: str
+    _vector_store: VectorStore
+    _manifest_manager: IngestionManifestManager
+
+    def __init__(
+        self,
+        config_id: str,
+        config_hash: str,
+        vector_store: VectorStore,
+        manifest_manager: IngestionManifestManager
+    ):
+        self._config_id = config_id
+        self._config_hash = config_hash
+        self._vector_store = vector_store
+        self._manifest_manager = manifest_manager
+
+    def plan(self, file: TempFileReference, documents: list[Document]) -> ChunkPlan:
+        """
+        Compares the chunks of a file with the chunks previously indexed for the same source.
+
+        Args:
+            file (TempFileReference): The uploaded file.
+            documents (list[Document]): The chunks of the file.
+
+        Returns:
+            ChunkPlan: The chunks to upsert and the keys of the stale chunks to delete.
+        """
+        source = file.source or file.file_name
+        chunk_keys = build_chunk_keys(source, documents)
+        entry = self._manifest_manager.get_source_entry(self._config_id, source)
+
+        # chunks indexed with a different configuration have different embeddings, so they are all upserted again
+        indexed_keys = set()
+        if entry and entry.get("config_hash") == self._config_hash:
+            indexed_keys = set(entry.get("chunk_keys", []))
+
+        plan = ChunkPlan(source=source, chunk_keys=chunk_keys)
+        for key, doc in zip(chunk_keys, documents):
+            if key not in indexed_keys:
+                plan.documents.append(doc)
+                plan.keys.append(key)
+
+        current_keys = set(chunk_keys)
+        if entry:
+            plan.stale_keys = [key for key in entry.get("chunk_keys", []) if key not in current_keys]
+
+        logger.debug(
+            f"{source}: {len(plan.documents)} of {len(chunk_keys)} chunks new or changed, "
+            f"{len(plan.stale_keys)} stale chunks"
+        )
+        return plan
+
+    def upsert(self, documents: list[Document], embeddings: list[list[float]], keys: list[str]):
+        upload_documents(self._vector_store, documents, embeddings, keys)
+
+    def index(self, file: TempFileReference, plan: ChunkPlan, embedding_function: Embeddings):
+        if plan.documents:
+            self.upsert(plan.documents, embed_documents(embedding_function, plan.documents), plan.keys)
+        self.commit(file, plan)
+
+    def commit(self, file: TempFileReference, plan: ChunkPlan):
+        """
+        Deletes the stale chunks of a file once its new chunks are upserted,
+        then records its chunks and content hash in the manifest, replacing the previous entry of its source.
+
+        Args:
+            file (TempFileReference): The uploaded file.
+            plan (ChunkPlan): The plan returned by `plan`.
+        """
+        if plan.stale_keys:
+            delete_documents(self._vector_store, plan.stale_keys)
+
+        self._manifest_manager.record_source_entry(
+            self._config_id,
+            plan.source,
+            self._config_hash,
+            plan.chunk_keys,
+            file.content_hash
+        )
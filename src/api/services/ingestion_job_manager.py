@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from loguru import logger
+from typing import Optional
+from uuid import uuid4
+
+from configs.config import config
+from models.ingestion_job import FileIngestionProgress, FileIngestionStatus, IngestionJob, IngestionJobStatus
+from models.temp_file_reference import TempFileReference
+from .ingestion_progress import IngestionCancelledError, IngestionProgressReporter
+from .rag_orchestrator import RagOrchestrator
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IngestionJobManager(object):
+    """
+    Runs document uploads on a bounded pool of background workers so ingestion does not block the API event loop.
+    Jobs are kept in memory, which means their status is only visible from the API instance that accepted them.
+    """
+    _executor: ThreadPoolExecutor
+    _history_size: int
+    _jobs: dict[str, IngestionJob]
+    _futures: dict[str, Future]
+    _cancel_events: dict[str, threading.Event]
+    _lock: threading.Lock
+
+    def __init__(self, max_workers: int, history_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._history_size = history_size
+        self._jobs = {}
+        self._futures = {}
+        self._cancel_events = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        rag_orchestrator: RagOrchestrator,
+        config_id: str,
+        files: list[TempFileReference],
+        skipped_files: Optional[list[TempFileReference]] = None
+    ) -> IngestionJob:
+        skipped_files = skipped_files or []
+
+        # skipped files go last so the indexes of the ingested files match their progress entries
+        job = IngestionJob(
+            id=str(uuid4()),
+            rag_config=config_id,
+            files=(
+                [FileIngestionProgress(file_name=file.file_name) for file in files] +
+                [FileIngestionProgress(file_name=file.file_name, status=FileIngestionStatus.SKIPPED) for file in skipped_files]
+            ),
+            created_at=_utc_now()
+        )
+        cancel_event = threading.Event()
+
+        with self._lock:
+            self._prune_finished_jobs()
+            self._jobs[job.id] = job
+            self._cancel_events[job.id] = cancel_event
+            if files:
+                self._futures[job.id] = self._executor.submit(self._run, job, rag_orchestrator, files, cancel_event)
+            else:
+                job.status = IngestionJobStatus.SUCCEEDED
+                job.started_at = job.finished_at = _utc_now()
+
+        logger.info(f"Queued ingestion job {job.id} for {config_id} with {len(files)} files, {len(skipped_files)} skipped")
+        return self.get(job.id)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+
+            if not job.is_finished:
+                self._cancel_events[job_id].set()
+
+                # jobs which have not been picked up by a worker yet can be cancelled right away,
+                # running jobs stop at the next stage boundary
+                if self._futures[job_id].cancel():
+                    self._mark_cancelled(job)
+
+        logger.info(f"Cancellation requested for ingestion job {job_id}")
+        return self.get(job_id)
+
+    def _run(
+        self,
+        job: IngestionJob,
+        rag_orchestrator: RagOrchestrator,
+        files: list[TempFileReference],
+        cancel_event: threading.Event
+    ):
+        with self._lock:
+            if cancel_event.is_set():
+                self._mark_cancelled(job)
+                return
+            job.status = IngestionJobStatus.RUNNING
+            job.started_at = _utc_now()
+
+        progress = IngestionProgressReporter(job, cancel_event, self._lock)
+        try:
+            rag_orchestrator.upload_documents(job.rag_config, files, progress)
+            with self._lock:
+                job.status = IngestionJobStatus.SUCCEEDED
+                job.finished_at = _utc_now()
+        except IngestionCancelledError:
+            logger.info(f"Ingestion job {job.id} was cancelled")
+            with self._lock:
+                self._mark_cancelled(job)
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed, exception details - {e}")
+            with self._lock:
+                job.status = IngestionJobStatus.FAILED
+                job.error = str(e)
+                job.finished_at = _utc_now()
+
+    def _mark_cancelled(self, job: IngestionJob):
+        job.status = IngestionJobStatus.CANCELLED
+        job.finished_at = _utc_now()
+        for file_progress in job.files:
+            if file_progress.status not in (FileIngestionStatus.INDEXED, FileIngestionStatus.SKIPPED, FileIngestionStatus.FAILED):
+                file_progress.status = FileIngestionStatus.CANCELLED
+
+    def _prune_finished_jobs(self):
+        finished_job_ids = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished_job_ids[:max(len(finished_job_ids) - self._history_size, 0)]:
+            self._jobs.pop(job_id)
+            self._futures.pop(job_id, None)
+            self._cancel_events.pop(job_id)
+
+
+ingestion_job_manager = IngestionJobManager(config.ingestion_max_workers, config.ingestion_job_history_size)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+from azure.cosmos import ContainerProxy, CosmosClient, PartitionKey, exceptions
+from datetime import datetime, timezone
+from fastapi.encoders import jsonable_encoder
+from typing import Optional
+
+from configs.cosmos_config import CosmosConfig
+from constants import RagConstants
+from models.rag_config import RagConfig
+
+
+_CONTAINER_PARTITION_KEY = "/config_id"
+_SOURCE_ENTRY_ID_PREFIX = "source-"
+
+
+def build_ingestion_config_hash(config: RagConfig) -> str:
+    """
+    Generates the SHA256 hash of the parts of a RAG config which determine the indexed chunks of a file,
+    with sorted keys so the order of the keys does not have any impact on the hash.
+
+    Args:
+        config (RagConfig): The RAG config.
+
+    Returns:
+        str: The hex digest of the loader, splitter, embedding and media enrichment configuration, and of the search backend.
+    """
+    obj = jsonable_encoder({
+        "loader_config": config.loader_config,
+        "splitter_config": config.splitter_config,
+        # the batching settings do not change the embeddings
+        "embedding_config": config.embedding_config.model_dump(include={"embedding_model_name", "embedding_model_kwargs"}),
+        "media_enrichment": config.media_enrichment
+    })
+    # files ingested into Azure AI Search are not in a local index, existing configs keep their hash
+    if config.search_config.backend != RagConstants.DEFAULT_SEARCH_BACKEND:
+        obj["search_backend"] = config.search_config.backend
+    obj_str = json.dumps(obj, sort_keys=True)
+    return hashlib.sha256(obj_str.encode()).hexdigest()
+
+
+class IngestionManifestManager(object):
+    """
+    Keeps a manifest per RAG config of the chunk keys currently indexed for each source,
+    together with the content hash of the file and the hash of the configuration which produced them.
+    """
+    _container: ContainerProxy
+
+    def __init__(self, cosmos_config: CosmosConfig):
+        cosmos_client = CosmosClient(
+            url=cosmos_config.azure_cosmos_db_uri,
+            credential=cosmos_config.azure_cosmos_db_key
+        )
+        database = cosmos_client.create_database_if_not_exists(cosmos_config.azure_cosmos_db_database)
+        self._container = database.create_container_if_not_exists(
+            cosmos_config.azure_cosmos_db_manifest_container,
+            partition_key=PartitionKey(_CONTAINER_PARTITION_KEY)
+        )
+
+
+    def is_ingested(self, config_id: str, source: str, content_hash: str, config_hash: str) -> bool:
+        """
+        Checks whether the chunks currently indexed for a source were produced from the same content with the same configuration.
+        Only the source is compared, as the chunks of a source are replaced on every ingestion:
+        content which was indexed before, but has been replaced since, is ingested again.
+
+        Args:
+            config_id (str): The RAG config id.
+            source (str): The source of the file, see `TempFileReference.source`.
+            content_hash (str): The SHA256 hex digest of the file content.
+            config_hash (str): The hash of the configuration, see `build_ingestion_config_hash`.
+
+        Returns:
+            bool: True if the file can be skipped.
+        """
+        entry = self.get_source_entry(config_id, source)
+        return bool(entry) and entry.get("content_hash") == content_hash and entry.get("config_hash") == config_hash
+
+
+    def get_source_entry(self, config_id: str, source: str) -> Optional[dict]:
+        try:
+            return self._container.read_item(item=_build_source_entry_id(source), partition_key=config_id)
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+
+
+    def record_source_entry(
+        self,
+        config_id: str,
+        source: str,
+        config_hash: str,
+        chunk_keys: list[str],
+        content_hash: Optional[str] = None
+    ):
+        self._container.upsert_item({
+            "id": _build_source_entry_id(source),
+            "config_id": config_id,
+            "source": source,
+            "content_hash": content_hash,
+            "config_hash": config_hash,
+            "chunk_keys": chunk_keys,
+            "ingested_at": datetime.now(timezone.utc).isoformat()
+        })
+
+
+_ingestion_manifest_manager: Optional[IngestionManifestManager] = None
+_ingestion_manifest_manager_lock = threading.Lock()
+
+
+def get_ingestion_manifest_manager() -> IngestionManifestManager:
+    global _ingestion_manifest_manager
+
+    if _ingestion_manifest_manager:
+        return _ingestion_manifest_manager
+
+    with _ingestion_manifest_manager_lock:
+        if not _ingestion_manifest_manager:
+            _ingestion_manifest_manager = IngestionManifestManager(CosmosConfig())
+
+    return _ingestion_manifest_manager
+
+
+def _build_source_entry_id(source: str) -> str:
+    # cosmos db ids can not contain some of the characters allowed in file names
+    return _SOURCE_ENTRY_ID_PREFIX + hashlib.sha256(source.encode()).hexdigest()
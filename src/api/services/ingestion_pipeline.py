@@ -0,0 +1,300 @@
+import contextvars
+import queue
+import threading
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from timeit import default_timer as timer
+from typing import Any, Callable, Optional
+
+from models.ingestion_job import FileIngestionStatus, IngestionStageMetrics
+from models.rag_config import RagConfig
+from models.temp_file_reference import TempFileReference
+from utils.metrics import ERROR_OUTCOME, INGESTION_STAGE_SECONDS, SUCCESS_OUTCOME
+from .document_processor import (
+    EMBED_STAGE, ENRICH_STAGE, LOAD_STAGE, SPLIT_STAGE, UPSERT_STAGE,
+    enrich_documents, init_loader, is_vision_loader, load_documents, split_documents
+)
+from .incremental_indexer import ChunkPlan, IncrementalIndexer
+from .ingestion_progress import IngestionProgressReporter
+from .search_index_writer import embed_documents
+
+
+_STOP = object()
+_QUEUE_PUT_TIMEOUT_SECONDS = 0.5
+
+
+class _PipelineStage(object):
+    """
+    A pool of worker threads taking items from the input queue and putting the handler results on the output queue.
+    Every item is a tuple starting with the index of the file it belongs to.
+    """
+    name: str
+    concurrency: int
+    input_queue: queue.Queue
+    output_queue: Optional[queue.Queue]
+    next_stage: Optional["_PipelineStage"]
+    metrics: IngestionStageMetrics
+
+    def __init__(
+        self,
+        pipeline: "IngestionPipeline",
+        name: str,
+        concurrency: int,
+        handler: Callable[..., list[tuple]],
+        queue_size: int
+    ):
+        self.name = name
+        self.concurrency = max(concurrency, 1)
+        self.input_queue = queue.Queue(maxsize=queue_size)
+        self.output_queue = None
+        self.next_stage = None
+        self.metrics = IngestionStageMetrics()
+
+        self._pipeline = pipeline
+        self._handler = handler
+        self._active_workers = self.concurrency
+        # each worker runs in a copy of the creating context, so the metrics recorded by the enrichment keep the config id
+        self._threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._work,), name=f"ingestion-{name}-{n}", daemon=True)
+            for n in range(self.concurrency)
+        ]
+
+    def connect(self, next_stage: "_PipelineStage"):
+        self.next_stage = next_stage
+        self.output_queue = next_stage.input_queue
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            item = self.input_queue.get()
+            if item is _STOP:
+                break
+
+            file_index = item[0]
+            if self._pipeline.should_skip(file_index):
+                continue
+
+            start_time = timer()
+            try:
+                outputs = self._handler(*item)
+            except Exception as e:
+                self._pipeline.record(self, file_index, timer() - start_time, failed=True)
+                self._pipeline.fail_file(file_index, self.name, e)
+                continue
+
+            self._pipeline.record(self, file_index, timer() - start_time)
+            if self.output_queue is not None:
+                for output in outputs:
+                    if not self._pipeline.put(self.output_queue, output):
+                        break
+
+        with self._pipeline.lock:
+            self._active_workers -= 1
+            is_last_worker = self._active_workers == 0
+
+        # the last worker of the stage lets the downstream stage know that no more items are coming
+        if is_last_worker and self.next_stage:
+            for _ in range(self.next_stage.concurrency):
+                self.next_stage.input_queue.put(_STOP)
+
+
+class IngestionPipeline(object):
+    """
+    Streams files through load, enrich, split, embed and upsert stages joined by bounded queues,
+    so the embedding and Azure AI Search calls of one file overlap with the parsing and enrichment of the next ones.
+    Bounded queues apply backpressure: a stage blocks when its downstream stage falls behind, which caps memory usage.
+    """
+    lock: threading.Lock
+
+    _config: RagConfig
+    _embedding_function: Embeddings
+    _indexer: IncrementalIndexer
+    _progress: IngestionProgressReporter
+    _files: list[TempFileReference]
+    _stages: list[_PipelineStage]
+    _failed_files: dict[int, str]
+    _remaining_batches: dict[int, int]
+    _chunk_plans: dict[int, ChunkPlan]
+    _file_timings: dict[int, dict[str, float]]
+
+    def __init__(
+        self,
+        config: RagConfig,
+        embedding_function: Embeddings,
+        indexer: IncrementalIndexer,
+        progress: IngestionProgressReporter
+    ):
+        self.lock = threading.Lock()
+        self._config = config
+        self._embedding_function = embedding_function
+        self._indexer = indexer
+        self._progress = progress
+        self._files = []
+        self._failed_files = {}
+        self._remaining_batches = {}
+        self._chunk_plans = {}
+        self._file_timings = {}
+        self._start_time = timer()
+
+        ingestion_config = config.ingestion_config
+        self._stages = [
+            _PipelineStage(self, LOAD_STAGE, ingestion_config.load_concurrency, self._load, ingestion_config.queue_size),
+            _PipelineStage(self, ENRICH_STAGE, ingestion_config.enrich_concurrency, self._enrich, ingestion_config.queue_size),
+            _PipelineStage(self, SPLIT_STAGE, ingestion_config.split_concurrency, self._split, ingestion_config.queue_size),
+            _PipelineStage(self, EMBED_STAGE, ingestion_config.embed_concurrency, self._embed, ingestion_config.queue_size),
+            _PipelineStage(self, UPSERT_STAGE, ingestion_config.upsert_concurrency, self._upsert, ingestion_config.queue_size),
+        ]
+        for stage, next_stage in zip(self._stages, self._stages[1:]):
+            stage.connect(next_stage)
+
+    def run(self, files: list[TempFileReference]) -> list[str]:
+        """
+        Ingests the files through the pipeline.
+
+        Args:
+            files (list[TempFileReference]): The uploaded files.
+
+        Returns:
+            list[str]: The names of the files which failed to ingest.
+
+        Raises:
+            IngestionCancelledError: If the ingestion was cancelled.
+        """
+        self._files = files
+        self._start_time = timer()
+
+        for stage in self._stages:
+            stage.start()
+
+        load_stage = self._stages[0]
+        for i in range(len(files)):
+            if not self.put(load_stage.input_queue, (i,)):
+                break
+        for _ in range(load_stage.concurrency):
+            load_stage.input_queue.put(_STOP)
+
+        for stage in self._stages:
+            stage.join()
+
+        stage_summary = ", ".join([
+            f"{stage.name} {stage.metrics.processed} items at {stage.metrics.throughput_per_second:.2f}/s (max queue depth {stage.metrics.max_queue_depth})"
+            for stage in self._stages
+        ])
+        logger.info(f"Pipeline ingestion finished in {timer() - self._start_time:.2f}s: {stage_summary}")
+
+        self._progress.raise_if_cancelled()
+        return [files[i].file_name for i in sorted(self._failed_files)]
+
+    def put(self, target_queue: queue.Queue, item: Any) -> bool:
+        # keeps blocking on full queues for backpressure, but gives up once the job is cancelled
+        while not self._progress.is_cancelled:
+            try:
+                target_queue.put(item, timeout=_QUEUE_PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def should_skip(self, file_index: int) -> bool:
+        return self._progress.is_cancelled or file_index in self._failed_files
+
+    def fail_file(self, file_index: int, stage_name: str, error: Exception):
+        file_name = self._files[file_index].file_name
+        logger.error(f"Failed to ingest file {file_name} in the {stage_name} stage, exception details - {error}")
+        with self.lock:
+            self._failed_files[file_index] = str(error)
+        self._progress.update(file_index, FileIngestionStatus.FAILED, error=str(error))
+
+    def record(self, stage: _PipelineStage, file_index: int, elapsed: float, failed: bool = False):
+        INGESTION_STAGE_SECONDS.labels(stage.name, self._config.id, ERROR_OUTCOME if failed else SUCCESS_OUTCOME).observe(elapsed)
+        with self.lock:
+            timings = self._file_timings.setdefault(file_index, {})
+            timings[stage.name] = timings.get(stage.name, 0.0) + elapsed
+
+            metrics = stage.metrics
+            if failed:
+                metrics.failed += 1
+            else:
+                metrics.processed += 1
+            metrics.busy_seconds += elapsed
+            metrics.throughput_per_second = metrics.processed / max(timer() - self._start_time, 1e-9)
+            metrics.queue_depth = stage.input_queue.qsize()
+            metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+
+            stage_metrics = {s.name: s.metrics.model_copy() for s in self._stages}
+
+            # a file is indexed once the last of its batches has been upserted
+            is_file_indexed = (
+                stage.name == UPSERT_STAGE and
+                not failed and
+                file_index not in self._failed_files and
+                self._remaining_batches.get(file_index) == 0
+            )
+
+        self._progress.update_stage_metrics(stage_metrics)
+        if is_file_indexed:
+            logger.debug(f"persisted file {file_index + 1} of {len(self._files)}")
+            self._progress.update(file_index, FileIngestionStatus.INDEXED, timings=self._timings(file_index))
+
+    def _timings(self, file_index: int) -> dict[str, float]:
+        with self.lock:
+            return dict(self._file_timings.get(file_index, {}))
+
+    def _load(self, file_index: int) -> list[tuple]:
+        file = self._files[file_index]
+        logger.debug(f"loading file {file_index + 1} of {len(self._files)}...")
+        loader = init_loader(file.temp_file_path, self._config.loader_config, self._config.media_enrichment)
+        documents = load_documents(loader)
+        self._progress.update(file_index, FileIngestionStatus.LOADED)
+        return [(file_index, loader, documents)]
+
+    def _enrich(self, file_index: int, loader, documents) -> list[tuple]:
+        if is_vision_loader(loader):
+            logger.debug(f"enriching file {file_index + 1} of {len(self._files)}...")
+            documents = enrich_documents(loader, documents)
+            self._progress.update(file_index, FileIngestionStatus.ENRICHED)
+        return [(file_index, documents)]
+
+    def _split(self, file_index: int, documents) -> list[tuple]:
+        logger.debug(f"splitting file {file_index + 1} of {len(self._files)}...")
+        chunks = split_documents(self._config.splitter_config, documents)
+        plan = self._indexer.plan(self._files[file_index], chunks)
+
+        # only the new or changed chunks go through the embed and upsert stages
+        batch_size = max(self._config.ingestion_config.batch_size, 1)
+        batches = [
+            (plan.documents[i:i + batch_size], plan.keys[i:i + batch_size])
+            for i in range(0, len(plan.documents), batch_size)
+        ]
+        with self.lock:
+            self._remaining_batches[file_index] = len(batches)
+            self._chunk_plans[file_index] = plan
+
+        self._progress.update(file_index, FileIngestionStatus.SPLIT, chunk_count=len(chunks), timings=self._timings(file_index))
+        if not batches:
+            self._indexer.commit(self._files[file_index], plan)
+            self._progress.update(file_index, FileIngestionStatus.INDEXED, timings=self._timings(file_index))
+        return [(file_index, batch, keys) for batch, keys in batches]
+
+    def _embed(self, file_index: int, batch, keys) -> list[tuple]:
+        embeddings = embed_documents(self._embedding_function, batch)
+        return [(file_index, batch, keys, embeddings)]
+
+    def _upsert(self, file_index: int, batch, keys, embeddings) -> list[tuple]:
+        self._indexer.upsert(batch, embeddings, keys)
+
+        with self.lock:
+            self._remaining_batches[file_index] -= 1
+            is_last_batch = self._remaining_batches[file_index] == 0
+
+        # stale chunks are only deleted once all the new chunks of the file are searchable
+        if is_last_batch:
+            self._indexer.commit(self._files[file_index], self._chunk_plans[file_index])
+        return []
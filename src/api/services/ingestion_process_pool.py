@@ -0,0 +1,27 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from configs.config import Config, config
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_ingestion_process_pool(config: Config = config) -> ProcessPoolExecutor:
+    global _process_pool
+
+    if _process_pool:
+        return _process_pool
+
+    with _process_pool_lock:
+        if not _process_pool:
+            # spawn instead of fork, the API process runs event loop and worker threads which are not fork safe
+            _process_pool = ProcessPoolExecutor(
+                max_workers=config.ingestion_process_pool_size,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    return _process_pool
@@ -0,0 +1,64 @@
+import threading
+from typing import Dict, Optional
+
+from models.ingestion_job import FileIngestionStatus, IngestionJob, IngestionStageMetrics
+
+
+class IngestionCancelledError(Exception):
+    pass
+
+
+class IngestionProgressReporter(object):
+    """
+    Receives per-file progress updates from the ingestion flow and signals cancellation requests back to it.
+    Without a job, updates are ignored so the flow can also run outside of the background job queue.
+    """
+    _job: Optional[IngestionJob]
+    _cancel_event: threading.Event
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        job: Optional[IngestionJob] = None,
+        cancel_event: Optional[threading.Event] = None,
+        lock: Optional[threading.Lock] = None
+    ):
+        self._job = job
+        self._cancel_event = cancel_event or threading.Event()
+        self._lock = lock or threading.Lock()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.is_cancelled:
+            raise IngestionCancelledError("The ingestion job was cancelled")
+
+    def update(
+        self,
+        file_index: int,
+        status: FileIngestionStatus,
+        chunk_count: Optional[int] = None,
+        timings: Optional[Dict[str, float]] = None,
+        error: Optional[str] = None
+    ):
+        if not self._job:
+            return
+
+        with self._lock:
+            file_progress = self._job.files[file_index]
+            file_progress.status = status
+            if chunk_count is not None:
+                file_progress.chunk_count = chunk_count
+            if timings is not None:
+                file_progress.timings = dict(timings)
+            if error is not None:
+                file_progress.error = error
+
+    def update_stage_metrics(self, stage_metrics: Dict[str, IngestionStageMetrics]):
+        if not self._job:
+            return
+
+        with self._lock:
+            self._job.stage_metrics = {stage: metrics.model_copy() for stage, metrics in stage_metrics.items()}
@@ -0,0 +1,85 @@
+import numpy as np
+import re
+from collections import Counter
+from langchain_core.documents import Document
+
+from langchain_extensions.embeddings.cached_embeddings import normalize_text
+
+
+_TERM_PATTERN = re.compile(r"\w+")
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TERM_PATTERN.findall(normalize_text(text).casefold())
+
+
+def _bm25_scores(query: str, documents: list[Document]) -> np.ndarray:
+    """
+    Scores the documents with BM25 on the query terms, with the document frequencies and lengths of the candidates,
+    so exact keyword, code and name matches which the vectors blur still count.
+    """
+    query_terms = list(dict.fromkeys(_tokenize(query)))
+    if not query_terms:
+        return np.zeros(len(documents))
+
+    term_frequencies = np.zeros((len(documents), len(query_terms)))
+    lengths = np.zeros(len(documents))
+    for i, doc in enumerate(documents):
+        terms = _tokenize(doc.page_content)
+        counts = Counter(terms)
+        term_frequencies[i] = [counts[term] for term in query_terms]
+        lengths[i] = len(terms)
+
+    document_frequencies = np.count_nonzero(term_frequencies, axis=0)
+    idf = np.log(1 + (len(documents) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+    average_length = lengths.mean() or 1
+    saturation = _BM25_K1 * (1 - _BM25_B + _BM25_B * lengths / average_length)
+    return (term_frequencies * (_BM25_K1 + 1) / (term_frequencies + saturation[:, None])) @ idf
+
+
+def _min_max_scale(scores: np.ndarray) -> np.ndarray:
+    spread = scores.max() - scores.min()
+    return (scores - scores.min()) / spread if spread else np.zeros_like(scores)
+
+
+def rerank(
+    query: str,
+    query_vector: list[float],
+    candidates: list[tuple[Document, list[float]]],
+    k: int,
+    lexical_weight: float
+) -> list[Document]:
+    """
+    Reranks over-fetched search candidates by the cosine similarity of their stored vectors with the query,
+    blended with their BM25 score on the query terms, and keeps the best `k`.
+    Both scores are scaled to [0, 1] over the candidates before blending.
+
+    Args:
+        query (str): The query text.
+        query_vector (list[float]): The embedding of the query.
+        candidates (list[tuple[Document, list[float]]]): The candidates and their stored vectors.
+        k (int): The number of documents to keep.
+        lexical_weight (float): The weight of the BM25 score, between 0 and 1, the cosine similarity weighing the rest.
+
+    Returns:
+        list[Document]: The best `k` candidates, from the most relevant.
+    """
+    if not candidates:
+        return []
+
+    documents = [doc for doc, _ in candidates]
+    vectors = np.asarray([vector for _, vector in candidates], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1
+    query_array = np.asarray(query_vector, dtype=np.float32)
+    cosine_similarities = (vectors @ query_array) / (norms * (np.linalg.norm(query_array) or 1))
+
+    scores = (
+        (1 - lexical_weight) * _min_max_scale(cosine_similarities) +
+        lexical_weight * _min_max_scale(_bm25_scores(query, documents))
+    )
+    # a stable sort keeps the search order of tied candidates
+    best = np.argsort(-scores, kind="stable")[:k]
+    return [documents[i] for i in best]
@@ -1,89 +1,167 @@
-
+import asyncio
+import os
+from concurrent.futures import Future
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from importlib import import_module
 from langchain_community.document_loaders import *
-from langchain_community.vectorstores.azuresearch import AzureSearch, AzureSearchVectorStoreRetriever
-from langchain_core.embeddings import Embeddings
-from langchain_core.document_loaders import BaseLoader
+from langchain_community.vectorstores.azuresearch import AzureSearch
 from langchain_core.documents import Document
-from langchain_text_splitters import TextSplitter
+from langchain_core.embeddings import Embeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
+from langchain_core.runnables import RunnablePassthrough
 from langchain_openai import AzureChatOpenAI
 from loguru import logger
-from typing import Annotated, Optional
+from timeit import default_timer as timer
+from typing import Annotated, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, TypeVar, Union
 
-from enrichment.models.endpoint import MediaEnrichmentRequest
 from configs.config import Config
+from constants import RagConstants
+from langchain_extensions.embeddings import BatchedEmbeddings, CachedEmbeddings, QueryEmbeddings
+from langchain_extensions.vectorstores import LocalVectorStore
+from langchain_extensions.vectorstores.local_vector_index import get_local_vector_index
+from models.ingestion_job import FileIngestionStatus
 from models.temp_file_reference import TempFileReference
-from models.rag_config import EmbeddingConfig, LoaderConfig, SplitterConfig, RagConfig, SearchConfig
+from models.rag_config import EmbeddingConfig, RagConfig, SearchConfig
+from models.responses.batch_chat_result import BatchChatResult
+from models.responses.batch_search_result import BatchSearchResult
 from models.responses.chat_response import ChatResponse
-from .cosmos_config_manager import CosmosConfigManager
-from .vision_ingest_class_manager import vision_ingest_class_manager
+from models.responses.chat_stream_event import ChatStreamEvent
+from utils.metrics import (
+    CHAT_BATCH_OPERATION, CHAT_OPERATION, CHAT_STREAM_OPERATION, COMPLETION_TOKENS, CONFIG_STAGE, CONTEXT_SAVED_TOKENS,
+    CONTEXT_TOKENS, DEADLINE_EXCEEDED_OUTCOME, EMBED_STAGE, ERROR_OUTCOME, GENERATE_STAGE, INGESTION_STAGE_SECONDS,
+    PACK_STAGE, PROMPT_TOKENS, REQUEST_SECONDS, RERANK_STAGE, RETRIEVE_STAGE, SEARCH_BATCH_OPERATION, SEARCH_OPERATION,
+    STAGE_SECONDS, SUCCESS_OUTCOME, UNKNOWN_CONFIG_ID, UPLOAD_OPERATION, config_id_context, observe_duration, observe_tokens
+)
+from utils.openai_endpoint_pool import get_openai_endpoint_pool
+from utils.token_counter import count_tokens
+from .async_vector_search import AsyncVectorSearch
+from .context_packer import PackedContext, pack_context
+from .cosmos_config_manager import CosmosConfigManager, get_cosmos_config_manager
+from .document_processor import (
+    ENRICH_STAGE, INDEX_STAGE, LOAD_STAGE, SPLIT_STAGE, ProcessedFile,
+    enrich_documents, init_loader, is_vision_loader, load_documents, process_file, split_documents
+)
+from .embedding_cache import build_embedding_namespace, get_embedding_cache
+from .incremental_indexer import IncrementalIndexer
+from .ingestion_manifest_manager import IngestionManifestManager, build_ingestion_config_hash, get_ingestion_manifest_manager
+from .ingestion_pipeline import IngestionPipeline
+from .ingestion_process_pool import get_ingestion_process_pool
+from .ingestion_progress import IngestionCancelledError, IngestionProgressReporter
+from .local_reranker import rerank
+from .rag_resource_pool import ChatChain, RagResources, rag_resource_pool
+from .request_deadline import (
+    CHAT_STAGES, SEARCH_STAGES, DeadlineExceededError, iterate_stage, run_stage, start_deadline
+)
+from .search_result_cache import get_search_result_cache
+from .semantic_answer_cache import semantic_answer_cache
+
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def _build_index_name(config_id: str):
     return f"index-{config_id}-ais"
 
 
+def _format_docs(docs):
+    return "\n\n".join([d.page_content for d in docs])
+
+
+def _observe_chat_tokens(
+    config_id: str,
+    chat_chain: ChatChain,
+    context: PackedContext,
+    query: str,
+    answer: str
+) -> tuple[int, int]:
+    """
+    Counts the tokens of the prompt and of the answer of a chat, and observes them with the packed and saved context tokens.
+
+    Returns:
+        tuple[int, int]: The prompt and completion tokens.
+    """
+    prompt_text = chat_chain.prompt.format(context=_format_docs(context.documents), question=query)
+    prompt_tokens, completion_tokens = count_tokens([prompt_text, answer])
+    observe_tokens(PROMPT_TOKENS, prompt_tokens, config_id)
+    observe_tokens(COMPLETION_TOKENS, completion_tokens, config_id)
+    observe_tokens(CONTEXT_TOKENS, context.stats.context_tokens, config_id)
+    observe_tokens(CONTEXT_SAVED_TOKENS, context.stats.tokens_saved, config_id)
+    return prompt_tokens, completion_tokens
+
+
+async def _amap_in_order(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int
+) -> AsyncIterator[R]:
+    """
+    Runs `func` on the items with at most `concurrency` calls at the same time, yielding the results in input order.
+    Pending calls are cancelled when the consumer stops early, e.g. when a streaming client disconnects.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 class RagOrchestrator(object):
     _config: Config
     _cosmos_config_manager: CosmosConfigManager
+    _ingestion_manifest_manager: IngestionManifestManager
 
     def __init__(
         self,
         config: Annotated[Config, Depends(Config)],
-        cosmos_config_manager: Annotated[CosmosConfigManager, Depends(CosmosConfigManager)]
+        cosmos_config_manager: Annotated[CosmosConfigManager, Depends(get_cosmos_config_manager)],
+        ingestion_manifest_manager: Annotated[IngestionManifestManager, Depends(get_ingestion_manifest_manager)]
     ):
         self._config = config
         self._cosmos_config_manager = cosmos_config_manager
+        self._ingestion_manifest_manager = ingestion_manifest_manager
 
 
-    def _init_embeddings(self, embedding_config: EmbeddingConfig) -> Embeddings:
+    def _init_embeddings(self, embedding_config: EmbeddingConfig) -> QueryEmbeddings:
         embedding_function = getattr(
             import_module("langchain_community.embeddings"),
             embedding_config.embedding_model_name
         )
-        return embedding_function(**embedding_config.embedding_model_kwargs)
-
-    def _load_documents(
-        self,
-        file_path: str,
-        loader_config: LoaderConfig,
-        media_enrichment: Optional[MediaEnrichmentRequest] = None
-    ) -> list[Document]:
-
-        if (vision_ingest_class_manager.is_vision_loader(loader_config.loader_name)):
-            if not media_enrichment:
-                raise Exception("A vision loader must set a media_enrichment request.")
-
-            return vision_ingest_class_manager.initialize_vision_loader(loader_config, file_path, media_enrichment).load()
-        else:
-            loader: BaseLoader = getattr(
-                import_module("langchain_community.document_loaders"),
-                loader_config.loader_name
-            )
-            return loader(file_path=file_path, **loader_config.loader_kwargs).load()
-
-    def _split_documents(
-        self,
-        splitter_config: SplitterConfig,
-        documents: list[Document]
-    ) -> list[Document]:
-
-        if (vision_ingest_class_manager.is_vision_splitter(splitter_config.splitter_name)):
-            return vision_ingest_class_manager.initialize_vision_splitter(splitter_config).split_documents(documents)
-        else:
-            splitter = self._init_splitter(splitter_config)
-            return splitter.split_documents(documents)
+        model = embedding_function(**embedding_config.embedding_model_kwargs)
+        endpoint_pool = get_openai_endpoint_pool(self._config)
+        if endpoint_pool:
+            endpoint_pool.bind(model)
+
+        query_embeddings = embeddings = BatchedEmbeddings(
+            model,
+            batch_size=embedding_config.batch_size,
+            batch_max_tokens=embedding_config.batch_max_tokens,
+            concurrency=embedding_config.concurrency,
+            max_retries=embedding_config.max_retries
+        )
 
-    def _init_splitter(self, splitter_config: SplitterConfig) -> TextSplitter:
-        splitter = getattr(
-            import_module("langchain_text_splitters"),
-            splitter_config.splitter_name
+        embedding_cache = get_embedding_cache(self._config)
+        if embedding_cache:
+            embeddings = CachedEmbeddings(embeddings, embedding_cache, build_embedding_namespace(embedding_config))
+
+        return QueryEmbeddings(
+            embeddings,
+            cache_size=self._config.query_embedding_cache_size,
+            max_batch_size=self._config.query_embedding_batch_max_size,
+            max_wait_seconds=self._config.query_embedding_batch_max_wait_seconds,
+            # the queries are not stored in the cache of the documents, where they would evict chunk vectors
+            query_embeddings=query_embeddings
         )
-        return splitter(**splitter_config.splitter_kwargs)
 
     def _init_azure_search(
         self,
@@ -100,107 +178,600 @@ class RagOrchestrator(object):
             embedding_function=embedding_function
         )
 
+    def _init_local_vector_store(
+        self,
+        config: Config,
+        search_config: SearchConfig,
+        embedding_function: Embeddings,
+        index_name: str
+    ) -> LocalVectorStore:
+        return LocalVectorStore(
+            get_local_vector_index(os.path.join(config.local_vector_store_path, index_name)),
+            embedding_function,
+            ivf_nlist=search_config.ivf_nlist if search_config.local_index_type == RagConstants.IVF_LOCAL_INDEX_TYPE else None,
+            ivf_nprobe=search_config.ivf_nprobe
+        )
+
     def _try_get_config(self, config_id: str)-> RagConfig:
-        config = self._cosmos_config_manager.get(config_id)
+        with observe_duration(STAGE_SECONDS, CONFIG_STAGE, UNKNOWN_CONFIG_ID) as observation:
+            config = self._cosmos_config_manager.get(config_id)
+            if config:
+                observation.config_id = config.id
         if not config:
             raise HTTPException(status_code=404, detail=f"Config {config_id} not found")
         return config
 
-    def search(
-        self,
-        config_id: str,
-        query: str
-    ):
-        logger.debug("Initializing search dependencies...")
-        index_name = _build_index_name(config_id)
-        config = self._try_get_config(config_id)
+    async def _atry_get_config(self, config_id: str) -> RagConfig:
+        with observe_duration(STAGE_SECONDS, CONFIG_STAGE, UNKNOWN_CONFIG_ID) as observation:
+            config = await run_stage(CONFIG_STAGE, self._cosmos_config_manager.aget(config_id))
+            if config:
+                observation.config_id = config.id
+        if not config:
+            raise HTTPException(status_code=404, detail=f"Config {config_id} not found")
+        return config
+
+    def get_config(self, config_id: str) -> RagConfig:
+        return self._try_get_config(config_id)
+
+    async def aget_config(self, config_id: str) -> RagConfig:
+        return await self._atry_get_config(config_id)
 
+    def _create_resources(self, config: RagConfig) -> RagResources:
         embedding_function = self._init_embeddings(config.embedding_config)
+        if config.search_config.backend == RagConstants.LOCAL_SEARCH_BACKEND:
+            return RagResources(
+                config=config,
+                embedding_function=embedding_function,
+                vector_store=self._init_local_vector_store(
+                    self._config,
+                    config.search_config,
+                    embedding_function,
+                    _build_index_name(config.id)
+                )
+            )
+
         vector_store = self._init_azure_search(
             self._config,
             config.search_config,
             embedding_function,
-            index_name
+            _build_index_name(config.id)
+        )
+        async_vector_store = AsyncVectorSearch(
+            azure_search_endpoint=self._config._azure_search_endpoint,
+            azure_search_key=self._config._azure_search_api_key,
+            index_name=_build_index_name(config.id),
+            embedding_function=embedding_function,
+            vector_store=vector_store
+        )
+        return RagResources(
+            config=config,
+            embedding_function=embedding_function,
+            vector_store=vector_store,
+            async_vector_store=async_vector_store
         )
 
-        logger.info(f"Searching for {query} in {config_id}...")
-        return vector_store.similarity_search(query, k=config.search_config.search_k)
+    def _get_resources(self, config: RagConfig) -> RagResources:
+        return rag_resource_pool.get_or_create(config, self._create_resources)
 
+    async def _aget_resources(self, config: RagConfig) -> RagResources:
+        # creating the vector store may create the search index, so pool misses run on the thread pool
+        return await run_in_threadpool(self._get_resources, config)
 
-    def chat(
+    async def _aretrieve(
         self,
-        config_id: str,
-        query: str
-    ):
-        logger.debug("Initializing chat dependencies...")
-        index_name = _build_index_name(config_id)
-        config = self._try_get_config(config_id)
+        resources: RagResources,
+        query: str,
+        query_vector: Optional[list[float]] = None
+    ) -> list[Document]:
+        config = resources.config
+        search_config = config.search_config
+        if query_vector is None:
+            with observe_duration(STAGE_SECONDS, EMBED_STAGE, config.id):
+                query_vector = await run_stage(EMBED_STAGE, resources.embedding_function.aembed_query(query))
+
+        if search_config.rerank_candidates:
+            # over-fetches the candidates with their stored vectors, so reranking needs no further network call
+            with observe_duration(STAGE_SECONDS, RETRIEVE_STAGE, config.id):
+                if resources.async_vector_store:
+                    candidates = await run_stage(
+                        RETRIEVE_STAGE,
+                        resources.async_vector_store.asimilarity_search_with_vectors(
+                            query,
+                            query_vector,
+                            k=search_config.rerank_candidates,
+                            search_type=search_config.search_type
+                        )
+                    )
+                else:
+                    candidates = await run_stage(
+                        RETRIEVE_STAGE,
+                        run_in_threadpool(
+                            resources.vector_store.similarity_search_with_vectors_by_vector,
+                            query_vector,
+                            k=search_config.rerank_candidates
+                        )
+                    )
+
+            with observe_duration(STAGE_SECONDS, RERANK_STAGE, config.id):
+                return rerank(query, query_vector, candidates, search_config.search_k, search_config.rerank_lexical_weight)
+
+        with observe_duration(STAGE_SECONDS, RETRIEVE_STAGE, config.id):
+            if resources.async_vector_store:
+                return await run_stage(
+                    RETRIEVE_STAGE,
+                    resources.async_vector_store.asimilarity_search_by_vector(
+                        query,
+                        query_vector,
+                        k=search_config.search_k,
+                        search_type=search_config.search_type
+                    )
+                )
+            return await run_stage(
+                RETRIEVE_STAGE,
+                resources.vector_store.asimilarity_search_by_vector(query_vector, k=search_config.search_k)
+            )
 
+    def _build_chat_chain(self, config: RagConfig) -> ChatChain:
         prompt = ChatPromptTemplate.from_template(config.chat_config.prompt_template)
         model = AzureChatOpenAI(
             azure_deployment=config.chat_config.azure_deployment,
             api_version=self._config.openai_version,
             **config.chat_config.llm_kwargs
         )
-
-        embedding_function = self._init_embeddings(config.embedding_config)
-        vector_store = self._init_azure_search(
-            self._config,
-            config.search_config,
-            embedding_function,
-            index_name
-        )
-        retriever = AzureSearchVectorStoreRetriever(
-            vectorstore=vector_store,
-            search_type=config.search_config.search_type,
-            k=config.search_config.search_k
-        )
-
-        def format_docs(docs):
-            return "\n\n".join([d.page_content for d in docs])
-
+        endpoint_pool = get_openai_endpoint_pool(self._config)
+        if endpoint_pool:
+            endpoint_pool.bind(model)
         chain = (
-            RunnablePassthrough.assign(context=(lambda x: format_docs(x["context"])))
+            RunnablePassthrough.assign(context=(lambda x: _format_docs(x["context"])))
             | prompt
             | model
             | StrOutputParser()
         )
 
-        chain_with_source = RunnableParallel(
-            {"context": retriever, "question": RunnablePassthrough()}
-        ).assign(answer=chain)
+        return ChatChain(
+            prompt=prompt,
+            answer_chain=chain
+        )
+
+    def _get_chat_chain(self, resources: RagResources) -> ChatChain:
+        with resources.lock:
+            if not resources.chat_chain:
+                resources.chat_chain = self._build_chat_chain(resources.config)
+            return resources.chat_chain
 
-        logger.info(f"Chatting with model for {config_id}...")
-        chain_response = chain_with_source.invoke(query)
+    async def _asearch(
+        self,
+        resources: RagResources,
+        query: str,
+        query_vector: Optional[list[float]] = None
+    ) -> list[Document]:
+        search_cache = get_search_result_cache(self._config)
+        cache_key = search_cache.build_key(resources.config, query) if search_cache else None
+        if search_cache:
+            cached_documents = search_cache.get(cache_key)
+            if cached_documents is not None:
+                return cached_documents
+
+        logger.info(f"Searching for {query} in {resources.config.id}...")
+        start_time = timer()
+        documents = await self._aretrieve(resources, query, query_vector)
+        if search_cache:
+            search_cache.set(cache_key, documents, timer() - start_time)
+        return documents
+
+    async def _achat(
+        self,
+        resources: RagResources,
+        query: str,
+        query_vector: Optional[list[float]] = None
+    ) -> ChatResponse:
+        config = resources.config
+        chat_chain = self._get_chat_chain(resources)
+
+        if config.semantic_cache_config.enabled:
+            # the query is embedded once, for both the cache lookup and the retrieval
+            if query_vector is None:
+                with observe_duration(STAGE_SECONDS, EMBED_STAGE, config.id):
+                    query_vector = await run_stage(EMBED_STAGE, resources.embedding_function.aembed_query(query))
+            cached_response = semantic_answer_cache.get(config, query_vector)
+            if cached_response:
+                logger.info(f"Serving a cached answer for {config.id}")
+                return cached_response
+
+        logger.info(f"Chatting with model for {config.id}...")
+        documents = await self._aretrieve(resources, query, query_vector)
+        with observe_duration(STAGE_SECONDS, PACK_STAGE, config.id):
+            context = pack_context(config.chat_config, documents)
+        with observe_duration(STAGE_SECONDS, GENERATE_STAGE, config.id):
+            answer = await run_stage(
+                GENERATE_STAGE,
+                chat_chain.answer_chain.ainvoke({"context": context.documents, "question": query})
+            )
+        _observe_chat_tokens(config.id, chat_chain, context, query, answer)
 
-        answer = chain_response["answer"]
-        sources_dict = [doc.dict() for doc in chain_response["context"]]
-        return ChatResponse(
+        response = ChatResponse(
             answer=answer,
-            sources=sources_dict
+            sources=[doc.dict() for doc in context.documents],
+            context=context.stats
         )
+        if config.semantic_cache_config.enabled:
+            semantic_answer_cache.set(config, query_vector, response)
+        return response
 
+    async def _aembed_queries(self, resources: RagResources, queries: list[str]) -> list[list[float]]:
+        # a single batched embedding call for all the queries, which also serves the recent queries from memory
+        return await run_in_threadpool(resources.embedding_function.embed_queries, queries)
 
-    def upload_documents(
+    async def asearch(
         self,
         config_id: str,
+        query: str,
+        timeout_seconds: Optional[float] = None
+    ) -> list[Document]:
+        with observe_duration(REQUEST_SECONDS, SEARCH_OPERATION, UNKNOWN_CONFIG_ID) as observation, start_deadline(SEARCH_STAGES, timeout_seconds) as deadline:
+            logger.debug("Initializing search dependencies...")
+            config = await self._atry_get_config(config_id)
+            observation.config_id = config.id
+            deadline.set_default_timeout(config.request_timeout_seconds)
+            resources = await self._aget_resources(config)
+            return await self._asearch(resources, query)
+
+    async def achat(
+        self,
+        config_id: str,
+        query: str,
+        timeout_seconds: Optional[float] = None
+    ) -> ChatResponse:
+        with observe_duration(REQUEST_SECONDS, CHAT_OPERATION, UNKNOWN_CONFIG_ID) as observation, start_deadline(CHAT_STAGES, timeout_seconds) as deadline:
+            logger.debug("Initializing chat dependencies...")
+            config = await self._atry_get_config(config_id)
+            observation.config_id = config.id
+            deadline.set_default_timeout(config.request_timeout_seconds)
+            resources = await self._aget_resources(config)
+            return await self._achat(resources, query)
+
+    async def abatch_search(
+        self,
+        config_id: str,
+        queries: list[str]
+    ) -> AsyncIterator[BatchSearchResult]:
+        """
+        Searches many queries of one config, embedding them in one batched call and searching them concurrently.
+
+        Args:
+            config_id (str): The RAG config id.
+            queries (list[str]): The search queries.
+
+        Returns:
+            AsyncIterator[BatchSearchResult]: The result of each query in input order, as soon as it and the previous results are ready.
+        """
+        with observe_duration(REQUEST_SECONDS, SEARCH_BATCH_OPERATION, UNKNOWN_CONFIG_ID) as observation:
+            config = await self._atry_get_config(config_id)
+            observation.config_id = config.id
+            resources = await self._aget_resources(config)
+            with observe_duration(STAGE_SECONDS, EMBED_STAGE, config.id):
+                query_vectors = await self._aembed_queries(resources, queries)
+
+            async def search(index: int) -> BatchSearchResult:
+                try:
+                    documents = await self._asearch(resources, queries[index], query_vectors[index])
+                    return BatchSearchResult(index=index, query=queries[index], documents=[doc.dict() for doc in documents])
+                except Exception as e:
+                    logger.error(f"Failed to search query {index} of the batch for {config_id}, exception details - {e}")
+                    return BatchSearchResult(index=index, query=queries[index], error=str(e))
+
+            async for result in _amap_in_order(search, range(len(queries)), self._config.batch_concurrency):
+                yield result
+
+    async def abatch_chat(
+        self,
+        config_id: str,
+        queries: list[str]
+    ) -> AsyncIterator[BatchChatResult]:
+        """
+        Answers many queries of one config, embedding them in one batched call and answering them concurrently.
+
+        Args:
+            config_id (str): The RAG config id.
+            queries (list[str]): The user queries.
+
+        Returns:
+            AsyncIterator[BatchChatResult]: The result of each query in input order, as soon as it and the previous results are ready.
+        """
+        with observe_duration(REQUEST_SECONDS, CHAT_BATCH_OPERATION, UNKNOWN_CONFIG_ID) as observation:
+            config = await self._atry_get_config(config_id)
+            observation.config_id = config.id
+            resources = await self._aget_resources(config)
+            with observe_duration(STAGE_SECONDS, EMBED_STAGE, config.id):
+                query_vectors = await self._aembed_queries(resources, queries)
+
+            async def chat(index: int) -> BatchChatResult:
+                try:
+                    response = await self._achat(resources, queries[index], query_vectors[index])
+                    return BatchChatResult(
+                        index=index,
+                        query=queries[index],
+                        answer=response.answer,
+                        sources=response.sources,
+                        context=response.context
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to answer query {index} of the batch for {config_id}, exception details - {e}")
+                    return BatchChatResult(index=index, query=queries[index], error=str(e))
+
+            async for result in _amap_in_order(chat, range(len(queries)), self._config.batch_concurrency):
+                yield result
+
+    async def chat_stream(
+        self,
+        config_id: str,
+        query: str,
+        timeout_seconds: Optional[float] = None
+    ) -> AsyncIterator[ChatStreamEvent]:
+        """
+        Streams a chat response: the retrieved sources as soon as retrieval completes,
+        then the answer tokens as the model generates them, then the token usage and timings.
+
+        Args:
+            config_id (str): The RAG config id.
+            query (str): The user query.
+            timeout_seconds (Optional[float]): The deadline of the chat, defaults to the one of the RAG config.
+
+        Returns:
+            AsyncIterator[ChatStreamEvent]: The `sources`, `token` and `done` events, or an `error` event if the chat fails.
+        """
+        start_time = timer()
+        with observe_duration(REQUEST_SECONDS, CHAT_STREAM_OPERATION, UNKNOWN_CONFIG_ID) as observation, start_deadline(CHAT_STAGES, timeout_seconds) as deadline:
+            try:
+                config = await self._atry_get_config(config_id)
+                observation.config_id = config.id
+                deadline.set_default_timeout(config.request_timeout_seconds)
+                resources = await self._aget_resources(config)
+                chat_chain = self._get_chat_chain(resources)
+
+                logger.info(f"Streaming chat with model for {config_id}...")
+                documents = await self._aretrieve(resources, query)
+                with observe_duration(STAGE_SECONDS, PACK_STAGE, config.id):
+                    context = pack_context(config.chat_config, documents)
+                docs = context.documents
+                retrieval_seconds = timer() - start_time
+                yield ChatStreamEvent(
+                    event="sources",
+                    data={"sources": [doc.dict() for doc in docs], "context": context.stats.model_dump()}
+                )
+
+                answer_tokens: list[str] = []
+                first_token_seconds = None
+                with observe_duration(STAGE_SECONDS, GENERATE_STAGE, config.id):
+                    async for token in iterate_stage(
+                        GENERATE_STAGE,
+                        chat_chain.answer_chain.astream({"context": docs, "question": query})
+                    ):
+                        if first_token_seconds is None:
+                            first_token_seconds = timer() - start_time
+                        answer_tokens.append(token)
+                        yield ChatStreamEvent(event="token", data={"token": token})
+
+                # the streamed completions do not report their usage, so the tokens are counted locally
+                prompt_tokens, completion_tokens = _observe_chat_tokens(config.id, chat_chain, context, query, "".join(answer_tokens))
+                yield ChatStreamEvent(
+                    event="done",
+                    data={
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens
+                        },
+                        "timings": {
+                            "retrieval": retrieval_seconds,
+                            "first_token": first_token_seconds,
+                            "total": timer() - start_time
+                        }
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Failed to stream chat for {config_id}, exception details - {e}")
+                observation.outcome = DEADLINE_EXCEEDED_OUTCOME if isinstance(e, DeadlineExceededError) else ERROR_OUTCOME
+                yield ChatStreamEvent(event="error", data={"detail": str(e)})
+
+
+    def _process_files_sequentially(
+        self,
+        config: RagConfig,
         files: list[TempFileReference],
-    ):
-        logger.info(f"Starting upload documents for {config_id}")
+        progress: IngestionProgressReporter
+    ) -> Iterator[tuple[int, Union[ProcessedFile, Exception]]]:
+        for i, file in enumerate(files):
+            timings: dict[str, float] = {}
+            try:
+                progress.raise_if_cancelled()
+                logger.debug(f"loading file {i + 1} of {len(files)}...")
+                start_time = timer()
+                loader = init_loader(file.temp_file_path, config.loader_config, config.media_enrichment)
+                docs = load_documents(loader)
+                timings[LOAD_STAGE] = timer() - start_time
+                progress.update(i, FileIngestionStatus.LOADED, timings=timings)
+
+                if is_vision_loader(loader):
+                    progress.raise_if_cancelled()
+                    logger.debug(f"enriching file {i + 1} of {len(files)}...")
+                    start_time = timer()
+                    docs = enrich_documents(loader, docs)
+                    timings[ENRICH_STAGE] = timer() - start_time
+                    progress.update(i, FileIngestionStatus.ENRICHED, timings=timings)
+
+                progress.raise_if_cancelled()
+                logger.debug(f"splitting file {i + 1} of {len(files)}...")
+                start_time = timer()
+                docs = split_documents(config.splitter_config, docs)
+                timings[SPLIT_STAGE] = timer() - start_time
+                progress.update(i, FileIngestionStatus.SPLIT, chunk_count=len(docs), timings=timings)
+            except IngestionCancelledError:
+                raise
+            except Exception as e:
+                yield i, e
+                continue
+
+            yield i, ProcessedFile(documents=docs, is_vision_loader=is_vision_loader(loader), timings=timings)
+
+    def _process_files_in_process_pool(
+        self,
+        config: RagConfig,
+        files: list[TempFileReference],
+        progress: IngestionProgressReporter
+    ) -> Iterator[tuple[int, Union[ProcessedFile, Exception]]]:
+        process_pool = get_ingestion_process_pool(self._config)
+
+        # limit the files processed ahead of indexing so memory stays bounded for large uploads
+        max_pending_files = self._config.ingestion_process_pool_size * 2
+        futures: list[Future] = []
+
+        try:
+            for i in range(len(files)):
+                while len(futures) < len(files) and len(futures) - i < max_pending_files:
+                    file = files[len(futures)]
+                    futures.append(process_pool.submit(
+                        process_file,
+                        file.temp_file_path,
+                        config.loader_config,
+                        config.splitter_config,
+                        config.media_enrichment
+                    ))
+
+                progress.raise_if_cancelled()
+                logger.debug(f"waiting for file {i + 1} of {len(files)} from the process pool...")
+                try:
+                    processed_file: ProcessedFile = futures[i].result()
+                except Exception as e:
+                    yield i, e
+                    continue
+
+                progress.update(i, FileIngestionStatus.LOADED)
+                if processed_file.is_vision_loader:
+                    progress.update(i, FileIngestionStatus.ENRICHED)
+                progress.update(
+                    i,
+                    FileIngestionStatus.SPLIT,
+                    chunk_count=len(processed_file.documents),
+                    timings=processed_file.timings
+                )
+                yield i, processed_file
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def partition_ingested_files(
+        self,
+        config_id: str,
+        files: list[TempFileReference]
+    ) -> tuple[list[TempFileReference], list[TempFileReference]]:
+        """
+        Splits the uploaded files into the files to ingest and the files which can be skipped,
+        because the chunks indexed for their source were produced from the same content with the same loader, splitter,
+        embedding and media enrichment configuration.
+
+        Args:
+            config_id (str): The RAG config id.
+            files (list[TempFileReference]): The uploaded files.
+
+        Returns:
+            tuple[list[TempFileReference], list[TempFileReference]]: The files to ingest and the skipped files.
+        """
         config = self._try_get_config(config_id)
-        index_name = _build_index_name(config_id)
-        embedding_function = self._init_embeddings(config.embedding_config)
-        vector_store = self._init_azure_search(
-            self._config,
-            config.search_config,
-            embedding_function,
-            index_name
-        )
+        config_hash = build_ingestion_config_hash(config)
 
-        for i, file in enumerate(files):
-            logger.debug(f"loading file {i + 1} of {len(files)}...")
-            docs = self._load_documents(file.temp_file_path, config.loader_config, config.media_enrichment)
-            logger.debug(f"splitting file {i + 1} of {len(files)}...")
-            docs = self._split_documents(config.splitter_config, docs)
-            logger.debug(f"persisting file {i + 1} of {len(files)}...")
-            vector_store.add_documents(docs)
+        new_files: list[TempFileReference] = []
+        skipped_files: list[TempFileReference] = []
+        for file in files:
+            source = file.source or file.file_name
+            if file.content_hash and self._ingestion_manifest_manager.is_ingested(config_id, source, file.content_hash, config_hash):
+                logger.info(f"Skipping file {file.file_name}, its content is already indexed for source {source} of {config_id}")
+                skipped_files.append(file)
+                continue
+
+            new_files.append(file)
+
+        return new_files, skipped_files
+
+    def _index_processed_files(
+        self,
+        indexer: IncrementalIndexer,
+        embedding_function: Embeddings,
+        files: list[TempFileReference],
+        processed_files: Iterator[tuple[int, Union[ProcessedFile, Exception]]],
+        progress: IngestionProgressReporter
+    ) -> list[str]:
+        failed_files: list[str] = []
+        for i, result in processed_files:
+            file = files[i]
+            progress.raise_if_cancelled()
+            try:
+                if isinstance(result, Exception):
+                    raise result
+
+                logger.debug(f"persisting file {i + 1} of {len(files)}...")
+                start_time = timer()
+                with observe_duration(INGESTION_STAGE_SECONDS, INDEX_STAGE):
+                    indexer.index(file, indexer.plan(file, result.documents), embedding_function)
+                result.timings[INDEX_STAGE] = timer() - start_time
+                progress.update(i, FileIngestionStatus.INDEXED, timings=result.timings)
+                for stage, elapsed in result.timings.items():
+                    if stage != INDEX_STAGE:
+                        INGESTION_STAGE_SECONDS.labels(stage, config_id_context.get(), SUCCESS_OUTCOME).observe(elapsed)
+
+                stage_timings = ", ".join([f"{stage} {elapsed:.2f}s" for stage, elapsed in result.timings.items()])
+                logger.info(f"Ingested file {i + 1} of {len(files)} ({file.file_name}): {stage_timings}")
+            except Exception as e:
+                logger.error(f"Failed to ingest file {file.file_name}, exception details - {e}")
+                progress.update(i, FileIngestionStatus.FAILED, error=str(e))
+                failed_files.append(file.file_name)
+
+        return failed_files
+
+    def upload_documents(
+        self,
+        config_id: str,
+        files: list[TempFileReference],
+        progress: Optional[IngestionProgressReporter] = None
+    ):
+        # the enrichment and ingestion metrics recorded deeper in the flow are labeled with the config of the context
+        config_id_token = config_id_context.set(UNKNOWN_CONFIG_ID)
+        try:
+            with observe_duration(REQUEST_SECONDS, UPLOAD_OPERATION, UNKNOWN_CONFIG_ID) as observation:
+                logger.info(f"Starting upload documents for {config_id}")
+                upload_start_time = timer()
+                progress = progress or IngestionProgressReporter()
+                config = self._try_get_config(config_id)
+                observation.config_id = config.id
+                config_id_context.set(config.id)
+                resources = self._get_resources(config)
+                embedding_function = resources.embedding_function
+                indexer = IncrementalIndexer(
+                    config_id,
+                    build_ingestion_config_hash(config),
+                    resources.vector_store,
+                    self._ingestion_manifest_manager
+                )
+
+                try:
+                    if config.ingestion_config.mode == RagConstants.PIPELINE_INGESTION_MODE:
+                        pipeline = IngestionPipeline(config, embedding_function, indexer, progress)
+                        failed_files = pipeline.run(files)
+                    else:
+                        if config.ingestion_config.mode == RagConstants.PROCESS_POOL_INGESTION_MODE:
+                            processed_files = self._process_files_in_process_pool(config, files, progress)
+                        else:
+                            processed_files = self._process_files_sequentially(config, files, progress)
+                        failed_files = self._index_processed_files(indexer, embedding_function, files, processed_files, progress)
+                finally:
+                    # failed and cancelled uploads may still have changed the index
+                    semantic_answer_cache.invalidate(config_id)
+                    search_cache = get_search_result_cache(self._config)
+                    if search_cache:
+                        search_cache.bump_generation(config_id)
+
+                logger.info(f"Finished upload documents for {config_id} in {timer() - upload_start_time:.2f}s ({config.ingestion_config.mode} mode)")
+                if failed_files:
+                    raise Exception(f"{len(failed_files)} of {len(files)} files failed to ingest: {', '.join(failed_files)}")
+        finally:
+            config_id_context.reset(config_id_token)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fastapi.encoders import jsonable_encoder
+from langchain_core.embeddings import Embeddings
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from langchain_core.vectorstores import VectorStore
+from loguru import logger
+from typing import Callable, Optional
+
+from configs.config import config
+from models.rag_config import RagConfig
+from .async_vector_search import AsyncVectorSearch
+
+
+def build_config_version(config: RagConfig) -> str:
+    """
+    Generates the SHA256 hash of a RAG config with sorted keys, which changes whenever any of its settings change.
+
+    Args:
+        config (RagConfig): The RAG config.
+
+    Returns:
+        str: The hex digest of the config.
+    """
+    obj_str = json.dumps(jsonable_encoder(config), sort_keys=True)
+    return hashlib.sha256(obj_str.encode()).hexdigest()
+
+
+@dataclass
+class ChatChain:
+    prompt: ChatPromptTemplate
+    # takes the retrieved documents as `context` and the `question`, and generates the answer
+    answer_chain: Runnable
+
+
+@dataclass
+class RagResources:
+    config: RagConfig
+    embedding_function: Embeddings
+    vector_store: VectorStore
+    # only set for Azure AI Search, other vector stores are searched through their LangChain async methods
+    async_vector_store: Optional[AsyncVectorSearch] = None
+    chat_chain: Optional[ChatChain] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def close(self):
+        """
+        Closes the clients which are not shared with other resources, once the resources are dropped from the pool.
+        """
+        if self.async_vector_store:
+            self.async_vector_store.close()
+
+
+class RagResourcePool(object):
+    """
+    Keeps the embeddings, vector store and chat chain of the most recently used RAG configs warm,
+    so requests reuse their clients and connections instead of building them for every call.
+    Entries are keyed by config id and config version, dropped when the config is upserted,
+    and evicted when the pool is full or when they have been idle for longer than `idle_seconds`.
+    The async clients of dropped and evicted entries are closed, so their connections are not leaked.
+    """
+    _max_size: int
+    _idle_seconds: float
+    _entries: OrderedDict[tuple[str, str], tuple[RagResources, float]]
+    _creation_locks: dict[tuple[str, str], threading.Lock]
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int, idle_seconds: float):
+        self._max_size = max_size
+        self._idle_seconds = idle_seconds
+        self._entries = OrderedDict()
+        self._creation_locks = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(
+        self,
+        config: RagConfig,
+        factory: Callable[[RagConfig], RagResources]
+    ) -> RagResources:
+        """
+        Returns the pooled resources of a config, creating them with `factory` on a miss.
+
+        Args:
+            config (RagConfig): The RAG config.
+            factory (Callable[[RagConfig], RagResources]): Creates the resources of the config.
+
+        Returns:
+            RagResources: The resources of the config.
+        """
+        key = (config.id, build_config_version(config))
+
+        resources = self._get(key)
+        if resources:
+            return resources
+
+        with self._lock:
+            creation_lock = self._creation_locks.setdefault(key, threading.Lock())
+
+        # concurrent misses for the same config wait for a single creation instead of each building their own clients
+        with creation_lock:
+            try:
+                resources = self._get(key)
+                if resources:
+                    return resources
+
+                logger.debug(f"Creating pooled resources for {config.id}...")
+                resources = factory(config)
+                with self._lock:
+                    self._entries[key] = (resources, time.monotonic())
+                    evicted = self._evict()
+            finally:
+                # also when the factory raises, so the locks of failed creations do not pile up
+                with self._lock:
+                    if self._creation_locks.get(key) is creation_lock:
+                        self._creation_locks.pop(key)
+
+        _close(evicted)
+        return resources
+
+    def invalidate(self, config_id: str):
+        with self._lock:
+            invalidated = [self._entries.pop(key)[0] for key in [key for key in self._entries if key[0] == config_id]]
+        _close(invalidated)
+        logger.debug(f"Invalidated pooled resources for {config_id}")
+
+    def _get(self, key: tuple[str, str]) -> Optional[RagResources]:
+        with self._lock:
+            evicted = self._evict()
+            entry = self._entries.get(key)
+            if entry:
+                self._entries[key] = (entry[0], time.monotonic())
+                self._entries.move_to_end(key)
+
+        _close(evicted)
+        return entry[0] if entry else None
+
+    def _evict(self) -> list[RagResources]:
+        evicted: list[RagResources] = []
+        now = time.monotonic()
+        for key in [key for key, (_, last_used_at) in self._entries.items() if now - last_used_at > self._idle_seconds]:
+            evicted.append(self._entries.pop(key)[0])
+
+        while len(self._entries) > self._max_size:
+            evicted.append(self._entries.popitem(last=False)[1][0])
+
+        return evicted
+
+
+def _close(resources: list[RagResources]):
+    for entry in resources:
+        try:
+            entry.close()
+        except Exception as e:
+            logger.warning(f"Failed to close the pooled resources for {entry.config.id}, exception details - {e}")
+
+
+rag_resource_pool = RagResourcePool(config.rag_resource_pool_max_size, config.rag_resource_pool_idle_seconds)
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from timeit import default_timer as timer
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+from utils.metrics import CONFIG_STAGE, EMBED_STAGE, GENERATE_STAGE, RETRIEVE_STAGE
+
+
+T = TypeVar("T")
+
+# each stage gets its weight's share of the time left for it and the stages after it,
+# so the time a fast stage does not use is passed on to the next ones
+_STAGE_WEIGHTS = {
+    CONFIG_STAGE: 1,
+    EMBED_STAGE: 1,
+    RETRIEVE_STAGE: 2,
+    GENERATE_STAGE: 6
+}
+SEARCH_STAGES = [CONFIG_STAGE, EMBED_STAGE, RETRIEVE_STAGE]
+CHAT_STAGES = [CONFIG_STAGE, EMBED_STAGE, RETRIEVE_STAGE, GENERATE_STAGE]
+
+
+class DeadlineExceededError(TimeoutError):
+    stage: str
+
+    def __init__(self, stage: str):
+        super().__init__(f"The request deadline was exceeded in the {stage} stage")
+        self.stage = stage
+
+
+class RequestDeadline(object):
+    """
+    The deadline of a search or chat request, split across its stages.
+    The deadline starts with the request, and only applies once a timeout is set, by the request or by its RAG config.
+    """
+    _stages: list[str]
+    _start_time: float
+    _expires_at: Optional[float]
+
+    def __init__(self, stages: list[str], timeout_seconds: Optional[float] = None):
+        self._stages = stages
+        self._start_time = timer()
+        self._expires_at = None
+        self.set_default_timeout(timeout_seconds)
+
+    def set_default_timeout(self, timeout_seconds: Optional[float]):
+        """
+        Sets the timeout of the request, counted from its start, unless it already has one.
+        """
+        if self._expires_at is None and timeout_seconds:
+            self._expires_at = self._start_time + timeout_seconds
+
+    @property
+    def is_set(self) -> bool:
+        return self._expires_at is not None
+
+    def stage_timeout(self, stage: str) -> float:
+        remaining_seconds = max(self._expires_at - timer(), 0)
+        remaining_stages = self._stages[self._stages.index(stage):] if stage in self._stages else [stage]
+        return remaining_seconds * _STAGE_WEIGHTS[stage] / sum(_STAGE_WEIGHTS[s] for s in remaining_stages)
+
+
+request_deadline_context: contextvars.ContextVar[Optional[RequestDeadline]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def start_deadline(stages: list[str], timeout_seconds: Optional[float] = None) -> Iterator[RequestDeadline]:
+    """
+    Starts the deadline of a request for the stages run in the block.
+
+    Args:
+        stages (list[str]): The stages of the request, in order.
+        timeout_seconds (Optional[float]): The timeout of the request, None to only apply the timeout of its RAG config.
+
+    Returns:
+        Iterator[RequestDeadline]: The deadline.
+    """
+    previous = request_deadline_context.get()
+    deadline = RequestDeadline(stages, timeout_seconds)
+    request_deadline_context.set(deadline)
+    try:
+        yield deadline
+    finally:
+        # restored rather than reset, as a stream may be closed from another context
+        request_deadline_context.set(previous)
+
+
+async def run_stage(stage: str, awaitable: Awaitable[T]) -> T:
+    """
+    Awaits a stage of the current request, cancelling it once its share of the request deadline has elapsed.
+
+    Raises:
+        DeadlineExceededError: If the stage did not complete in time.
+    """
+    deadline = request_deadline_context.get()
+    if not deadline or not deadline.is_set:
+        return await awaitable
+
+    try:
+        return await asyncio.wait_for(awaitable, deadline.stage_timeout(stage))
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError(stage)
+
+
+async def iterate_stage(stage: str, iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+    """
+    Iterates a streamed stage of the current request, cancelling it once its share of the request deadline has elapsed.
+
+    Raises:
+        DeadlineExceededError: If the stage did not complete in time.
+    """
+    deadline = request_deadline_context.get()
+    if not deadline or not deadline.is_set:
+        async for item in iterator:
+            yield item
+        return
+
+    expires_at = timer() + deadline.stage_timeout(stage)
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), max(expires_at - timer(), 0))
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(stage)
+        yield item
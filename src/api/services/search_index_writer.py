@@ -0,0 +1,105 @@
+import base64
+import json
+import numpy as np
+import uuid
+from langchain_community.vectorstores.azuresearch import (
+    AzureSearch,
+    FIELDS_CONTENT,
+    FIELDS_CONTENT_VECTOR,
+    FIELDS_ID,
+    FIELDS_METADATA
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from typing import Optional
+
+from langchain_extensions.vectorstores import LocalVectorStore
+
+
+_MAX_UPLOAD_BATCH_SIZE = 1000
+
+
+def embed_documents(embedding_function: Embeddings, documents: list[Document]) -> list[list[float]]:
+    return embedding_function.embed_documents([doc.page_content for doc in documents])
+
+
+def upload_documents(
+    vector_store: VectorStore,
+    documents: list[Document],
+    embeddings: list[list[float]],
+    keys: Optional[list[str]] = None
+) -> list[str]:
+    """
+    Uploads documents with precomputed embeddings to the index of the vector store.
+    The fields uploaded to Azure AI Search mirror `AzureSearch.add_texts`, so the documents can be searched through the same vector store.
+
+    Args:
+        vector_store (VectorStore): The Azure AI Search or local vector store of the target index.
+        documents (list[Document]): The documents to upload.
+        embeddings (list[list[float]]): The embedding of each document.
+        keys (list[str]): Optional document keys, random keys are generated if not provided.
+
+    Returns:
+        list[str]: The encoded keys of the uploaded documents.
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.add_embeddings(documents, embeddings, keys)
+
+    index_field_names = [field.name for field in (getattr(vector_store, "fields", None) or [])]
+
+    ids: list[str] = []
+    data: list[dict] = []
+    for i, doc in enumerate(documents):
+        key = encode_key(keys[i] if keys else str(uuid.uuid4()))
+
+        record = {
+            "@search.action": "upload",
+            FIELDS_ID: key,
+            FIELDS_CONTENT: doc.page_content,
+            FIELDS_CONTENT_VECTOR: np.array(embeddings[i], dtype=np.float32).tolist(),
+            FIELDS_METADATA: json.dumps(doc.metadata),
+        }
+        record.update({k: v for k, v in doc.metadata.items() if k in index_field_names})
+
+        data.append(record)
+        ids.append(key)
+
+        if len(data) == _MAX_UPLOAD_BATCH_SIZE:
+            _upload_batch(vector_store, data)
+            data = []
+
+    if data:
+        _upload_batch(vector_store, data)
+
+    return ids
+
+
+def delete_documents(vector_store: VectorStore, keys: list[str]):
+    """
+    Deletes documents from the index of the vector store.
+
+    Args:
+        vector_store (VectorStore): The Azure AI Search or local vector store of the target index.
+        keys (list[str]): The keys of the documents to delete, as passed to `upload_documents`.
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        vector_store.delete(keys)
+        return
+
+    for i in range(0, len(keys), _MAX_UPLOAD_BATCH_SIZE):
+        data = [{FIELDS_ID: encode_key(key)} for key in keys[i:i + _MAX_UPLOAD_BATCH_SIZE]]
+        response = vector_store.client.delete_documents(documents=data)
+        if not all([r.succeeded for r in response]):
+            raise Exception(response)
+
+
+def encode_key(key: str) -> str:
+    # Azure AI Search keys only allow URL safe characters
+    return base64.urlsafe_b64encode(bytes(key, "utf-8")).decode("ascii")
+
+
+def _upload_batch(vector_store: AzureSearch, data: list[dict]):
+    response = vector_store.client.upload_documents(documents=data)
+    if not all([r.succeeded for r in response]):
+        raise Exception(response)
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.documents import Document
+from typing import Optional
+
+from configs.config import Config, config
+from langchain_extensions.embeddings.cached_embeddings import normalize_text
+from models.rag_config import RagConfig
+from models.search_cache_stats import SearchCacheStats
+from .rag_resource_pool import build_config_version
+
+
+SearchCacheKey = tuple[str, str, int, str, str, int]
+
+
+class SearchResultCache(object):
+    """
+    Caches the results of identical searches, keyed by config id, config version, ingestion generation,
+    normalized query, search type and k. Every ingestion into the index of a config bumps its generation,
+    so results searched before the ingestion are never served after it.
+    Results expire after `ttl_seconds`, and the least recently used results are evicted once the cache holds `max_size` searches.
+    """
+    _ttl_seconds: float
+    _max_size: int
+    _entries: OrderedDict[SearchCacheKey, tuple[list[Document], float, float]]
+    _generations: dict[str, int]
+    _lock: threading.Lock
+    _hits: int
+    _misses: int
+    _latency_saved_seconds: float
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._latency_saved_seconds = 0.0
+
+    def build_key(self, config: RagConfig, query: str) -> SearchCacheKey:
+        """
+        Builds the cache key of a search. The key must be built before searching,
+        so results of a search which overlaps an ingestion are stored under the previous generation.
+
+        Args:
+            config (RagConfig): The RAG config.
+            query (str): The search query.
+
+        Returns:
+            SearchCacheKey: The cache key.
+        """
+        with self._lock:
+            generation = self._generations.get(config.id, 0)
+
+        return (
+            config.id,
+            build_config_version(config),
+            generation,
+            normalize_text(query),
+            config.search_config.search_type,
+            config.search_config.search_k
+        )
+
+    def get(self, key: SearchCacheKey) -> Optional[list[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or time.monotonic() - entry[1] > self._ttl_seconds:
+                self._entries.pop(key, None)
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._latency_saved_seconds += entry[2]
+            self._entries.move_to_end(key)
+
+        return [document.copy(deep=True) for document in entry[0]]
+
+    def set(self, key: SearchCacheKey, documents: list[Document], latency_seconds: float):
+        """
+        Caches the results of a search.
+
+        Args:
+            key (SearchCacheKey): The cache key built before the search.
+            documents (list[Document]): The search results.
+            latency_seconds (float): The duration of the search, added to the saved latency on every hit.
+        """
+        with self._lock:
+            self._entries[key] = ([document.copy(deep=True) for document in documents], time.monotonic(), latency_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def bump_generation(self, config_id: str):
+        with self._lock:
+            self._generations[config_id] = self._generations.get(config_id, 0) + 1
+
+            # results of previous generations can no longer be served
+            for key in [key for key in self._entries if key[0] == config_id]:
+                self._entries.pop(key)
+
+    def stats(self) -> SearchCacheStats:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return SearchCacheStats(
+                enabled=True,
+                hits=self._hits,
+                misses=self._misses,
+                hit_rate=self._hits / lookups if lookups else 0.0,
+                entries=len(self._entries),
+                latency_saved_seconds=self._latency_saved_seconds,
+                generations=dict(self._generations)
+            )
+
+
+_search_result_cache: Optional[SearchResultCache] = None
+_search_result_cache_lock = threading.Lock()
+
+
+def get_search_result_cache(config: Config = config) -> Optional[SearchResultCache]:
+    global _search_result_cache
+
+    if not config.search_cache_enabled:
+        return None
+
+    if _search_result_cache:
+        return _search_result_cache
+
+    with _search_result_cache_lock:
+        if not _search_result_cache:
+            _search_result_cache = SearchResultCache(config.search_cache_ttl_seconds, config.search_cache_max_size)
+
+    return _search_result_cache
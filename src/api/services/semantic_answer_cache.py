@@ -0,0 +1,166 @@
+import hashlib
+import json
+import numpy as np
+import threading
+import time
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+from typing import Optional
+
+from models.rag_config import RagConfig
+from models.responses.chat_response import ChatResponse
+from models.semantic_cache_stats import SemanticCacheStats
+
+
+def build_answer_version(config: RagConfig) -> str:
+    """
+    Generates the SHA256 hash of the settings of a RAG config which change its answers or its query embeddings,
+    so cached answers are dropped once the chat, search or embedding settings of the config change.
+
+    Args:
+        config (RagConfig): The RAG config.
+
+    Returns:
+        str: The hex digest of the settings.
+    """
+    obj_str = json.dumps(jsonable_encoder({
+        "chat_config": config.chat_config,
+        "search_config": config.search_config,
+        "embedding_model_name": config.embedding_config.embedding_model_name,
+        "embedding_model_kwargs": config.embedding_config.embedding_model_kwargs
+    }), sort_keys=True)
+    return hashlib.sha256(obj_str.encode()).hexdigest()
+
+
+class _ConfigAnswers(object):
+    """
+    The cached answers of one RAG config, with their normalized query vectors as the rows of a preallocated matrix,
+    so a lookup is a single matrix-vector product. The least recently used row is overwritten once the matrix is full.
+    """
+    version: str
+    vectors: Optional[np.ndarray]
+    responses: list[ChatResponse]
+    last_used_at: np.ndarray
+
+    def __init__(self, version: str, max_entries: int):
+        self.version = version
+        self.vectors = None
+        self.responses = []
+        self.last_used_at = np.zeros(max_entries)
+
+    def lookup(self, vector: np.ndarray, similarity_threshold: float) -> Optional[ChatResponse]:
+        if not self.responses:
+            return None
+
+        similarities = self.vectors[:len(self.responses)] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < similarity_threshold:
+            return None
+
+        self.last_used_at[best] = time.monotonic()
+        return self.responses[best]
+
+    def add(self, vector: np.ndarray, response: ChatResponse):
+        max_entries = len(self.last_used_at)
+        if self.vectors is None:
+            self.vectors = np.zeros((max_entries, len(vector)), dtype=np.float32)
+
+        if len(self.responses) < max_entries:
+            row = len(self.responses)
+            self.responses.append(response)
+        else:
+            row = int(np.argmin(self.last_used_at))
+            self.responses[row] = response
+
+        self.vectors[row] = vector
+        self.last_used_at[row] = time.monotonic()
+
+
+class SemanticAnswerCache(object):
+    """
+    Serves the chat answers of queries which are paraphrases of previously answered queries.
+    Queries are compared by the cosine similarity of their embeddings, per RAG config and answer version.
+    The answers of a config are dropped when its index is re-ingested, and when its chat, search or embedding settings change.
+    """
+    _configs: dict[str, _ConfigAnswers]
+    _lock: threading.Lock
+    _hits: int
+    _misses: int
+    _invalidations: int
+
+    def __init__(self):
+        self._configs = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, config: RagConfig, vector: list[float]) -> Optional[ChatResponse]:
+        """
+        Looks up the answer of the most similar cached query.
+
+        Args:
+            config (RagConfig): The RAG config.
+            vector (list[float]): The embedding of the query.
+
+        Returns:
+            Optional[ChatResponse]: The cached answer, or None if no cached query is similar enough.
+        """
+        normalized_vector = _normalize(vector)
+        with self._lock:
+            answers = self._configs.get(config.id)
+            response = None
+            if answers and answers.version == build_answer_version(config):
+                response = answers.lookup(normalized_vector, config.semantic_cache_config.similarity_threshold)
+
+            if response:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        return response.model_copy(deep=True) if response else None
+
+    def set(self, config: RagConfig, vector: list[float], response: ChatResponse):
+        """
+        Caches the answer of a query.
+
+        Args:
+            config (RagConfig): The RAG config.
+            vector (list[float]): The embedding of the query.
+            response (ChatResponse): The answer and its sources.
+        """
+        version = build_answer_version(config)
+        max_entries = config.semantic_cache_config.max_entries
+        normalized_vector = _normalize(vector)
+        with self._lock:
+            answers = self._configs.get(config.id)
+            if not answers or answers.version != version or len(answers.last_used_at) != max_entries:
+                answers = self._configs[config.id] = _ConfigAnswers(version, max_entries)
+            answers.add(normalized_vector, response.model_copy(deep=True))
+
+    def invalidate(self, config_id: str):
+        with self._lock:
+            if self._configs.pop(config_id, None):
+                self._invalidations += 1
+                logger.debug(f"Invalidated the semantic answer cache of {config_id}")
+
+    def stats(self) -> SemanticCacheStats:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return SemanticCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                hit_rate=self._hits / lookups if lookups else 0.0,
+                invalidations=self._invalidations,
+                configs=len(self._configs),
+                entries=sum(len(answers.responses) for answers in self._configs.values())
+            )
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+semantic_answer_cache = SemanticAnswerCache()
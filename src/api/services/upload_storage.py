@@ -0,0 +1,44 @@
+import hashlib
+from typing import BinaryIO, Optional
+
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+def save_upload(
+    source: BinaryIO,
+    destination_path: str,
+    max_size_bytes: Optional[int] = None
+) -> tuple[int, str]:
+    """
+    Copies an uploaded file to disk in fixed size chunks, hashing the content in the same pass,
+    so memory usage does not grow with the size of the upload.
+
+    Args:
+        source (BinaryIO): The uploaded file stream.
+        destination_path (str): The path of the file to write.
+        max_size_bytes (int): Optional maximum number of bytes to accept.
+
+    Returns:
+        tuple[int, str]: The number of bytes written and the SHA-256 hex digest of the content.
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than `max_size_bytes`.
+    """
+    sha256 = hashlib.sha256()
+    size_bytes = 0
+
+    with open(destination_path, "wb") as f:
+        while chunk := source.read(_COPY_CHUNK_SIZE):
+            size_bytes += len(chunk)
+            if max_size_bytes is not None and size_bytes > max_size_bytes:
+                raise UploadTooLargeError(f"The upload exceeds the limit of {max_size_bytes} bytes")
+
+            sha256.update(chunk)
+            f.write(chunk)
+
+    return size_bytes, sha256.hexdigest()
@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram
+from timeit import default_timer as timer
+from typing import Iterator, Optional
+
+
+SUCCESS_OUTCOME = "success"
+ERROR_OUTCOME = "error"
+CANCELLED_OUTCOME = "cancelled"
+DEADLINE_EXCEEDED_OUTCOME = "deadline_exceeded"
+THROTTLED_OUTCOME = "throttled"
+CACHE_HIT_OUTCOME = "hit"
+CACHE_MISS_OUTCOME = "miss"
+FALLBACK_OUTCOME = "fallback"
+
+SEARCH_OPERATION = "search"
+CHAT_OPERATION = "chat"
+CHAT_STREAM_OPERATION = "chat_stream"
+SEARCH_BATCH_OPERATION = "search_batch"
+CHAT_BATCH_OPERATION = "chat_batch"
+UPLOAD_OPERATION = "upload"
+
+CONFIG_STAGE = "config"
+EMBED_STAGE = "embed"
+RETRIEVE_STAGE = "retrieve"
+RERANK_STAGE = "rerank"
+PACK_STAGE = "pack"
+GENERATE_STAGE = "generate"
+
+CACHE_GET_ENRICHMENT_STAGE = "cache_get"
+CACHE_SET_ENRICHMENT_STAGE = "cache_set"
+CLASSIFIER_ENRICHMENT_STAGE = "classifier"
+MLLM_ENRICHMENT_STAGE = "mllm"
+PACKED_MLLM_ENRICHMENT_STAGE = "packed_mllm"
+
+PROMPT_TOKENS = "prompt"
+COMPLETION_TOKENS = "completion"
+CONTEXT_TOKENS = "context"
+CONTEXT_SAVED_TOKENS = "context_saved"
+MLLM_PROMPT_TOKENS = "mllm_prompt"
+MLLM_COMPLETION_TOKENS = "mllm_completion"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 131072)
+
+# the label of the requests and config lookups whose RAG config was not found, so unknown ids do not each add new series
+UNKNOWN_CONFIG_ID = "unknown"
+
+# the RAG config of the current request or ingestion, for the code which records metrics without knowing it, such as the enrichment
+config_id_context: contextvars.ContextVar[str] = contextvars.ContextVar("config_id", default="")
+
+REQUEST_SECONDS = Histogram(
+    "rag_request_duration_seconds",
+    "Duration of the search, chat and upload requests.",
+    ["operation", "config_id", "outcome"],
+    buckets=_LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of the config lookup, query embedding, retrieval, reranking, context packing and generation of the searches and chats.",
+    ["stage", "config_id", "outcome"],
+    buckets=_LATENCY_BUCKETS
+)
+INGESTION_STAGE_SECONDS = Histogram(
+    "rag_ingestion_stage_duration_seconds",
+    "Duration of each ingestion stage of a file, or of a batch of chunks for the embed and upsert stages of the pipeline mode.",
+    ["stage", "config_id", "outcome"],
+    buckets=_LATENCY_BUCKETS
+)
+ENRICHMENT_STAGE_SECONDS = Histogram(
+    "rag_enrichment_stage_duration_seconds",
+    "Duration of the cache lookup, cache write, classifier, MLLM and packed MLLM calls of the image enrichment.",
+    ["stage", "config_id", "outcome"],
+    buckets=_LATENCY_BUCKETS
+)
+TOKENS = Histogram(
+    "rag_tokens",
+    "Tokens of the chat prompts, completions and contexts, of the context tokens saved by packing, and of the MLLM calls.",
+    ["kind", "config_id"],
+    buckets=_TOKEN_BUCKETS
+)
+OPENAI_ENDPOINT_REQUESTS = Counter(
+    "rag_openai_endpoint_requests",
+    "Requests sent to each endpoint of the Azure OpenAI endpoint pool, including failovers and hedged requests.",
+    ["endpoint", "outcome"]
+)
+
+
+class Observation(object):
+    """
+    The outcome of an observed duration, which the observed code may override, e.g. with a cache hit or miss,
+    and its config id, which the observed code may set once the config is resolved.
+    """
+    outcome: str
+    config_id: Optional[str]
+
+    def __init__(self, config_id: Optional[str] = None):
+        self.outcome = SUCCESS_OUTCOME
+        self.config_id = config_id
+
+
+@contextmanager
+def observe_duration(histogram: Histogram, name: str, config_id: Optional[str] = None) -> Iterator[Observation]:
+    """
+    Observes the duration of the block in a histogram, labeled by name, config id and outcome.
+    The outcome is `error` if the block raises an exception, `deadline_exceeded` if it times out,
+    and `cancelled` if it is cancelled, e.g. on a client disconnect, or its generator is closed.
+
+    Args:
+        histogram (Histogram): The histogram, with the name, config id and outcome labels.
+        name (str): The operation, stage or token kind.
+        config_id (Optional[str]): The RAG config id, defaults to the config of the current context.
+
+    Returns:
+        Iterator[Observation]: The observation, whose outcome the block may override.
+    """
+    observation = Observation(config_id)
+    start_time = timer()
+    try:
+        yield observation
+    except (asyncio.CancelledError, GeneratorExit):
+        observation.outcome = CANCELLED_OUTCOME
+        raise
+    except TimeoutError:
+        observation.outcome = DEADLINE_EXCEEDED_OUTCOME
+        raise
+    except BaseException:
+        observation.outcome = ERROR_OUTCOME
+        raise
+    finally:
+        config_id = observation.config_id if observation.config_id is not None else config_id_context.get()
+        histogram.labels(name, config_id, observation.outcome).observe(
+            timer() - start_time
+        )
+
+
+def observe_tokens(kind: str, tokens: int, config_id: Optional[str] = None):
+    TOKENS.labels(kind, config_id if config_id is not None else config_id_context.get()).observe(tokens)
@@ -0,0 +1,344 @@
+import asyncio
+import httpx
+import random
+import re
+import threading
+import time
+from loguru import logger
+from openai._resource import AsyncAPIResource, SyncAPIResource
+from pydantic import TypeAdapter
+from typing import Any, Optional
+
+from configs.config import Config, config
+from models.openai_endpoint_config import OpenAIEndpointConfig
+from .metrics import (
+    CANCELLED_OUTCOME, ERROR_OUTCOME, OPENAI_ENDPOINT_REQUESTS, SUCCESS_OUTCOME, THROTTLED_OUTCOME
+)
+
+
+_DEPLOYMENT_PATH_PATTERN = re.compile(r"^/openai/deployments/([^/]+)")
+_REMAINING_REQUESTS_HEADER = "x-ratelimit-remaining-requests"
+_REMAINING_TOKENS_HEADER = "x-ratelimit-remaining-tokens"
+_RETRY_AFTER_MS_HEADER = "retry-after-ms"
+_RETRY_AFTER_HEADER = "retry-after"
+# an endpoint which used up its quota still gets a little traffic, which reports its quota once it is replenished
+_MIN_QUOTA_FRACTION = 0.05
+# the connection limits of the OpenAI clients
+_CONNECTION_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+
+
+class _Endpoint(object):
+    """
+    An Azure OpenAI endpoint of the pool, with the quota it last reported and until when it is cooling down after a failure.
+    """
+    name: str
+    url: httpx.URL
+    api_key: Optional[str]
+    weight: float
+    deployments: Optional[dict[str, str]]
+    unavailable_until: float
+
+    def __init__(self, endpoint_config: OpenAIEndpointConfig):
+        self.url = httpx.URL(endpoint_config.endpoint)
+        self.name = self.url.host
+        self.api_key = endpoint_config.api_key
+        self.weight = max(endpoint_config.weight, 0)
+        self.deployments = endpoint_config.deployments
+        self.unavailable_until = 0
+        self._remaining = {_REMAINING_REQUESTS_HEADER: None, _REMAINING_TOKENS_HEADER: None}
+        # the most remaining quota seen, an estimate of the quota of the endpoint
+        self._max_remaining = {_REMAINING_REQUESTS_HEADER: 0, _REMAINING_TOKENS_HEADER: 0}
+
+    def serves(self, deployment: Optional[str]) -> bool:
+        return deployment is None or self.deployments is None or deployment in self.deployments
+
+    def effective_weight(self) -> float:
+        quota_fractions = [
+            remaining / self._max_remaining[header]
+            for header, remaining in self._remaining.items()
+            if remaining is not None and self._max_remaining[header]
+        ]
+        return self.weight * max(min(quota_fractions, default=1.0), _MIN_QUOTA_FRACTION)
+
+    def record_quota(self, headers: httpx.Headers):
+        for header in self._remaining:
+            try:
+                remaining = int(headers[header])
+            except (KeyError, ValueError):
+                continue
+            self._remaining[header] = remaining
+            self._max_remaining[header] = max(self._max_remaining[header], remaining)
+
+    def build_request(self, request: httpx.Request, content: bytes, deployment: Optional[str]) -> httpx.Request:
+        path = request.url.path
+        if deployment and self.deployments:
+            path = _DEPLOYMENT_PATH_PATTERN.sub(f"/openai/deployments/{self.deployments[deployment]}", path, count=1)
+
+        headers = [(key, value) for key, value in request.headers.raw if key.lower() != b"host"]
+        endpoint_request = httpx.Request(
+            request.method,
+            request.url.copy_with(scheme=self.url.scheme, host=self.url.host, port=self.url.port, path=path),
+            headers=headers,
+            content=content,
+            extensions=request.extensions
+        )
+        if self.api_key:
+            endpoint_request.headers["api-key"] = self.api_key
+        return endpoint_request
+
+
+class OpenAIEndpointPool(object):
+    """
+    Spreads the Azure OpenAI requests of the chat, embedding and MLLM clients across several endpoints and deployments,
+    so the throughput is not capped by the quota of a single region.
+
+    Each request goes to an endpoint picked at random by its weight, scaled by the share of its quota left
+    as last reported by its `x-ratelimit-remaining-*` headers. A request throttled (429) or failed (5xx) by an endpoint
+    fails over to the other endpoints, and the endpoint cools down for its `retry-after` or `cooldown_seconds`.
+    With `hedge_after_seconds` set, an async request still unanswered after that long is also sent to another endpoint,
+    and the first response wins.
+    """
+    http_client: httpx.Client
+    async_http_client: httpx.AsyncClient
+
+    def __init__(self, endpoint_configs: list[OpenAIEndpointConfig], cooldown_seconds: float, hedge_after_seconds: float):
+        """
+        Creates a new OpenAIEndpointPool.
+
+        Args:
+            endpoint_configs (list[OpenAIEndpointConfig]): The endpoints of the pool.
+            cooldown_seconds (float): How long an endpoint gets no request after a failure, unless it sets a `retry-after`.
+            hedge_after_seconds (float): How long an async request waits before it is hedged to another endpoint, 0 to disable hedging.
+        """
+        self._endpoints = [_Endpoint(endpoint_config) for endpoint_config in endpoint_configs]
+        self._cooldown_seconds = cooldown_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        # the endpoint state is shared by the async requests and the requests of the ingestion threads
+        self._lock = threading.Lock()
+
+        self.http_client = httpx.Client(
+            transport=_EndpointPoolTransport(self, httpx.HTTPTransport(limits=_CONNECTION_LIMITS)),
+            follow_redirects=True
+        )
+        self.async_http_client = httpx.AsyncClient(transport=self.create_async_transport(_CONNECTION_LIMITS), follow_redirects=True)
+
+    def create_async_transport(self, limits: httpx.Limits) -> httpx.AsyncBaseTransport:
+        """
+        Creates an async transport routed through the pool, with its own connections, for the clients of another event loop.
+        """
+        return _AsyncEndpointPoolTransport(self, httpx.AsyncHTTPTransport(limits=limits))
+
+    def bind(self, model: Any):
+        """
+        Routes the OpenAI clients of a LangChain model, such as `AzureChatOpenAI` or `AzureOpenAIEmbeddings`, through the pool.
+        Models without OpenAI clients are left unchanged.
+        """
+        client = getattr(model, "client", None)
+        if isinstance(client, SyncAPIResource):
+            model.client = type(client)(client._client.with_options(http_client=self.http_client))
+
+        async_client = getattr(model, "async_client", None)
+        if isinstance(async_client, AsyncAPIResource):
+            model.async_client = type(async_client)(async_client._client.with_options(http_client=self.async_http_client))
+
+    def select(self, deployment: Optional[str], attempted: list[_Endpoint]) -> Optional[_Endpoint]:
+        """
+        Picks the endpoint of the next attempt of a request, None if every endpoint serving the deployment was attempted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [endpoint for endpoint in self._endpoints if endpoint.serves(deployment) and endpoint not in attempted]
+            if not candidates:
+                return None
+
+            available = [endpoint for endpoint in candidates if endpoint.unavailable_until <= now]
+            if not available:
+                # when every endpoint is cooling down, the first one available again is tried rather than failing the request
+                return min(candidates, key=lambda endpoint: endpoint.unavailable_until)
+
+            weights = [endpoint.effective_weight() for endpoint in available]
+            if not sum(weights):
+                return random.choice(available)
+            return random.choices(available, weights=weights)[0]
+
+    def has_candidates(self, deployment: Optional[str], attempted: list[_Endpoint]) -> bool:
+        return any(endpoint.serves(deployment) and endpoint not in attempted for endpoint in self._endpoints)
+
+    def record_response(self, endpoint: _Endpoint, response: httpx.Response) -> bool:
+        """
+        Records the quota and the outcome of a response.
+
+        Returns:
+            bool: Whether the response is final, False if the request should fail over to another endpoint.
+        """
+        with self._lock:
+            endpoint.record_quota(response.headers)
+            if response.status_code == 429:
+                endpoint.unavailable_until = time.monotonic() + _get_retry_after_seconds(response.headers, self._cooldown_seconds)
+            elif response.status_code >= 500:
+                endpoint.unavailable_until = time.monotonic() + self._cooldown_seconds
+
+        if response.status_code == 429:
+            outcome = THROTTLED_OUTCOME
+        elif response.status_code >= 500:
+            outcome = ERROR_OUTCOME
+        else:
+            outcome = SUCCESS_OUTCOME
+        OPENAI_ENDPOINT_REQUESTS.labels(endpoint.name, outcome).inc()
+
+        if outcome != SUCCESS_OUTCOME:
+            logger.warning(f"Azure OpenAI endpoint {endpoint.name} answered with status {response.status_code}")
+        return outcome == SUCCESS_OUTCOME
+
+    def record_failure(self, endpoint: _Endpoint, e: Exception):
+        logger.warning(f"Azure OpenAI endpoint {endpoint.name} failed, exception details - {e}")
+        with self._lock:
+            endpoint.unavailable_until = time.monotonic() + self._cooldown_seconds
+        OPENAI_ENDPOINT_REQUESTS.labels(endpoint.name, ERROR_OUTCOME).inc()
+
+    def record_cancellation(self, endpoint: _Endpoint):
+        OPENAI_ENDPOINT_REQUESTS.labels(endpoint.name, CANCELLED_OUTCOME).inc()
+
+
+class _EndpointPoolTransport(httpx.BaseTransport):
+    def __init__(self, pool: OpenAIEndpointPool, transport: httpx.BaseTransport):
+        self._pool = pool
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        content = request.read()
+        deployment = _get_deployment(request.url)
+        attempted: list[_Endpoint] = []
+        if not self._pool.has_candidates(deployment, attempted):
+            # deployments the pool does not serve go to the endpoint of the client
+            return self._transport.handle_request(request)
+
+        while True:
+            endpoint = self._pool.select(deployment, attempted)
+            attempted.append(endpoint)
+            try:
+                response = self._transport.handle_request(endpoint.build_request(request, content, deployment))
+            except httpx.TransportError as e:
+                self._pool.record_failure(endpoint, e)
+                if not self._pool.has_candidates(deployment, attempted):
+                    raise
+                continue
+
+            if self._pool.record_response(endpoint, response) or not self._pool.has_candidates(deployment, attempted):
+                return response
+            response.close()
+
+    def close(self):
+        self._transport.close()
+
+
+class _AsyncEndpointPoolTransport(httpx.AsyncBaseTransport):
+    def __init__(self, pool: OpenAIEndpointPool, transport: httpx.AsyncBaseTransport):
+        self._pool = pool
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        content = await request.aread()
+        deployment = _get_deployment(request.url)
+        attempted: list[_Endpoint] = []
+        if not self._pool.has_candidates(deployment, attempted):
+            # deployments the pool does not serve go to the endpoint of the client
+            return await self._transport.handle_async_request(request)
+
+        if not self._pool.hedge_after_seconds:
+            return await self._send(request, content, deployment, attempted)
+
+        tasks = {asyncio.ensure_future(self._send(request, content, deployment, attempted))}
+        try:
+            done, tasks = await asyncio.wait(tasks, timeout=self._pool.hedge_after_seconds)
+            if done:
+                return done.pop().result()
+
+            if self._pool.has_candidates(deployment, attempted):
+                # the request is slow, so it is also sent to another endpoint and the first response wins
+                tasks.add(asyncio.ensure_future(self._send(request, content, deployment, attempted)))
+
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                responses = [task.result() for task in done if not task.exception()]
+                if responses:
+                    for response in responses[1:]:
+                        await response.aclose()
+                    return responses[0]
+                if not tasks:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(
+        self,
+        request: httpx.Request,
+        content: bytes,
+        deployment: Optional[str],
+        attempted: list[_Endpoint]
+    ) -> httpx.Response:
+        while True:
+            endpoint = self._pool.select(deployment, attempted)
+            if endpoint is None:
+                # the other attempt of a hedged request took the last endpoint
+                raise httpx.ConnectError("No Azure OpenAI endpoint left to fail over to", request=request)
+
+            attempted.append(endpoint)
+            try:
+                response = await self._transport.handle_async_request(endpoint.build_request(request, content, deployment))
+            except asyncio.CancelledError:
+                self._pool.record_cancellation(endpoint)
+                raise
+            except httpx.TransportError as e:
+                self._pool.record_failure(endpoint, e)
+                if not self._pool.has_candidates(deployment, attempted):
+                    raise
+                continue
+
+            if self._pool.record_response(endpoint, response) or not self._pool.has_candidates(deployment, attempted):
+                return response
+            await response.aclose()
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _get_deployment(url: httpx.URL) -> Optional[str]:
+    match = _DEPLOYMENT_PATH_PATTERN.match(url.path)
+    return match.group(1) if match else None
+
+
+def _get_retry_after_seconds(headers: httpx.Headers, default_seconds: float) -> float:
+    try:
+        if _RETRY_AFTER_MS_HEADER in headers:
+            return float(headers[_RETRY_AFTER_MS_HEADER]) / 1000
+        if _RETRY_AFTER_HEADER in headers:
+            return float(headers[_RETRY_AFTER_HEADER])
+    except ValueError:
+        pass
+    return default_seconds
+
+
+_openai_endpoint_pool: Optional[OpenAIEndpointPool] = None
+_openai_endpoint_pool_lock = threading.Lock()
+
+
+def get_openai_endpoint_pool(config: Config = config) -> Optional[OpenAIEndpointPool]:
+    global _openai_endpoint_pool
+
+    if not config.openai_endpoint_pool:
+        return None
+
+    if _openai_endpoint_pool:
+        return _openai_endpoint_pool
+
+    with _openai_endpoint_pool_lock:
+        if not _openai_endpoint_pool:
+            _openai_endpoint_pool = OpenAIEndpointPool(
+                TypeAdapter(list[OpenAIEndpointConfig]).validate_json(config.openai_endpoint_pool),
+                cooldown_seconds=config.openai_endpoint_cooldown_seconds,
+                hedge_after_seconds=config.openai_hedge_after_seconds
+            )
+
+    return _openai_endpoint_pool
@@ -0,0 +1,36 @@
+import tiktoken
+from functools import lru_cache
+from loguru import logger
+from typing import Optional
+
+
+DEFAULT_ENCODING_NAME = "cl100k_base"
+_ESTIMATED_CHARACTERS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING_NAME) -> Optional[tiktoken.Encoding]:
+    # tiktoken downloads the encoding on first use, which fails on hosts without internet access
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Failed to load the {encoding_name} tiktoken encoding, token counts are estimated from the text length - {e}")
+        return None
+
+
+def count_tokens(texts: list[str], encoding_name: str = DEFAULT_ENCODING_NAME) -> list[int]:
+    """
+    Counts the tokens of each text with tiktoken, or estimates them from the text length if the encoding is not available.
+
+    Args:
+        texts (list[str]): The texts to count.
+        encoding_name (str): The tiktoken encoding.
+
+    Returns:
+        list[int]: The number of tokens of each text.
+    """
+    encoding = get_encoding(encoding_name)
+    if not encoding:
+        return [len(text) // _ESTIMATED_CHARACTERS_PER_TOKEN + 1 for text in texts]
+
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
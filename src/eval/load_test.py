@@ -0,0 +1,102 @@
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from timeit import default_timer as timer
+
+from services.api_request_manager import ApiRequestManager
+
+
+_ENDPOINTS = ["chat", "search"]
+
+
+def _get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--config-id",
+        type=str,
+        required=True
+    )
+    parser.add_argument(
+        "--query",
+        type=str,
+        default="What is this document about?"
+    )
+    parser.add_argument(
+        "--endpoint",
+        type=str,
+        choices=_ENDPOINTS,
+        default="chat"
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=20
+    )
+
+    return parser.parse_args()
+
+
+def _send_request(api_request_manager: ApiRequestManager, endpoint: str, query: str, config_id: str) -> tuple[float, bool]:
+    start_time = timer()
+    try:
+        res = getattr(api_request_manager, endpoint)(query, config_id)
+        succeeded = res.ok
+    except Exception as e:
+        logger.error(f"Request failed, exception details - {e}")
+        succeeded = False
+
+    return timer() - start_time, succeeded
+
+
+def main(
+    api_request_manager: ApiRequestManager,
+    config_id: str,
+    query: str,
+    endpoint: str,
+    requests: int,
+    concurrency: int
+):
+    """
+    Sends concurrent chat or search requests to the API and reports its throughput and latency percentiles.
+    """
+    logger.info(f"Sending {requests} {endpoint} requests with a concurrency of {concurrency}...")
+    start_time = timer()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda _: _send_request(api_request_manager, endpoint, query, config_id),
+            range(requests)
+        ))
+    elapsed = timer() - start_time
+
+    latencies = np.array([latency for latency, succeeded in results if succeeded])
+    errors = sum(1 for _, succeeded in results if not succeeded)
+
+    logger.info(f"Completed {requests} requests in {elapsed:.2f}s ({requests / elapsed:.2f} requests/s), {errors} errors")
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        logger.info(f"Latency p50 {p50:.3f}s, p95 {p95:.3f}s, p99 {p99:.3f}s, max {latencies.max():.3f}s")
+
+
+if __name__ == "__main__":
+    args = _get_args()
+
+    api_request_manager = ApiRequestManager("local")
+    # one pooled connection per concurrent request, without retries so failed requests are reported as errors
+    adapter = HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency)
+    api_request_manager._session.mount("http://", adapter)
+
+    main(
+        api_request_manager,
+        args.config_id,
+        args.query,
+        args.endpoint,
+        args.requests,
+        args.concurrency
+    )
@@ -43,6 +43,17 @@ class ApiRequestManager(object):
         return res
 
 
+    def get_upload_job(
+        self,
+        job_id: str
+    ):
+        res = self._session.get(
+            url=f"{self._upload_url}/{job_id}"
+        )
+
+        return res
+
+
     def upload_config(
         self,
         config: dict
@@ -73,6 +84,24 @@ class ApiRequestManager(object):
         return res
 
 
+    def chat_batch(
+        self,
+        queries: list[str],
+        config_id: str
+    ):
+        body = {
+            "queries": queries,
+            "rag_config": config_id
+        }
+
+        res = self._session.post(
+            json=body,
+            url=self._chat_batch_url
+        )
+
+        return res
+
+
     def search(
         self,
         query: str,
@@ -95,6 +124,10 @@ class ApiRequestManager(object):
     def _chat_url(self) -> str:
         return f"{self._base_url}/rag/chat"
 
+    @property
+    def _chat_batch_url(self) -> str:
+        return f"{self._base_url}/rag/chat/batch"
+
     @property
     def _search_url(self) -> str:
         return f"{self._base_url}/rag/search"
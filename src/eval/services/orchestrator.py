@@ -1,5 +1,6 @@
 import os
 import json
+import time
 from loguru import logger as log
 import pathlib
 import pandas as pd
@@ -17,6 +18,10 @@ _CHAT_RESPONSE_KEY = "chat_response"
 _ROUGE_SCORE_COLUMN_NAME = "search_max_rouge_recall"
 _GPT_SCORE_COLUMN_NAME = "chat_response_gpt_score"
 
+_UPLOAD_JOB_POLL_INTERVAL_SECONDS = 5
+_UPLOAD_JOB_FINISHED_STATUSES = ["succeeded", "failed", "cancelled"]
+_CHAT_BATCH_SIZE = 50
+
 
 class DataFolderConfig:
     GROUND_TRUTH_DATASET_FILE_NAME = "ground_truth.csv"
@@ -74,6 +79,32 @@ class Orchestrator(object):
         res = self._api_request_manager.upload(files, config_id)
         res.raise_for_status()
 
+        self._wait_for_upload_job(res.json()["id"])
+
+
+    def _wait_for_upload_job(self, job_id: str):
+        """
+        Polls the upload job until the background ingestion has finished.
+
+        Args:
+            job_id (str): The ID of the upload job returned by the upload endpoint.
+
+        Raises:
+            Exception: If the upload job did not succeed.
+        """
+        log.info(f"Waiting for upload job {job_id}...")
+        while True:
+            res = self._api_request_manager.get_upload_job(job_id)
+            res.raise_for_status()
+            job = res.json()
+
+            if job["status"] in _UPLOAD_JOB_FINISHED_STATUSES:
+                break
+            time.sleep(_UPLOAD_JOB_POLL_INTERVAL_SECONDS)
+
+        if job["status"] != "succeeded":
+            raise Exception(f"Upload job {job_id} finished with status {job['status']}: {job.get('error')}")
+
 
     def _evaluate_search(
             self,
@@ -115,16 +146,21 @@ class Orchestrator(object):
             config_id (str): Configuration ID for the chat request.
         """
         log.info("Performing chat...")
-        for index, row in tqdm(dataset.iterrows(), total=dataset.shape[0]):
-            question = row[question_column_name]
-            chat_answer = self._api_request_manager.chat(
-                query=question,
+        # the questions are sent in batches, which the API embeds together and answers concurrently
+        for start in tqdm(range(0, dataset.shape[0], _CHAT_BATCH_SIZE)):
+            batch = dataset.iloc[start:start + _CHAT_BATCH_SIZE]
+            res = self._api_request_manager.chat_batch(
+                queries=batch[question_column_name].tolist(),
                 config_id=config_id
             )
+            res.raise_for_status()
+
+            for index, result in zip(batch.index, res.json()):
+                if result["error"]:
+                    raise Exception(f"Chat failed for question {result['query']}: {result['error']}")
 
-            response_json = chat_answer.json()
-            dataset.loc[index, _CHAT_RESPONSE_KEY] = response_json["answer"]
-            dataset.loc[index, _SEARCH_RESPONSE_KEY] = json.dumps([doc['page_content'] for doc in response_json["sources"]])
+                dataset.loc[index, _CHAT_RESPONSE_KEY] = result["answer"]
+                dataset.loc[index, _SEARCH_RESPONSE_KEY] = json.dumps([doc['page_content'] for doc in result["sources"]])
 
 
     def _evaluate_chat(